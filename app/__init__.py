@@ -5,46 +5,112 @@ This module contains the necessary code to create the Flask application instance
 based on the specified configuration, and register blueprints and extensions.
 
 Functions:
-    create_app(config_name): Function to create the Flask application instance based on the
-        specified configuration name.
+    create_app(config_name, config_overrides): Function to create the Flask application
+        instance based on the specified configuration name, including its blueprints and
+        error pages.
 
 Constants:
     config_by_name: Dictionary containing configurations for different environments.
 
 Imports:
     - Flask: Class for creating the Flask application.
+    - ProxyFix: Middleware reading the client's address from trusted proxy headers.
     - config_by_name: Dictionary containing configurations for different environments.
     - auth_bp, posts_bp, general_bp, users_bp: Blueprints for different parts of the application.
-    - db, migrate, bcrypt, login_manager, ckEditor: Extensions used in the application.
+    - content_cli: Commands maintaining the rendered post bodies.
+    - counters_cli: Commands maintaining the per-user post counters.
+    - data_cli: Commands importing and exporting users and posts in bulk.
+    - jobs_cli: Commands running and inspecting background jobs.
+    - db, db_tuning, async_db, read_replicas, migrate, bcrypt, login_manager, ckEditor, page_cache, user_cache,
+      slug_cache, password_hasher, image_pipeline, job_queue, asset_manifest, instrumentation, rate_limiter,
+      compression: Extensions
+      used in the application.
 """
 
-from flask import Flask
+from flask import Flask, render_template, request
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config_by_name
 from .blueprints import auth_bp, posts_bp, general_bp, users_bp
-from .extensions import db, migrate, bcrypt, login_manager, ckEditor
+from .content import content_cli
+from .counters import counters_cli
+from .jobs import jobs_cli
+from .transfer import data_cli
+from .extensions import (
+    db,
+    db_tuning,
+    async_db,
+    read_replicas,
+    migrate,
+    bcrypt,
+    login_manager,
+    ckEditor,
+    page_cache,
+    user_cache,
+    slug_cache,
+    password_hasher,
+    image_pipeline,
+    job_queue,
+    asset_manifest,
+    instrumentation,
+    rate_limiter,
+    compression,
+)
 
 
-def create_app(config_name):
+def create_app(config_name, config_overrides=None):
     """
     Creates a Flask application.
 
     Args:
         config_name (str): The name of the configuration to use.
+        config_overrides (dict, optional): Settings replacing those of the
+            configuration, such as the database URI of a benchmark database.
 
     Returns:
         Flask: The Flask application instance.
     """
     app = Flask(__name__)
     app.config.from_object(config_by_name[config_name])
+    app.config.update(config_overrides or {})
+    if app.config.get("REQUIRE_SECRET_KEY") and not app.config.get("SECRET_KEY"):
+        # The default key is public, so anyone could forge session cookies
+        raise ValueError(f"SECRET_KEY must be set for the {config_name} configuration")
+    if app.config.get("PROXY_FIX_X_FOR") or app.config.get("PROXY_FIX_X_PROTO"):
+        # Take the client's address and scheme from the trusted proxies' headers
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=app.config.get("PROXY_FIX_X_FOR", 0),
+            x_proto=app.config.get("PROXY_FIX_X_PROTO", 0),
+        )
 
     db.init_app(app)
+    db_tuning.init_app(app)
+    async_db.init_app(app)
+    read_replicas.init_app(app)
     migrate.init_app(app, db)
     bcrypt.init_app(app)
     ckEditor.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
+    page_cache.init_app(app)
+    user_cache.init_app(app)
+    slug_cache.init_app(app)
+    password_hasher.init_app(app)
+    image_pipeline.init_app(app)
+    job_queue.init_app(app)
+    asset_manifest.init_app(app)
+    instrumentation.init_app(app)
+    # After instrumentation, whose registry counts the rejected requests
+    rate_limiter.init_app(app)
+    # After instrumentation, so its hook runs first and compression is timed
+    compression.init_app(app)
 
     _register_blueprints(app)
+    app.cli.add_command(content_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(data_cli)
+    app.cli.add_command(jobs_cli)
+    _register_error_handlers(app)
 
     return app
 
@@ -60,3 +126,36 @@ def _register_blueprints(app):
     app.register_blueprint(auth_bp)
     app.register_blueprint(users_bp)
     app.register_blueprint(general_bp)
+
+
+def _register_error_handlers(app):
+    """
+    Registers the error pages with the Flask application.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    # Invalid URL page
+    @app.errorhandler(404)
+    def invalid_url(error):
+        """Handle error for when user goes to a non-existent page."""
+        app.logger.info("%s: %s", request.path, error)
+        return render_template("404.html"), 404
+
+    # Rate limit exceeded
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        """Handle error for when a client exceeds a rate limit."""
+        return render_template("429.html"), 429, error.get_headers()
+
+    # Server error
+    @app.errorhandler(500)
+    def server_err(error):
+        """Handle error for when server errors occur."""
+        app.logger.error(
+            "Server error on %s",
+            request.path,
+            exc_info=getattr(error, "original_exception", None) or error,
+        )
+        return render_template("500.html"), 500
@@ -0,0 +1,116 @@
+"""
+Module for the user management operations of the admin portal.
+
+Admins select users on the admin page and promote, demote or delete them all at
+once. Each operation is a fixed number of set-based statements in the caller's
+transaction, however many users are selected:
+
+- Promoting or demoting is a single `UPDATE users ... WHERE id IN (...)`, which
+  skips users who already have the requested role.
+- Deleting users deletes their posts with them, in one `DELETE ... WHERE
+  poster_id IN (...)`. Statements like these skip the mapper events that keep
+  the search index, the previous slugs and the caches in sync when a single
+  post is deleted, so those are updated here with a statement each.
+
+The statements do not flush, so each operation marks the request as a writer
+itself, keeping the admin's next requests on the primary database. The changed
+users are dropped from the user cache of every worker once the caller commits;
+the caller then purges the cached pages of the deleted posts.
+
+Functions:
+    filter_users(query, text, role): Narrow a users query for the admin page.
+    set_admin(session, user_ids, is_admin): Grant or revoke admin privileges.
+    delete_users(session, user_ids): Delete users along with their posts.
+"""
+
+from sqlalchemy import delete, or_, select, update
+from .extensions import user_cache
+from .models import Posts, Users
+from .replicas import mark_written
+from .search import remove_posts
+from .slugs import release_slugs
+
+
+def _like_pattern(text):
+    """A LIKE pattern matching text anywhere, with its wildcards escaped."""
+    for char in ("\\", "%", "_"):
+        text = text.replace(char, "\\" + char)
+    return f"%{text}%"
+
+
+def filter_users(query, text=None, role=None):
+    """
+    Narrow a users query to the users an admin is looking for.
+
+    Args:
+        query (Query): The users query.
+        text (str, optional): Text the username, name or email must contain,
+            ignoring case.
+        role (str, optional): "admin" or "user" to only keep admins or other
+            users.
+
+    Returns:
+        Query: The filtered query.
+    """
+    if text:
+        pattern = _like_pattern(text.strip())
+        query = query.filter(
+            or_(
+                Users.username.ilike(pattern, escape="\\"),
+                Users.name.ilike(pattern, escape="\\"),
+                Users.email.ilike(pattern, escape="\\"),
+            )
+        )
+    if role == "admin":
+        query = query.filter(Users.is_admin.is_(True))
+    elif role == "user":
+        query = query.filter(Users.is_admin.is_(False))
+    return query
+
+
+def set_admin(session, user_ids, is_admin):
+    """
+    Grant or revoke the admin privileges of users in one statement.
+
+    Args:
+        session (Session): The session of the transaction.
+        user_ids (list): The IDs of the users.
+        is_admin (bool): Whether the users become admins.
+
+    Returns:
+        int: The number of users whose privileges changed.
+    """
+    result = session.execute(
+        update(Users)
+        .where(Users.id.in_(user_ids), Users.is_admin != is_admin)
+        .values(is_admin=is_admin)
+    )
+    mark_written()
+    for user_id in user_ids:
+        user_cache.invalidate(user_id, session)
+    return result.rowcount
+
+
+def delete_users(session, user_ids):
+    """
+    Delete users and their posts, along with the posts' index entries and slugs.
+
+    Args:
+        session (Session): The session of the transaction.
+        user_ids (list): The IDs of the users.
+
+    Returns:
+        tuple: The number of users deleted and the IDs of their deleted posts.
+    """
+    their_posts = select(Posts.id).where(Posts.poster_id.in_(user_ids))
+    post_ids = session.execute(their_posts).scalars().all()
+    if post_ids:
+        connection = session.connection()
+        remove_posts(connection, their_posts)
+        release_slugs(connection, their_posts, session)
+        session.execute(delete(Posts).where(Posts.poster_id.in_(user_ids)))
+    result = session.execute(delete(Users).where(Users.id.in_(user_ids)))
+    mark_written()
+    for user_id in user_ids:
+        user_cache.invalidate(user_id, session)
+    return result.rowcount, post_ids
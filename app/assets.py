@@ -0,0 +1,212 @@
+"""
+Module for serving static assets with fingerprinted URLs and long-lived caching.
+
+At startup every file under the static folder is hashed, and `url_for("static")`
+produces URLs with the content hash in the file name ("css/styles.3f2a9c1d.css").
+Because the URL changes whenever the file does, fingerprinted files are served
+with `Cache-Control: public, max-age=31536000, immutable` and browsers never
+revalidate them. The upload folder (`UPLOAD_FOLDER`) is skipped, as it grows
+without bound and its files are already named after their content; files that
+are not in the manifest are served as before.
+
+When a precompressed `.br` or `.gz` sibling of a file exists and the client
+accepts that encoding, the sibling is sent instead.
+
+The `flask assets` command group writes the precompressed siblings and can
+vendor the CDN assets used by `base.html` into `static/vendor` for deployments
+without internet access (enable them with `SERVE_VENDORED_ASSETS`).
+
+Classes:
+    AssetManifest: Flask extension fingerprinting and serving static files.
+
+Configuration:
+    ASSET_FINGERPRINTING: Whether to fingerprint static URLs.
+    SERVE_VENDORED_ASSETS: Whether base.html loads the vendored copies of the
+        CDN assets instead of the CDN.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import urllib.request
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+from .images import upload_folder
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+FINGERPRINT_LENGTH = 8
+CACHE_MAX_AGE = 365 * 24 * 60 * 60
+COMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+
+# Local paths under static/ of the assets base.html otherwise loads from CDNs
+VENDORED_ASSETS = {
+    "vendor/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@4.4.1/dist/css/bootstrap.min.css",
+    "vendor/bootstrap-icons.css": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.5.0/font/bootstrap-icons.css",
+    "vendor/fonts/bootstrap-icons.woff2": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.5.0/font/fonts/bootstrap-icons.woff2",
+    "vendor/fonts/bootstrap-icons.woff": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.5.0/font/fonts/bootstrap-icons.woff",
+    "vendor/jquery.slim.min.js": "https://code.jquery.com/jquery-3.4.1.slim.min.js",
+    "vendor/popper.min.js": "https://cdn.jsdelivr.net/npm/popper.js@1.16.0/dist/umd/popper.min.js",
+    "vendor/bootstrap.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@4.4.1/dist/js/bootstrap.min.js",
+}
+
+assets_cli = AppGroup("assets", help="Manage static assets.")
+
+
+def _walk_static(static_folder, exclude=()):
+    """
+    Yield the paths, relative to the static folder, of all servable files.
+
+    Args:
+        static_folder (str): The static folder.
+        exclude (iterable, optional): Absolute paths of folders to skip.
+    """
+    exclude = set(exclude)
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [
+            name
+            for name in dirs
+            if os.path.abspath(os.path.join(root, name)) not in exclude
+        ]
+        for name in files:
+            if name.endswith((".br", ".gz")):
+                continue
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, static_folder).replace(os.sep, "/")
+
+
+def _excluded_folders(app):
+    """The absolute paths of the folders under static/ that are not assets."""
+    if not app.config.get("UPLOAD_FOLDER"):
+        return []
+    # Resolved like the static folder, so the working directory does not matter
+    return [os.path.abspath(upload_folder(app))]
+
+
+def _fingerprinted_name(filename, digest):
+    """Insert a content digest before a file name's extension."""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+class AssetManifest:
+    """Flask extension fingerprinting static URLs and serving them cacheably."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Build the manifest and take over URL building and serving of static files."""
+        app.cli.add_command(assets_cli)
+        if not app.config.get("ASSET_FINGERPRINTING", True) or not app.static_folder:
+            return
+
+        manifest = self.build(app.static_folder, _excluded_folders(app))
+        app.extensions["asset_manifest"] = {
+            "fingerprinted": manifest,
+            "originals": {value: key for key, value in manifest.items()},
+        }
+
+        @app.url_defaults
+        def _fingerprint_static_url(endpoint, values):
+            if endpoint == "static" and "filename" in values:
+                values["filename"] = manifest.get(values["filename"], values["filename"])
+
+        app.view_functions["static"] = self.send_static
+
+    @staticmethod
+    def build(static_folder, exclude=()):
+        """
+        Hash every file under a static folder.
+
+        Args:
+            static_folder (str): The static folder.
+            exclude (iterable, optional): Absolute paths of folders to skip.
+
+        Returns:
+            dict: Maps each file's path to its fingerprinted path.
+        """
+        manifest = {}
+        for filename in _walk_static(static_folder, exclude):
+            digest = hashlib.sha256()
+            with open(os.path.join(static_folder, filename), "rb") as asset:
+                for chunk in iter(lambda: asset.read(64 * 1024), b""):
+                    digest.update(chunk)
+            manifest[filename] = _fingerprinted_name(filename, digest.hexdigest())
+        return manifest
+
+    @staticmethod
+    def send_static(filename):
+        """
+        Serve a static file, with immutable caching if the URL is fingerprinted and
+        from a precompressed sibling if the client accepts its encoding.
+
+        Args:
+            filename (str): The requested path under the static folder.
+
+        Returns:
+            Response: The file.
+        """
+        app = current_app
+        original = app.extensions["asset_manifest"]["originals"].get(filename)
+        if original is None:
+            return app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(original)[0] or "application/octet-stream"
+        served, encoding = original, None
+        for candidate, suffix in COMPRESSED_SUFFIXES.items():
+            if candidate in request.accept_encodings and os.path.exists(
+                os.path.join(app.static_folder, original + suffix)
+            ):
+                served, encoding = original + suffix, candidate
+                break
+
+        response = send_from_directory(
+            app.static_folder, served, mimetype=mimetype, max_age=CACHE_MAX_AGE
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+@assets_cli.command("compress")
+def compress_command():
+    """Write .gz (and .br, if brotli is installed) siblings of text assets."""
+    static_folder = current_app.static_folder
+    count = 0
+    for filename in _walk_static(static_folder, _excluded_folders(current_app)):
+        if os.path.splitext(filename)[1] not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        path = os.path.join(static_folder, filename)
+        with open(path, "rb") as asset:
+            data = asset.read()
+        with open(path + ".gz", "wb") as out:
+            out.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + ".br", "wb") as out:
+                out.write(brotli.compress(data))
+        count += 1
+    click.echo(f"Compressed {count} assets")
+
+
+@assets_cli.command("vendor")
+def vendor_command():
+    """Download the CDN assets used by base.html into static/vendor."""
+    for filename, url in VENDORED_ASSETS.items():
+        path = os.path.join(current_app.static_folder, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as source:
+            data = source.read()
+        with open(path, "wb") as out:
+            out.write(data)
+        click.echo(f"{url} -> static/{filename}")
@@ -0,0 +1,178 @@
+"""
+Module for running the queries of some views on an async SQLAlchemy engine.
+
+The feed, single post, search and profile update views load their data through
+`AsyncDatabase.load`. Under the ASGI entry point (asgi.py), with the async engine
+enabled, the loading runs on the server's event loop and its queries go through
+an async engine (aiosqlite or asyncpg), so the request's thread waits on the
+loop instead of holding a database connection of its own while a slow query
+runs. The page is then rendered back on the request's thread, off the loop.
+
+The loaders are not rewritten for the async API: `load` runs ordinary ORM code
+through `AsyncSession.run_sync`, with `db.session` pointing at the async
+session's sync facade for the duration of the call. Model queries, lazy loads
+and the mapper events work unchanged inside the loader; the objects it returns
+are detached, so it must load everything the page shows. Views marked with
+`replica_reads` load from an async engine of a random replica.
+
+When the async engine is disabled (the default, and the right setting under
+WSGI), `load` simply calls the loader with the usual session, and the views run
+like any other synchronous view, without an event loop.
+
+Functions:
+    async_database_url(url): The async driver URL of a database URL.
+
+Classes:
+    AsyncDatabase: Flask extension owning the async engine.
+
+Configuration:
+    ASYNC_ENGINE: Whether async views query through the async engine.
+    ASYNC_DATABASE_URI: URL of the async engine (defaults to the async driver
+        variant of `SQLALCHEMY_DATABASE_URI`).
+    ASYNC_ENGINE_OPTIONS: Keyword arguments of `create_async_engine`.
+"""
+
+import random
+from flask import current_app, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from .database import tune_engine
+from .replicas import mark_written
+
+# Async driver used for each database backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_database_url(url):
+    """
+    The async driver URL of a database URL.
+
+    Args:
+        url (str): A database URL, such as "sqlite:///blog.db".
+
+    Returns:
+        str: The same database with its async driver, such as
+        "sqlite+aiosqlite:///blog.db".
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.get_driver_name() == driver:
+        return url
+    drivername = f"{parsed.get_backend_name()}+{driver}"
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+class AsyncDatabase:
+    """Flask extension owning the async engine used by async views."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the async engines if they are enabled. Must be called after the
+        SQLAlchemy extension is initialised, whose databases they connect to.
+        """
+        if not app.config.get("ASYNC_ENGINE", False):
+            return
+        # Imported only when enabled, as the async extension is slow to import
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        def connect(url):
+            engine = create_async_engine(
+                url, **app.config.get("ASYNC_ENGINE_OPTIONS", {})
+            )
+            tune_engine(
+                engine.sync_engine,
+                app.config.get("SQLITE_PRAGMAS"),
+                app.config.get("POSTGRES_STATEMENT_TIMEOUT_MS", 0),
+            )
+            return engine
+
+        # The engines' URLs, with relative SQLite paths resolved
+        with app.app_context():
+            engines = app.extensions["sqlalchemy"].engines
+            primary = engines[None].url.render_as_string(hide_password=False)
+            replicas = {
+                key: engines[key].url.render_as_string(hide_password=False)
+                for key in app.config.get("READ_REPLICAS") or []
+            }
+        url = app.config.get("ASYNC_DATABASE_URI") or async_database_url(primary)
+        app.extensions["async_database"] = connect(url)
+        app.extensions["async_database_replicas"] = {
+            key: connect(async_database_url(replica)) for key, replica in replicas.items()
+        }
+
+    @property
+    def engine(self):
+        """The async engine of the current application, or None if disabled."""
+        return current_app.extensions.get("async_database")
+
+    @property
+    def engines(self):
+        """Every async engine of the current application, the primary first."""
+        if self.engine is None:
+            return []
+        replicas = current_app.extensions["async_database_replicas"]
+        return [self.engine, *replicas.values()]
+
+    def _request_engine(self):
+        """The primary engine, or a replica's for the reads of a replica view."""
+        replicas = current_app.extensions["async_database_replicas"]
+        if (
+            replicas
+            and has_request_context()
+            and g.get("_replica_reads", False)
+            and not g.get("_wrote", False)
+        ):
+            return random.choice(list(replicas.values()))
+        return self.engine
+
+    def load(self, func, *args, **kwargs):
+        """
+        Run synchronous ORM code through the async engine, if it is enabled.
+
+        Args:
+            func (callable): The code to run, which should only query and return
+                what the caller needs. Inside it `db.session` (and so
+                `Model.query`) uses the async engine.
+            *args: Positional arguments of `func`.
+            **kwargs: Keyword arguments of `func`.
+
+        Returns:
+            object: The return value of `func`.
+        """
+        if self.engine is None:
+            return func(*args, **kwargs)
+        # Runs on the ASGI server's event loop, or on a loop of its own under WSGI
+        return current_app.ensure_sync(self._run)(func, args, kwargs)
+
+    async def _run(self, func, args, kwargs):
+        """Run `func` on an async session's sync facade."""
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        registry = current_app.extensions["sqlalchemy"].session.registry
+
+        def call(sync_session):
+            previous = registry() if registry.has() else None
+            registry.set(sync_session)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if previous is None:
+                    registry.clear()
+                else:
+                    registry.set(previous)
+
+        async with AsyncSession(
+            self._request_engine(), expire_on_commit=False
+        ) as session:
+            # Writes keep the client on the primary, as with the usual session
+            event.listen(session.sync_session, "after_flush", lambda *_: mark_written())
+            return await session.run_sync(call)
+
+    async def dispose(self):
+        """Close the pooled connections of the async engines."""
+        for engine in self.engines:
+            await engine.dispose()
@@ -12,7 +12,8 @@ from flask import Blueprint, render_template, redirect, flash, url_for
 from flask_login import current_user, login_required, login_user, logout_user
 from ..models import Users
 from ..forms import LoginForm
-from ..extensions import bcrypt
+from ..extensions import db
+from ..ratelimit import rate_limited
 
 
 # Create a Blueprint for authentication-related routes
@@ -22,6 +23,7 @@ auth_bp = Blueprint(
 
 
 @auth_bp.route("/login", methods=["GET", "POST"])
+@rate_limited("login.ip", "login.username")
 def login():
     """Route for user login.
 
@@ -37,7 +39,11 @@ def login():
 
         if user:
             # Check if the provided password matches the stored hash
-            if bcrypt.check_password_hash(user.password_hash, form.password.data):
+            if user.verify_password(form.password.data):
+                # Upgrade hashes made with an outdated cost while we have the password
+                if user.password_needs_rehash():
+                    user.password = form.password.data
+                    db.session.commit()
                 login_user(user)
                 flash("Login successful!")
 
@@ -7,12 +7,25 @@ Attributes:
     general_bp (Blueprint): Blueprint object for general routes.
 """
 
-from flask import Blueprint, render_template, redirect, flash, url_for
+from flask import (
+    Blueprint,
+    render_template,
+    redirect,
+    flash,
+    url_for,
+    request,
+    current_app,
+)
 from flask_login import login_required, current_user
-from sqlalchemy import or_
-from ..models import Users, Posts
-from ..forms import SearchForm
-from ..extensions import login_manager
+from ..admin import filter_users
+from ..models import Users
+from ..forms import BulkUsersForm, SearchForm, UserFilterForm
+from ..extensions import async_db, db, login_manager, user_cache
+from ..pagination import paginate_keyset
+from ..ratelimit import rate_limited
+from ..replicas import replica_reads
+from ..search import search_posts
+from ..streaming import stream_page
 
 general_bp = Blueprint(
     "general", __name__, url_prefix="/", template_folder="../../templates"
@@ -22,7 +35,7 @@ general_bp = Blueprint(
 @login_manager.user_loader
 def load_user(user_id):
     """
-    Load a user by its ID.
+    Load a user by its ID, from the user cache when possible.
 
     Args:
         user_id (int): The ID of the user.
@@ -30,7 +43,7 @@ def load_user(user_id):
     Returns:
         User: The user corresponding to the given ID.
     """
-    return Users.query.get(int(user_id))
+    return user_cache.load(db.session, Users, int(user_id))
 
 
 @general_bp.route("/")
@@ -53,17 +66,41 @@ def home():
 
 @general_bp.route("/admin")
 @login_required
+@replica_reads
 def admin():
     """
     Directs to the admin page if the current user is an admin.
 
+    The users are filtered by the `q` and `role` query arguments, newest first,
+    a page at a time.
+
     Returns:
         Response: The admin page template if the user is an admin, otherwise redirects
         to the dashboard.
     """
-    our_users = Users.query.order_by(Users.date_added.desc())
     if current_user.is_admin:
-        return render_template("admin.html", our_users=our_users)
+        filters = UserFilterForm(request.args)
+        page = paginate_keyset(
+            filter_users(Users.query, filters.q.data, filters.role.data),
+            Users.date_added,
+            Users.id,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            per_page=current_app.config["USERS_PER_PAGE"],
+        )
+        return stream_page(
+            "admin.html",
+            our_users=page.items,
+            page=page,
+            # Kept in the links to the other pages
+            page_args={
+                key: value
+                for key, value in request.args.items()
+                if key in ("q", "role") and value
+            },
+            filters=filters,
+            bulk_form=BulkUsersForm(),
+        )
     flash("You do not have admin privileges")
     return redirect(url_for("general.dashboard"))
 
@@ -82,23 +119,24 @@ def base():
 
 
 @general_bp.route("/search", methods=["POST"])
+@replica_reads
+@rate_limited("search.ip")
 def search():
     """
-    Handles searching for posts.
+    Handles searching for posts using the full-text search index.
 
     Returns:
-        Response: The search results page template.
+        Response: The search results page template, best matches first.
     """
     form = SearchForm()
-    posts = Posts.query.order_by(Posts.date_posted.desc())
+    searched = None
+    results = []
     if form.validate_on_submit():
         searched = form.searched.data
-        search_regex = "%" + searched + "%"
-        posts = posts.filter(
-            or_(Posts.content.like(search_regex), Posts.title.like(search_regex))
+        results = async_db.load(
+            search_posts, searched, current_app.config["SEARCH_RESULTS_LIMIT"]
         )
-        posts = posts.order_by(Posts.title).all()
-    return render_template("search.html", form=form, searched=searched, posts=posts)
+    return stream_page("search.html", form=form, searched=searched, results=results)
 
 
 @general_bp.route("/dashboard", methods=["GET", "POST"])
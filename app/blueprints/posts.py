@@ -7,7 +7,8 @@ posts and displaying individual posts.
 
 Routes:
     - /posts: Renders the list of posts.
-    - /posts/<int:id>: Renders the details of a specific post.
+    - /posts/<slug>: Renders the details of a specific post.
+    - /posts/<int:id>: Permanently redirects to the post's slug URL.
     - /submit_post: Handles the submission of a new post.
     - /edit_post/<int:id>: Handles the editing of an existing post.
     - /delete_post/<int:id>: Handles the deletion of an existing post.
@@ -17,12 +18,28 @@ Attributes:
     - posts_bp: Blueprint object representing the posts blueprint.
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import (
+    Blueprint,
+    abort,
+    render_template,
+    redirect,
+    url_for,
+    flash,
+    request,
+    current_app,
+)
 from flask_login import current_user, login_required
-from sqlalchemy import exc
+from sqlalchemy import exc, select
+from sqlalchemy.orm import defer, joinedload
+from ..content import fill_excerpts
 from ..models import Posts
 from ..forms import PostForm
-from ..extensions import db
+from ..extensions import async_db, db, page_cache, slug_cache
+from ..pagination import paginate_keyset
+from ..replicas import replica_reads
+from ..slugs import lookup_slug
+from ..streaming import LazyFragment, stream_page
+from ..tasks import schedule_purge
 
 posts_bp = Blueprint(
     "posts", __name__, url_prefix="/posts", template_folder="../../templates"
@@ -30,16 +47,17 @@ posts_bp = Blueprint(
 
 
 @posts_bp.route("/")
+@replica_reads
 def posts():
     """
-    Renders the page displaying all posts.
+    Renders a page of all posts, newest first. Anonymous readers are served
+    from the page cache.
 
     Returns:
-        str: The rendered HTML page displaying all posts.
+        Response: The rendered HTML page displaying one page of posts.
     """
-    post_list = Posts.query.order_by(Posts.date_posted.desc())
-    print(post_list)
-    return render_template("posts/posts.html", posts=post_list)
+    key = page_cache.feed_key(request.args.get("after"), request.args.get("before"))
+    return page_cache.respond(key, _render_feed, "posts/posts.html", stream=True)
 
 
 @posts_bp.route("/myposts")
@@ -51,27 +69,123 @@ def my_posts():
     Returns:
         str: The rendered HTML page displaying posts created by the current user.
     """
-    post_list = (
-        Posts.query.filter_by(poster_id=current_user.id)
-        .order_by(Posts.date_posted.desc())
-        .all()
+    poster_id = current_user.id
+    return stream_page(
+        "posts/posts.html",
+        fragment=LazyFragment(lambda: _render_feed(poster_id=poster_id)),
+    )
+
+
+def _listing_query():
+    """
+    Builds the base query for post listings, loading each post's poster in the
+    same statement so rendering `post.poster.name` does not query per row. The
+    listings only show excerpts, so the full bodies are not loaded.
+
+    Returns:
+        Query: The posts query with the poster eagerly loaded.
+    """
+    return Posts.query.options(
+        joinedload(Posts.poster), defer(Posts.content), defer(Posts.body_html)
+    )
+
+
+def _feed_page(**filters):
+    """
+    Loads the page of posts selected by the request's cursor arguments.
+
+    Args:
+        **filters: Column values the posts must have, such as `poster_id`.
+
+    Returns:
+        KeysetPage: The page of posts, newest first, each with an excerpt.
+    """
+    page = paginate_keyset(
+        _listing_query().filter_by(**filters),
+        Posts.date_posted,
+        Posts.id,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=current_app.config["POSTS_PER_PAGE"],
+    )
+    fill_excerpts(db.session, page.items)
+    return page
+
+
+def _render_feed(**filters):
+    """
+    Renders the page of posts selected by the request's cursor arguments.
+
+    Args:
+        **filters: Column values the posts must have, such as `poster_id`.
+
+    Returns:
+        str: The rendered feed fragment.
+    """
+    page = async_db.load(_feed_page, **filters)
+    return render_template("posts/_feed.html", posts=page.items, page=page)
+
+
+@posts_bp.route("/<slug>")
+@replica_reads
+def post(slug):
+    """
+    Renders the page displaying a single post. Anonymous readers are served
+    from the page cache. Previous slugs of the post redirect to its current one.
+
+    Args:
+        slug (str): The current or a previous slug of the post to display.
+
+    Returns:
+        Response: The rendered HTML page displaying the specified post, or a
+        permanent redirect to its current URL.
+    """
+    entry = slug_cache.resolve(
+        slug, lambda key: async_db.load(lambda: lookup_slug(db.session, key))
+    )
+    if entry is None:
+        abort(404)
+    post_id, current_slug = entry
+    if slug != current_slug:
+        return redirect(url_for("posts.post", slug=current_slug), 301)
+    return page_cache.respond(
+        page_cache.post_key(post_id),
+        lambda: render_template(
+            "posts/_post.html", post=async_db.load(_load_post, post_id)
+        ),
+        "posts/post.html",
     )
-    return render_template("posts/posts.html", posts=post_list)
+
+
+def _load_post(post_id):
+    """
+    Loads a post along with its poster.
+
+    Args:
+        post_id (int): The ID of the post.
+
+    Returns:
+        Posts: The post.
+    """
+    return Posts.query.options(joinedload(Posts.poster)).get_or_404(post_id)
 
 
 @posts_bp.route("/<int:post_id>")
-def post(post_id):
+@replica_reads
+def post_by_id(post_id):
     """
-    Renders the page displaying a single post.
+    Permanently redirects the old ID based URL of a post to its slug URL.
 
     Args:
-        id (int): The ID of the post to display.
+        post_id (int): The ID of the post.
 
     Returns:
-        str: The rendered HTML page displaying the specified post.
+        Response: A permanent redirect to the post's URL.
     """
-    post_single = Posts.query.get_or_404(post_id)
-    return render_template("posts/post.html", post=post_single)
+    slug = db.session.scalar(select(Posts.slug).where(Posts.id == post_id))
+    if slug is None:
+        abort(404)
+    return redirect(url_for("posts.post", slug=slug), 301)
 
 
 @posts_bp.route("/edit/<int:post_id>", methods=["GET", "POST"])
@@ -97,10 +211,11 @@ def edit_post(post_id):
         try:
             db.session.add(post_to_edit)
             db.session.commit()
+            schedule_purge(post_ids=[post_to_edit.id])
             flash("Post has been updated")
         except exc.SQLAlchemyError:
             flash("DB could not update post. try again")
-        return redirect(url_for("posts.post", post_id=post_to_edit.id))
+        return redirect(url_for("posts.post", slug=post_to_edit.slug))
 
     if current_user.id == post_to_edit.poster_id or current_user.is_admin:
         form.title.data = post_to_edit.title
@@ -129,6 +244,7 @@ def delete_post(post_id):
         try:
             db.session.delete(post_to_delete)
             db.session.commit()
+            schedule_purge(post_ids=[post_id])
             flash("Post deleted!!")
         except exc.SQLAlchemyError:
             flash("Post deletion unsuccesful. Please try again!")
@@ -164,10 +280,11 @@ def add_post():
         try:
             db.session.add(post_to_add)
             db.session.commit()
+            schedule_purge()
 
             flash("Post succesfully submitted!")
         except exc.SQLAlchemyError:
             flash("Something went wrong!")
             return render_template("posts/add_post.html", form=form)
-        return redirect(url_for("posts.post", post_id=post_to_add.id))
+        return redirect(url_for("posts.post", slug=post_to_add.slug))
     return render_template("posts/add_post.html", form=form)
@@ -13,6 +13,7 @@ Routes:
     - /users/<int:id>: Renders the details of a specific user.
     - /edit_user/<int:id>: Handles the editing of user profile information.
     - /delete_user/<int:id>: Handles the deletion of a user account.
+    - /users/bulk: Promotes, demotes or deletes the users selected on the admin page.
     - /profile: Renders the user profile page.
 
 Attributes:
@@ -23,23 +24,24 @@ Functions:
     - load_user: Load a user by its ID.
 """
 
-import uuid
-import os
 from flask import (
     Blueprint,
     render_template,
     request,
     flash,
-    current_app,
     redirect,
     url_for,
 )
 from flask_login import current_user, login_required, login_user, logout_user
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from sqlalchemy import exc
+from ..admin import delete_users, set_admin
 from ..models import Users
-from ..forms import UserForm
-from ..extensions import db, bcrypt
+from ..ratelimit import rate_limited
+from ..forms import BulkUsersForm, UserForm
+from ..extensions import async_db, db, image_pipeline, job_queue
+from ..replicas import replica_reads
+from ..tasks import make_picture_variants, schedule_purge
 
 
 users_bp = Blueprint(
@@ -62,59 +64,83 @@ def update(user_id):
         fails.
     """
     form = UserForm()
-    name_to_update = Users.query.get_or_404(user_id)
-    if request.method == "POST":
-        name_to_update.name = request.form["name"]
-        name_to_update.email = request.form["email"]
-        name_to_update.favorite_pizza_place = request.form["favorite_pizza_place"]
-        name_to_update.username = request.form["username"]
-        name_to_update.profile_pic = request.files["profile_pic"]
-
-        if request.files["profile_pic"]:
-            name_to_update.profile_pic = request.files["profile_pic"]
-
-            # Grab Image Name
-            pic_filename = secure_filename(name_to_update.profile_pic.filename)
-            # Set UUID
-            pic_name = str(uuid.uuid1()) + "_" + pic_filename
-            # Save That Image
-            saver = request.files["profile_pic"]
-
-            # Change it to a string to save to db
-            name_to_update.profile_pic = pic_name
-
-            try:
-                db.session.commit()
-                saver.save(os.path.join(current_app.config["UPLOAD_FOLDER"], pic_name))
-                flash("User Updated Successfully!")
-                return render_template("dashboard.html")
-            except exc.SQLAlchemyError:
-                flash("ERROR! TRY AGAIN!")
-                return render_template(
-                    "users/update.html", form=form, name_to_update=name_to_update
-                )
-        else:
-            try:
-                name_to_update.profile_pic = None
-                db.session.commit()
-                flash("User updated!!")
-                return render_template("dashboard.html")
-            except exc.SQLAlchemyError:
-                flash("ERROR! TRY AGAIN!")
-                return render_template(
-                    "users/update.html", form=form, name_to_update=name_to_update
-                )
-    else:
+    if request.method != "POST":
+        name_to_update = async_db.load(lambda: Users.query.get_or_404(user_id))
         return render_template(
             "users/update.html", form=form, name_to_update=name_to_update, id=user_id
         )
 
+    pic_name = None
+    if request.files["profile_pic"]:
+        # Stream the upload to disk under its content hash; resized variants are
+        # generated in the background
+        try:
+            pic_name = image_pipeline.save(request.files["profile_pic"])
+        except ValueError:
+            name_to_update = async_db.load(_apply_profile_form, user_id)
+            flash("Profile picture must be a JPEG, PNG, GIF or WebP image")
+            return render_template(
+                "users/update.html", form=form, name_to_update=name_to_update, id=user_id
+            )
+
+    name_to_update, post_ids = async_db.load(_save_profile, user_id, pic_name)
+    if post_ids is None:
+        flash("ERROR! TRY AGAIN!")
+        return render_template(
+            "users/update.html", form=form, name_to_update=name_to_update
+        )
+    if pic_name:
+        job_queue.enqueue(
+            make_picture_variants, key=f"variants:{pic_name}", filename=pic_name
+        )
+    _invalidate_pages_of(post_ids)
+    flash("User Updated Successfully!" if pic_name else "User updated!!")
+    return render_template("dashboard.html")
+
+
+def _apply_profile_form(user_id):
+    """
+    Loads a user and applies the submitted profile fields, without saving them.
+
+    Args:
+        user_id (int): The ID of the user to update.
+
+    Returns:
+        Users: The user.
+    """
+    name_to_update = Users.query.get_or_404(user_id)
+    name_to_update.name = request.form["name"]
+    name_to_update.email = request.form["email"]
+    name_to_update.favorite_pizza_place = request.form["favorite_pizza_place"]
+    name_to_update.username = request.form["username"]
+    return name_to_update
+
+
+def _save_profile(user_id, pic_name):
+    """
+    Saves the submitted profile changes of a user.
+
+    Args:
+        user_id (int): The ID of the user to update.
+        pic_name (str): The stored name of the uploaded profile picture, if any.
+
+    Returns:
+        tuple: The user, and the IDs of their posts, or None if saving failed.
+    """
+    name_to_update = _apply_profile_form(user_id)
+    name_to_update.profile_pic = pic_name
+    try:
+        db.session.commit()
+    except exc.SQLAlchemyError:
+        return name_to_update, None
+    return name_to_update, [post.id for post in name_to_update.posts]
+
 
 @users_bp.route("/delete/<int:user_id>")
 @login_required
 def delete(user_id):
     """
-    Allows users to delete their account.
+    Allows users to delete their account, along with their posts.
 
     Args:
         id (int): The ID of the user to delete.
@@ -123,13 +149,14 @@ def delete(user_id):
         Response: Redirects the user to the add user page after deletion.
     """
     if user_id == current_user.id or current_user.is_admin:
-        user_to_delete = Users.query.get_or_404(user_id)
+        Users.query.get_or_404(user_id)
         name = None
         form = UserForm()
         our_users = Users.query.order_by(Users.date_added.desc())
         try:
-            db.session.delete(user_to_delete)
+            _count, post_ids = delete_users(db.session, [user_id])
             db.session.commit()
+            _invalidate_pages_of(post_ids)
             flash("USER DELETED")
             our_users = Users.query.order_by(Users.date_added.desc())
             if current_user.is_admin:
@@ -146,7 +173,31 @@ def delete(user_id):
         return redirect(url_for("general.dashboard"))
 
 
+@users_bp.errorhandler(RequestEntityTooLarge)
+def upload_too_large(_error):
+    """
+    Handles uploads larger than MAX_CONTENT_LENGTH.
+
+    Returns:
+        Response: Redirects back to the page the upload was sent from.
+    """
+    flash("Profile picture is too large")
+    return redirect(request.path)
+
+
+def _invalidate_pages_of(post_ids):
+    """
+    Schedules dropping the cached pages showing a user's name or picture next to
+    their posts.
+
+    Args:
+        post_ids (list): The IDs of the user's posts.
+    """
+    schedule_purge(post_ids=post_ids)
+
+
 @users_bp.route("/<name>")
+@replica_reads
 def user(name):
     """Directs to user page."""
     return render_template("users/user.html", name=name)
@@ -189,7 +240,49 @@ def alter_admin(user_id, set_admin=True):
     return redirect(url_for("general.admin"))
 
 
+@users_bp.route("/bulk", methods=["POST"])
+@login_required
+def bulk():
+    """
+    Allows admin users to promote, demote or delete the users selected on the
+    admin page, in one transaction.
+
+    Admins cannot demote or delete themselves this way.
+
+    Returns:
+        Response: Redirects the user back to the same page of the admin page.
+    """
+    if not current_user.is_admin:
+        flash("You don't have permission to alter these users")
+        return redirect(url_for("general.dashboard"))
+
+    form = BulkUsersForm()
+    if not form.validate_on_submit():
+        flash("Select the users to change")
+        return redirect(url_for("general.admin", **request.args))
+    action = form.action.data
+    user_ids = set(form.user_ids.data)
+    if action != "promote" and current_user.id in user_ids:
+        user_ids.discard(current_user.id)
+        flash("You can't remove your own admin privileges or account from here")
+    try:
+        if action == "delete":
+            count, post_ids = delete_users(db.session, list(user_ids))
+            db.session.commit()
+            schedule_purge(post_ids=post_ids)
+            flash(f"Deleted {count} users and {len(post_ids)} posts")
+        else:
+            count = set_admin(db.session, list(user_ids), action == "promote")
+            db.session.commit()
+            flash(f"Admin privileges of {count} users have been updated!")
+    except exc.SQLAlchemyError:
+        db.session.rollback()
+        flash("Something went wrong! Sorry!")
+    return redirect(url_for("general.admin", **request.args))
+
+
 @users_bp.route("/add", methods=["GET", "POST"])
+@rate_limited("signup.ip")
 def add_user():
     """View function for adding a new user.
 
@@ -208,16 +301,13 @@ def add_user():
     if form.validate_on_submit():
         user_to_add = Users.query.filter_by(email=form.email.data).first()
         if user_to_add is None:
-            hashed_password = bcrypt.generate_password_hash(form.password.data).decode(
-                "utf-8"
-            )
             user_to_add = Users(
                 name=form.name.data,
                 username=form.username.data,
                 email=form.email.data,
                 favorite_pizza_place=form.favorite_pizza_place.data,
-                password_hash=hashed_password,
             )
+            user_to_add.password = form.password.data
             try:
                 db.session.add(user_to_add)
                 db.session.commit()
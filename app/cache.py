@@ -0,0 +1,524 @@
+"""
+Module for caching rendered page fragments.
+
+Anonymous readers of the posts feed and of single posts all see the same HTML, so
+the expensive part of those pages (querying the posts and rendering them) is
+rendered once and cached. The surrounding layout is still rendered per request,
+because it contains the reader's CSRF token and flashed messages.
+
+Cache entries are invalidated precisely when posts are written, and every cached
+response carries an ETag so repeat readers can be answered with 304 Not Modified.
+
+Classes:
+    NullCache: Backend that never stores anything.
+    MemoryCache: In-process LRU backend with a TTL and a size limit.
+    FileSystemCache: Backend sharing entries between worker processes through files.
+    PageCache: Flask extension serving cached fragments and invalidating them.
+    UserCache: Flask extension caching the user loaded for each authenticated request.
+    SlugCache: Flask extension mapping post slugs to post IDs.
+
+Configuration:
+    PAGE_CACHE_TYPE: "memory", "filesystem" or "null".
+    PAGE_CACHE_TTL: Seconds an entry stays valid.
+    PAGE_CACHE_MAX_ENTRIES: Maximum number of entries kept.
+    PAGE_CACHE_DIR: Directory used by the filesystem backend (defaults to
+        `<instance_path>/page_cache`).
+    USER_CACHE_TYPE: "memory" to invalidate cached users in the current process
+        only, or "filesystem" to share invalidations between worker processes
+        through files.
+    USER_CACHE_TTL: Seconds a cached user stays valid.
+    USER_CACHE_MAX_ENTRIES: Maximum number of cached users.
+    USER_CACHE_DIR: Directory of the shared invalidations (defaults to
+        `<instance_path>/user_cache`).
+    SLUG_CACHE_TYPE: "memory" to keep slugs in each process, or "filesystem" to
+        share them, and their invalidations, between worker processes.
+    SLUG_CACHE_TTL: Seconds a slug stays mapped. With the memory type this bounds
+        how long other workers can follow a stale slug.
+    SLUG_CACHE_MAX_ENTRIES: Maximum number of cached slugs.
+    SLUG_CACHE_DIR: Directory used by the filesystem type (defaults to
+        `<instance_path>/slug_cache`).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import (
+    current_app,
+    has_app_context,
+    make_response,
+    render_template,
+    request,
+    session,
+)
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, scoped_session
+from .streaming import LazyFragment, stream_page
+
+
+class NullCache:
+    """Cache backend that never stores anything."""
+
+    def get(self, key):
+        """Return the cached value for a key, or None."""
+        return None
+
+    def set(self, key, value):
+        """Store a value under a key."""
+
+    def delete(self, key):
+        """Remove a key."""
+
+
+class MemoryCache:
+    """In-process LRU cache backend with a TTL and a size limit."""
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for a key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set(self, key, value):
+        """Store a value under a key, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class FileSystemCache:
+    """Cache backend storing one JSON file per entry, shared between processes."""
+
+    def __init__(self, directory, max_entries=512, ttl=300):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(
+            self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest()
+        )
+
+    def get(self, key):
+        """Return the cached value for a key, or None if missing or expired."""
+        try:
+            with open(self._path(key), encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if entry["expires"] < time.time():
+            self.delete(key)
+            return None
+        return entry["value"]
+
+    def set(self, key, value):
+        """Store a value under a key, pruning the oldest files when full."""
+        entry = {"expires": time.time() + self.ttl, "value": value}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+            json.dump(entry, cache_file)
+        # Atomic, so other workers never read a partially written entry
+        os.replace(tmp_path, self._path(key))
+        self._prune()
+
+    def delete(self, key):
+        """Remove a key."""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _prune(self):
+        """Remove the least recently written entries beyond max_entries."""
+        names = [name for name in os.listdir(self.directory) if "." not in name]
+        if len(names) <= self.max_entries:
+            return
+        paths = sorted(
+            (os.path.join(self.directory, name) for name in names),
+            key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0,
+        )
+        for path in paths[: len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class PageCache:
+    """Flask extension caching rendered page fragments for anonymous readers."""
+
+    FEED_GENERATION_KEY = "feed:generation"
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the configured cache backend for an application."""
+        cache_type = app.config.get("PAGE_CACHE_TYPE", "memory")
+        ttl = app.config.get("PAGE_CACHE_TTL", 300)
+        max_entries = app.config.get("PAGE_CACHE_MAX_ENTRIES", 512)
+        if cache_type == "memory":
+            backend = MemoryCache(max_entries=max_entries, ttl=ttl)
+        elif cache_type == "filesystem":
+            directory = app.config.get("PAGE_CACHE_DIR") or os.path.join(
+                app.instance_path, "page_cache"
+            )
+            backend = FileSystemCache(directory, max_entries=max_entries, ttl=ttl)
+        elif cache_type == "null":
+            backend = NullCache()
+        else:
+            raise ValueError(f"Unknown PAGE_CACHE_TYPE: {cache_type}")
+        app.extensions["page_cache"] = backend
+
+    @property
+    def backend(self):
+        """The cache backend of the current application."""
+        return current_app.extensions["page_cache"]
+
+    @property
+    def shared(self):
+        """Whether the current application's cache is shared between processes."""
+        return isinstance(self.backend, FileSystemCache)
+
+    @staticmethod
+    def post_key(post_id):
+        """Cache key of a single post's fragment."""
+        return f"post:{post_id}"
+
+    def feed_key(self, after=None, before=None):
+        """Cache key of a page of the feed, scoped to the current feed generation."""
+        generation = self.backend.get(self.FEED_GENERATION_KEY)
+        if generation is None:
+            # Evicted or expired: start a new generation so that no page cached
+            # under an older one can be served again
+            generation = time.time_ns()
+            self.backend.set(self.FEED_GENERATION_KEY, generation)
+        return f"feed:{generation}:{after or ''}:{before or ''}"
+
+    def invalidate_post(self, post_id):
+        """Drop the cached fragment of a single post."""
+        self.backend.delete(self.post_key(post_id))
+
+    def invalidate_feed(self):
+        """Drop every cached feed page by starting a new feed generation."""
+        self.backend.set(self.FEED_GENERATION_KEY, time.time_ns())
+
+    @staticmethod
+    def _cacheable():
+        """Whether the current request sees the same page as any anonymous reader."""
+        return (
+            request.method == "GET"
+            and not current_user.is_authenticated
+            and "_flashes" not in session
+        )
+
+    @staticmethod
+    def _etag(digest):
+        """
+        Build the ETag of a cached page.
+
+        The page embeds a CSRF token that expires, so the ETag also changes every
+        half CSRF time limit to stop a 304 reviving a page with an expired token.
+        """
+        limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+        window = int(time.time() // (limit / 2)) if limit else 0
+        return f"{digest}-{window}"
+
+    def respond(self, key, render_fragment, template, stream=False, **context):
+        """
+        Render a page around a fragment, using the cache for anonymous readers.
+
+        Args:
+            key (str): Cache key of the fragment.
+            render_fragment (callable): Renders the fragment HTML on a cache miss.
+            template (str): Page template, receiving the fragment as `fragment`.
+            stream (bool, optional): Whether to stream the pages of readers that
+                are not served from the cache, rendering the fragment when the
+                page reaches it.
+            **context: Extra context for the page template.
+
+        Returns:
+            Response: The rendered page, or 304 Not Modified if the reader's copy
+            is current.
+        """
+        if not self._cacheable():
+            if stream:
+                return stream_page(
+                    template, fragment=LazyFragment(render_fragment), **context
+                )
+            return render_template(template, fragment=render_fragment(), **context)
+
+        entry = self.backend.get(key)
+        if entry is None:
+            fragment = render_fragment()
+            digest = hashlib.sha1(fragment.encode("utf-8")).hexdigest()
+            entry = {"digest": digest, "html": fragment}
+            self.backend.set(key, entry)
+
+        etag = self._etag(entry["digest"])
+        # Weak comparison, as compression turns the ETag into a weak one
+        if request.if_none_match.contains_weak(etag):
+            response = make_response("", 304)
+        else:
+            response = make_response(
+                render_template(template, fragment=entry["html"], **context)
+            )
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.vary.add("Cookie")
+        return response
+
+
+class UserCache:
+    """
+    Flask extension caching the user loaded for each authenticated request.
+
+    Cached users are detached snapshots of their column values. On a hit the
+    snapshot is merged into the request's session without loading, so the user
+    costs no query but still behaves like a normal session-bound instance.
+
+    The snapshots are kept in each process. With the filesystem type, every
+    user also has a version, stored in a file shared by the worker processes
+    and changed whenever the user is invalidated. Snapshots are cached under
+    their user's version, so an invalidation in one worker (a demoted or deleted
+    user) is seen by every other worker on its next request for that user.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the in-process cache, and the shared versions, for an application."""
+        cache_type = app.config.get("USER_CACHE_TYPE", "memory")
+        ttl = app.config.get("USER_CACHE_TTL", 30)
+        max_entries = app.config.get("USER_CACHE_MAX_ENTRIES", 1024)
+        if cache_type == "filesystem":
+            directory = app.config.get("USER_CACHE_DIR") or os.path.join(
+                app.instance_path, "user_cache"
+            )
+            # Versions outlive the snapshots cached before they changed
+            app.extensions["user_cache_versions"] = FileSystemCache(
+                directory, max_entries=max(max_entries, 4096), ttl=2 * ttl
+            )
+        elif cache_type != "memory":
+            raise ValueError(f"Unknown USER_CACHE_TYPE: {cache_type}")
+        app.extensions["user_cache"] = MemoryCache(max_entries=max_entries, ttl=ttl)
+
+    @property
+    def backend(self):
+        """The cache of the current application."""
+        return current_app.extensions["user_cache"]
+
+    def load(self, session, model, user_id):
+        """
+        Load a user by ID, from the cache when possible.
+
+        Args:
+            session (Session): The session to attach the user to.
+            model (type): The user model class.
+            user_id (int): The ID of the user.
+
+        Returns:
+            object: The user, or None if no user has this ID.
+        """
+        key = self._key(user_id)
+        snapshot = self.backend.get(key)
+        if snapshot is not None:
+            return session.merge(snapshot, load=False)
+        user = session.get(model, user_id)
+        if user is not None:
+            self.backend.set(key, self._snapshot(user))
+        return user
+
+    @staticmethod
+    def _key(user_id):
+        """The cache key of a user, including their shared version if any."""
+        versions = current_app.extensions.get("user_cache_versions")
+        if versions is None:
+            return user_id
+        return (user_id, versions.get(str(user_id)))
+
+    @staticmethod
+    def _snapshot(user):
+        """Copy the column values of a user into a new detached instance."""
+        mapper = inspect(type(user))
+        snapshot = type(user)(
+            **{attr.key: getattr(user, attr.key) for attr in mapper.column_attrs}
+        )
+        make_transient_to_detached(snapshot)
+        return snapshot
+
+    def invalidate(self, user_id, session=None):
+        """
+        Drop a cached user, if the current application has a user cache.
+
+        Args:
+            user_id (int): The ID of the user.
+            session (Session, optional): The session of an uncommitted change
+                to the user. The user is then dropped once it commits, so no
+                request caches the old row again in between.
+        """
+        if isinstance(session, scoped_session):
+            session = session()
+        if session is not None and session.in_transaction():
+            session.info.setdefault(PENDING_USERS_KEY, set()).add(user_id)
+        else:
+            _drop_user(user_id)
+
+    def stats(self):
+        """
+        Hit and miss counters of the current application's cache.
+
+        Returns:
+            dict: The hits, misses and current size of the cache.
+        """
+        backend = self.backend
+        return {"hits": backend.hits, "misses": backend.misses, "size": len(backend)}
+
+
+# Session info key of the users to drop from the cache once the session commits
+PENDING_USERS_KEY = "_invalidated_users"
+
+
+def _drop_user(user_id):
+    """Drop a cached user here, and through its version in every other worker."""
+    if not (has_app_context() and "user_cache" in current_app.extensions):
+        return
+    versions = current_app.extensions.get("user_cache_versions")
+    if versions is not None:
+        versions.set(str(user_id), uuid.uuid4().hex)
+    current_app.extensions["user_cache"].delete(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    """Drop the users changed by a committed transaction from the cache."""
+    for user_id in session.info.pop(PENDING_USERS_KEY, ()):
+        _drop_user(user_id)
+
+
+class SlugCache:
+    """
+    Flask extension mapping post slugs to post IDs.
+
+    Each entry maps a slug, current or previous, to the ID of its post and the
+    post's current slug, so resolving a post URL costs no query on a hit and old
+    slugs can be redirected without one.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the configured cache backend for an application."""
+        cache_type = app.config.get("SLUG_CACHE_TYPE", "memory")
+        ttl = app.config.get("SLUG_CACHE_TTL", 60)
+        max_entries = app.config.get("SLUG_CACHE_MAX_ENTRIES", 4096)
+        if cache_type == "memory":
+            backend = MemoryCache(max_entries=max_entries, ttl=ttl)
+        elif cache_type == "filesystem":
+            directory = app.config.get("SLUG_CACHE_DIR") or os.path.join(
+                app.instance_path, "slug_cache"
+            )
+            backend = FileSystemCache(directory, max_entries=max_entries, ttl=ttl)
+        else:
+            raise ValueError(f"Unknown SLUG_CACHE_TYPE: {cache_type}")
+        app.extensions["slug_cache"] = backend
+
+    @property
+    def backend(self):
+        """The cache of the current application."""
+        return current_app.extensions["slug_cache"]
+
+    def resolve(self, slug, lookup):
+        """
+        Resolve a slug, from the cache when possible.
+
+        Args:
+            slug (str): The slug from the URL.
+            lookup (callable): Returns the `(post_id, current_slug)` of a slug,
+                or None, on a cache miss.
+
+        Returns:
+            tuple: The post ID and current slug, or None if no post has or had
+            this slug.
+        """
+        entry = self.backend.get(slug)
+        if entry is None:
+            entry = lookup(slug)
+            if entry is not None:
+                self.backend.set(slug, entry)
+        # The filesystem backend stores entries as JSON lists
+        return tuple(entry) if entry is not None else None
+
+    def invalidate(self, *slugs, session=None):
+        """
+        Drop cached slugs, if the current application has a slug cache.
+
+        Args:
+            *slugs (str): The slugs.
+            session (Session, optional): The session of an uncommitted change
+                to the slugs. They are then dropped once it commits, so no
+                worker caches the old mapping again in between.
+        """
+        if isinstance(session, scoped_session):
+            session = session()
+        if session is not None and session.in_transaction():
+            session.info.setdefault(PENDING_SLUGS_KEY, set()).update(
+                slug for slug in slugs if slug
+            )
+        else:
+            _drop_slugs(slugs)
+
+
+# Session info key of the slugs to drop from the cache once the session commits
+PENDING_SLUGS_KEY = "_invalidated_slugs"
+
+
+def _drop_slugs(slugs):
+    """Drop cached slugs, if the current application has a slug cache."""
+    if has_app_context() and "slug_cache" in current_app.extensions:
+        for slug in slugs:
+            if slug:
+                current_app.extensions["slug_cache"].delete(slug)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_slugs(session):
+    """Drop the slugs changed by a committed transaction from the cache."""
+    _drop_slugs(session.info.pop(PENDING_SLUGS_KEY, ()))
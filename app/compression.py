@@ -0,0 +1,146 @@
+"""
+Module for compressing responses.
+
+HTML pages are sent uncompressed unless a proxy in front of the app compresses
+them. When enabled, this extension compresses responses whose type is in an
+allowlist with the best encoding the client accepts:
+
+- Buffered responses are compressed in one go, and only if they are at least
+  `COMPRESSION_MIN_SIZE` bytes, below which the encoding overhead is not worth it.
+- Streamed responses are compressed chunk by chunk, flushing the compressor
+  after each chunk so the client still receives each part of the page as soon
+  as it is rendered.
+
+Responses that are already encoded (such as the precompressed static assets),
+sent from files, or marked `no-transform` are left alone.
+
+Classes:
+    Compression: Flask extension compressing responses.
+
+Configuration:
+    COMPRESSION_ENABLED: Whether to compress responses.
+    COMPRESSION_ALGORITHMS: Encodings to use, preferred first ("br", "gzip").
+        Brotli is only used if the `brotli` package is installed.
+    COMPRESSION_MIN_SIZE: Smallest buffered body, in bytes, to compress.
+    COMPRESSION_MIMETYPES: Content types to compress.
+    COMPRESSION_GZIP_LEVEL: gzip compression level (1-9).
+    COMPRESSION_BROTLI_QUALITY: Brotli quality (0-11).
+"""
+
+import gzip
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)
+
+
+def _compress(data, encoding, settings):
+    """Compress a whole body."""
+    if encoding == "br":
+        return brotli.compress(data, quality=settings["brotli_quality"])
+    return gzip.compress(data, compresslevel=settings["gzip_level"], mtime=0)
+
+
+def _compress_stream(chunks, encoding, settings, original):
+    """Compress a stream of chunks, flushing the compressor after each one."""
+    try:
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=settings["brotli_quality"])
+            for chunk in chunks:
+                if chunk:
+                    yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+        else:
+            # wbits of 16 + MAX_WBITS writes a gzip header and trailer
+            compressor = zlib.compressobj(
+                settings["gzip_level"], zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+            for chunk in chunks:
+                if chunk:
+                    yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+    finally:
+        # Release the request context kept by a stream_with_context iterable
+        if hasattr(original, "close"):
+            original.close()
+
+
+class Compression:
+    """Flask extension compressing responses with gzip or Brotli."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the compression hook if compression is enabled."""
+        if not app.config.get("COMPRESSION_ENABLED", False):
+            return
+        algorithms = [
+            algorithm
+            for algorithm in app.config.get("COMPRESSION_ALGORITHMS", ["br", "gzip"])
+            if algorithm == "gzip" or (algorithm == "br" and brotli is not None)
+        ]
+        app.extensions["compression"] = {
+            "algorithms": algorithms,
+            "min_size": app.config.get("COMPRESSION_MIN_SIZE", 500),
+            "mimetypes": set(app.config.get("COMPRESSION_MIMETYPES", DEFAULT_MIMETYPES)),
+            "gzip_level": app.config.get("COMPRESSION_GZIP_LEVEL", 6),
+            "brotli_quality": app.config.get("COMPRESSION_BROTLI_QUALITY", 4),
+        }
+        app.after_request(self._compress_response)
+
+    @staticmethod
+    def _compress_response(response):
+        """Compress a response if its type and the client allow it."""
+        settings = current_app.extensions["compression"]
+        if (
+            response.mimetype not in settings["mimetypes"]
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.cache_control.no_transform
+        ):
+            return response
+        # Whether or not this one is compressed, the body depends on the header
+        response.vary.add("Accept-Encoding")
+        if (
+            request.method == "HEAD"
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+        ):
+            return response
+        encoding = request.accept_encodings.best_match(settings["algorithms"])
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            original = response.response
+            response.response = _compress_stream(
+                response.iter_encoded(), encoding, settings, original
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < settings["min_size"]:
+                return response
+            response.set_data(_compress(data, encoding, settings))
+        response.headers["Content-Encoding"] = encoding
+
+        # The compressed body is a different representation of the same content
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
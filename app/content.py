@@ -0,0 +1,235 @@
+"""
+Module for preparing post bodies for display when they are written.
+
+Posts are written in CKEditor, which submits raw HTML. Rendering that HTML with
+`|safe` trusts anything the author (or anyone posting the form directly) sent,
+and the feed used to render every full body on each page. Instead, whenever a
+post's content changes:
+
+- `body_html` is set to the content passed through an allowlist sanitizer, which
+  keeps the formatting CKEditor produces and drops scripts, event handlers,
+  styles and unsafe URLs.
+- `excerpt` is set to the first few hundred characters of the content's text,
+  which is all the feed shows.
+
+Both are computed once, by a mapper event, instead of on every render. Posts
+written before these columns existed are filled in by `flask content backfill`;
+until then listings compute their excerpts with `fill_excerpts`.
+
+Functions:
+    sanitize_html(html): Keep only allowlisted tags, attributes and URLs.
+    make_excerpt(html, length): Plain text summary of a post body.
+    render_post(content): The body_html and excerpt of a post's content.
+    fill_excerpts(session, posts): Compute the missing excerpts of listed posts.
+
+Attributes:
+    content_cli (AppGroup): The `flask content` command group.
+"""
+
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, inspect, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from .extensions import db, page_cache
+from .models import Posts
+from .search import html_to_text
+
+EXCERPT_LENGTH = 300
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "caption", "code", "div", "em", "figcaption",
+    "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "li", "ol", "p",
+    "pre", "s", "span", "strike", "strong", "sub", "sup", "table", "tbody", "td",
+    "th", "thead", "tr", "u", "ul",
+}  # fmt: skip
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+ALLOWED_SCHEMES = {"", "http", "https", "mailto"}
+VOID_TAGS = {"br", "hr", "img"}
+# Elements dropped together with everything inside them
+DROPPED_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template"}
+
+content_cli = AppGroup("content", help="Maintain the rendered post bodies.")
+
+
+class _Sanitizer(HTMLParser):
+    """HTML parser re-emitting only allowlisted markup."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = ""
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _is_safe_url(value):
+                continue
+            rendered += f' {name}="{escape(value, quote=True)}"'
+        self.parts.append(f"<{tag}{rendered}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        opened = len(self.open_tags)
+        self.handle_starttag(tag, attrs)
+        if len(self.open_tags) > opened:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close any tags left open inside this one
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+
+    def result(self):
+        """The sanitized HTML, with every tag still open closed."""
+        self.close()
+        return "".join(self.parts) + "".join(
+            f"</{tag}>" for tag in reversed(self.open_tags)
+        )
+
+
+def _is_safe_url(url):
+    """Whether a link or image URL uses an allowed scheme."""
+    # Browsers ignore whitespace and control characters inside the scheme
+    cleaned = "".join(char for char in url if char.isprintable() and not char.isspace())
+    return urlparse(cleaned).scheme.lower() in ALLOWED_SCHEMES
+
+
+def sanitize_html(html):
+    """
+    Keep only allowlisted tags, attributes and URLs of an HTML fragment.
+
+    Args:
+        html (str): Untrusted HTML, such as a CKEditor submission.
+
+    Returns:
+        str: HTML that is safe to render unescaped.
+    """
+    sanitizer = _Sanitizer()
+    sanitizer.feed(html or "")
+    return sanitizer.result()
+
+
+def make_excerpt(html, length=EXCERPT_LENGTH):
+    """
+    Summarise a post body as plain text.
+
+    Args:
+        html (str): The post body.
+        length (int, optional): Maximum number of characters.
+
+    Returns:
+        str: The text of the body, cut at a word boundary with an ellipsis if
+        it is longer than `length`.
+    """
+    text = html_to_text(html)
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0] if " " in text[:length] else text[:length]
+    return cut.rstrip(" ,.;:") + "…"
+
+
+def render_post(content):
+    """
+    Compute the display columns of a post body.
+
+    Args:
+        content (str): The post body as written.
+
+    Returns:
+        dict: The `body_html` and `excerpt` of the post.
+    """
+    body_html = sanitize_html(content)
+    # Summarise the sanitized body, so dropped script and style text is left out
+    return {"body_html": body_html, "excerpt": make_excerpt(body_html)}
+
+
+def fill_excerpts(session, posts):
+    """
+    Compute the excerpts of listed posts written before excerpts existed.
+
+    Listings defer the post bodies, so the bodies of the posts without an
+    excerpt are loaded in one query rather than one per post. The excerpts are
+    not saved, which is left to `flask content backfill`.
+
+    Args:
+        session (Session): The session the posts were loaded with.
+        posts (list): The listed posts.
+    """
+    missing = {post.id: post for post in posts if post.excerpt is None}
+    if not missing:
+        return
+    rows = session.execute(
+        select(Posts.id, Posts.content).where(Posts.id.in_(list(missing)))
+    ).all()
+    for row in rows:
+        set_committed_value(
+            missing[row.id], "excerpt", render_post(row.content)["excerpt"]
+        )
+
+
+@event.listens_for(Posts, "before_insert")
+@event.listens_for(Posts, "before_update")
+def _render_post(_mapper, _connection, target):
+    """Recompute the display columns whenever a post's content changes."""
+    content_changed = inspect(target).attrs.content.history.has_changes()
+    if target.body_html is None or content_changed:
+        for key, value in render_post(target.content).items():
+            setattr(target, key, value)
+
+
+@content_cli.command("backfill")
+@click.option("--all", "render_all", is_flag=True, help="Re-render every post.")
+@click.option("--batch-size", default=500, show_default=True)
+def backfill_command(render_all, batch_size):
+    """Render the body and excerpt of posts that have none yet."""
+    count = 0
+    last_id = 0
+    while True:
+        query = select(Posts.id, Posts.content).where(Posts.id > last_id)
+        if not render_all:
+            query = query.where(Posts.body_html.is_(None))
+        with db.engine.begin() as connection:
+            rows = connection.execute(query.order_by(Posts.id).limit(batch_size)).all()
+            if not rows:
+                break
+            connection.execute(
+                update(Posts).where(Posts.id == bindparam("post_id")),
+                [{"post_id": row.id, **render_post(row.content)} for row in rows],
+            )
+        for row in rows:
+            page_cache.invalidate_post(row.id)
+        count += len(rows)
+        last_id = rows[-1].id
+    page_cache.invalidate_feed()
+    click.echo(f"Rendered {count} posts")
@@ -0,0 +1,122 @@
+"""
+Module for maintaining the per-user post counters.
+
+`Users.post_count` and `Users.last_posted_at` are denormalized from the posts
+table so the admin portal and dashboard can show them without counting posts on
+every render. They are kept up to date by mapper events that run in the same
+flush, and so in the same transaction, as the post being written: a post that is
+rolled back never changes the counters.
+
+Writes that bypass the ORM (bulk imports, manual SQL) do not fire the events;
+`flask counters reconcile` rebuilds every counter from the posts table.
+
+Functions:
+    reconcile_post_counters(connection): Recompute every user's counters.
+
+Attributes:
+    counters_cli (AppGroup): The `flask counters` command group.
+"""
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import object_session
+from .extensions import db, user_cache
+from .models import Users, Posts
+
+counters_cli = AppGroup("counters", help="Maintain the per-user post counters.")
+
+
+def _latest_post_of(user_id):
+    """Scalar subquery of a user's newest post date."""
+    return (
+        select(func.max(Posts.date_posted))
+        .where(Posts.poster_id == user_id)
+        .scalar_subquery()
+    )
+
+
+def _count_post(connection, user_id, session):
+    """Add a post to a user's counters."""
+    connection.execute(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(
+            post_count=Users.post_count + 1,
+            last_posted_at=_latest_post_of(user_id),
+        )
+    )
+    # Dropped once the post commits, so no request caches the old counters again
+    user_cache.invalidate(user_id, session)
+
+
+def _uncount_post(connection, user_id, session):
+    """Remove a post from a user's counters."""
+    connection.execute(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(
+            post_count=Users.post_count - 1,
+            last_posted_at=_latest_post_of(user_id),
+        )
+    )
+    user_cache.invalidate(user_id, session)
+
+
+@event.listens_for(Posts, "after_insert")
+def _post_added(_mapper, connection, target):
+    """Count a new post for its poster."""
+    if target.poster_id is not None:
+        _count_post(connection, target.poster_id, object_session(target))
+
+
+@event.listens_for(Posts, "after_delete")
+def _post_deleted(_mapper, connection, target):
+    """Uncount a deleted post from its poster."""
+    if target.poster_id is not None:
+        _uncount_post(connection, target.poster_id, object_session(target))
+
+
+@event.listens_for(Posts, "after_update")
+def _post_moved(_mapper, connection, target):
+    """Move a post's count when its poster changes."""
+    history = inspect(target).attrs.poster_id.history
+    if not history.has_changes():
+        return
+    for old_poster_id in history.deleted:
+        if old_poster_id is not None:
+            _uncount_post(connection, old_poster_id, object_session(target))
+    if target.poster_id is not None:
+        _count_post(connection, target.poster_id, object_session(target))
+
+
+def reconcile_post_counters(connection):
+    """
+    Recompute every user's post counters from the posts table.
+
+    Args:
+        connection (Connection): The connection to run the update on.
+
+    Returns:
+        int: The number of users whose counters were out of date.
+    """
+    count = (
+        select(func.count(Posts.id)).where(Posts.poster_id == Users.id).scalar_subquery()
+    )
+    latest = _latest_post_of(Users.id)
+    result = connection.execute(
+        update(Users)
+        .where(
+            (Users.post_count != count) | Users.last_posted_at.is_distinct_from(latest)
+        )
+        .values(post_count=count, last_posted_at=latest)
+    )
+    return result.rowcount
+
+
+@counters_cli.command("reconcile")
+def reconcile_command():
+    """Rebuild the post counters of every user from the posts table."""
+    with db.engine.begin() as connection:
+        fixed = reconcile_post_counters(connection)
+    click.echo(f"Reconciled post counters of {fixed} users")
@@ -0,0 +1,80 @@
+"""
+Module for tuning the database connections of the application.
+
+SQLite's default rollback journal lets a single writer block every reader, so
+concurrent requests that add or edit posts make the feed stall and can fail with
+"database is locked". Every new SQLite connection is therefore switched to
+write-ahead logging, where readers see the last committed state while a write is
+in progress, with `synchronous=NORMAL` (safe in WAL mode), memory-mapped reads and
+a busy timeout so writers queue for the lock instead of failing immediately.
+
+Postgres connections get a statement timeout, so a runaway query cannot pin a
+worker and a pooled connection indefinitely.
+
+Pool sizing, recycling and pre-ping are set per configuration through Flask-
+SQLAlchemy's `SQLALCHEMY_ENGINE_OPTIONS`.
+
+Functions:
+    tune_engine(engine, sqlite_pragmas, statement_timeout_ms): Register the connect
+        hook of an engine.
+
+Classes:
+    DatabaseTuning: Flask extension tuning every engine of an application.
+
+Configuration:
+    SQLITE_PRAGMAS: Pragmas run on each new SQLite connection, in order.
+    POSTGRES_STATEMENT_TIMEOUT_MS: Statement timeout of Postgres connections
+        (0 disables it).
+"""
+
+from sqlalchemy import event
+
+
+def tune_engine(engine, sqlite_pragmas=None, statement_timeout_ms=0):
+    """
+    Register a hook configuring every new connection of an engine.
+
+    Args:
+        engine (Engine): The engine to tune.
+        sqlite_pragmas (dict, optional): Pragmas for SQLite connections.
+        statement_timeout_ms (int, optional): Statement timeout for Postgres
+            connections, in milliseconds.
+    """
+    dialect = engine.dialect.name
+    if dialect == "sqlite" and sqlite_pragmas:
+        statements = [f"PRAGMA {name}={value}" for name, value in sqlite_pragmas.items()]
+    elif dialect == "postgresql" and statement_timeout_ms:
+        statements = [f"SET statement_timeout = {int(statement_timeout_ms)}"]
+    else:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _configure_connection(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+        if dialect == "postgresql":
+            # Leave the connection outside the transaction SET implicitly began
+            dbapi_connection.commit()
+
+
+class DatabaseTuning:
+    """Flask extension tuning the connections of every engine of an application."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the connect hooks. Must be called after the SQLAlchemy extension
+        is initialised and before any connection is opened.
+        """
+        pragmas = app.config.get("SQLITE_PRAGMAS")
+        timeout = app.config.get("POSTGRES_STATEMENT_TIMEOUT_MS", 0)
+        with app.app_context():
+            for engine in app.extensions["sqlalchemy"].engines.values():
+                tune_engine(engine, pragmas, timeout)
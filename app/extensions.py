@@ -3,10 +3,23 @@ This module includes the initialization of various Flask extensions required for
 
 - Bcrypt: For password hashing.
 - SQLAlchemy: For database ORM.
-- Migrate: For database migrations.
+- LazyMigrate: For database migrations, loading Flask-Migrate on first use.
 - LoginManager: For user session management.
 - MetaData: For defining the naming convention for SQLAlchemy.
-- CKEditor: For integrating a rich text editor.
+- LazyCKEditor: For integrating a rich text editor, loading Flask-CKEditor on first use.
+- PageCache: For caching rendered pages served to anonymous readers.
+- UserCache: For caching the user loaded on each authenticated request.
+- SlugCache: For resolving post slugs to post IDs without a query.
+- PasswordHasher: For hashing passwords on a bounded process pool.
+- ImagePipeline: For storing uploaded pictures and serving their variants.
+- JobQueue: For running the side effects of writes in the background.
+- AssetManifest: For fingerprinting and long-lived caching of static assets.
+- DatabaseTuning: For WAL mode and timeouts on new database connections.
+- AsyncDatabase: For the async engine queried by async views.
+- ReadReplicas: For sending the queries of read-only views to read replicas.
+- Instrumentation: For per-request timings, Server-Timing headers and metrics.
+- RateLimiter: For rate limiting logins, sign-ups and searches.
+- Compression: For gzip and Brotli compression of responses.
 
 The SQLAlchemy MetaData is initialized with a custom naming convention
 for database constraints and indexes.
@@ -14,14 +27,24 @@ for database constraints and indexes.
 
 from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from sqlalchemy import MetaData
-from flask_ckeditor import CKEditor
+from .assets import AssetManifest
+from .async_database import AsyncDatabase
+from .cache import PageCache, SlugCache, UserCache
+from .compression import Compression
+from .database import DatabaseTuning
+from .hashing import PasswordHasher
+from .images import ImagePipeline
+from .instrumentation import Instrumentation
+from .jobs import JobQueue
+from .lazy import LazyCKEditor, LazyMigrate
+from .ratelimit import RateLimiter
+from .replicas import ReadReplicas, RoutingSession
 
 # SQLAlchemy metadata naming convention
 convention = {
-    "ix": "ix_%(column_0_label)s",
+    "ix": "ix_%(table_name)s_%(column_0_N_name)s",
     "uq": "uq_%(table_name)s_%(column_0_name)s",
     "ck": "ck_%(table_name)s_%(constraint_name)s",
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
@@ -32,8 +55,23 @@ convention = {
 metadata = MetaData(naming_convention=convention)
 
 # Initialize Flask extensions
-db = SQLAlchemy(metadata=metadata)  # Database ORM
-migrate = Migrate(render_as_batch=True)  # Database migrations
+db = SQLAlchemy(
+    metadata=metadata, session_options={"class_": RoutingSession}
+)  # Database ORM
+migrate = LazyMigrate(render_as_batch=True)  # Database migrations
+db_tuning = DatabaseTuning()  # Connection pragmas and timeouts
+async_db = AsyncDatabase()  # Async engine of async views
+read_replicas = ReadReplicas()  # Replica routing of read-only views
 bcrypt = Bcrypt()  # Password hashing
 login_manager = LoginManager()  # User session management
-ckEditor = CKEditor()  # Rich text editor
+ckEditor = LazyCKEditor()  # Rich text editor
+page_cache = PageCache()  # Rendered page cache
+user_cache = UserCache()  # Logged-in user cache
+slug_cache = SlugCache()  # Post slug lookups
+password_hasher = PasswordHasher()  # Off-thread password hashing
+image_pipeline = ImagePipeline()  # Profile picture storage and resizing
+job_queue = JobQueue()  # Background jobs
+asset_manifest = AssetManifest()  # Fingerprinted static assets
+instrumentation = Instrumentation()  # Request timings and metrics
+rate_limiter = RateLimiter()  # Login, sign-up and search rate limits
+compression = Compression()  # Response compression
@@ -11,14 +11,18 @@ Classes:
     - NamerForm: Form for asking user's name.
     - PasswordForm: Form for asking user's email and password.
     - UserForm: Form for creating or editing a user.
+    - UserFilterForm: Form for filtering the users of the admin page.
+    - BulkUsersForm: Form for changing the users selected on the admin page.
 
 Packages:
     - FlaskForm: Base class for forms in Flask-WTF.
     - StringField: Field for string input.
     - SubmitField: Field for submit button.
     - PasswordField: Field for password input.
-    - CKEditorField: Field for CKEditor input.
+    - TextAreaField: Field for multi-line input, shown as a CKEditor on editor pages.
     - FileField: Field for file input.
+    - SelectField: Field for choosing one option.
+    - SelectMultipleField: Field for choosing several options.
     - DataRequired: Validator to ensure data is provided.
     - Email: Validator to ensure data is a valid email address.
     - EqualTo: Validator to ensure data is equal to another field.
@@ -27,9 +31,28 @@ Packages:
 
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField
-from wtforms import StringField, SubmitField, PasswordField
+from wtforms import (
+    StringField,
+    SubmitField,
+    PasswordField,
+    TextAreaField,
+    SelectField,
+    SelectMultipleField,
+)
 from wtforms.validators import DataRequired, Email, EqualTo
-from flask_ckeditor import CKEditorField
+from wtforms.widgets import TextArea
+
+
+class EditorTextArea(TextArea):
+    """
+    Text area marked for CKEditor, like Flask-CKEditor's field, without
+    importing Flask-CKEditor with the forms.
+    """
+
+    def __call__(self, field, **kwargs):
+        css_class = kwargs.pop("class", "") or kwargs.pop("class_", "")
+        kwargs["class"] = f"ckeditor {css_class}"
+        return super().__call__(field, **kwargs)
 
 
 class LoginForm(FlaskForm):
@@ -44,7 +67,7 @@ class PostForm(FlaskForm):
     """Form for creating or editing a post"""
 
     title = StringField("Title", validators=[DataRequired()])
-    content = CKEditorField("Content", validators=[DataRequired()])
+    content = TextAreaField("Content", validators=[DataRequired()], widget=EditorTextArea())
     author = StringField("Author")
     slug = StringField("Slug", validators=[DataRequired()])
     submit = SubmitField("Submit")
@@ -89,3 +112,36 @@ class UserForm(FlaskForm):
     password2 = PasswordField("Confirm Password", validators=[DataRequired()])
     profile_pic = FileField("Profile Pic")
     submit = SubmitField("Submit")
+
+
+class UserFilterForm(FlaskForm):
+    """Form for filtering the users of the admin page, submitted as query arguments"""
+
+    class Meta:
+        """Filtering changes nothing, so it needs no CSRF token"""
+
+        csrf = False
+
+    q = StringField("Name, username or email")
+    role = SelectField(
+        "Role", choices=[("", "Everyone"), ("admin", "Admins"), ("user", "Users")]
+    )
+    submit = SubmitField("Filter")
+
+
+class BulkUsersForm(FlaskForm):
+    """Form for promoting, demoting or deleting the users selected on the admin page"""
+
+    # The checkboxes are rendered by the admin page's table, one per user
+    user_ids = SelectMultipleField(
+        "Users", coerce=int, validate_choice=False, validators=[DataRequired()]
+    )
+    action = SelectField(
+        "Action",
+        choices=[
+            ("promote", "Grant admin privileges"),
+            ("demote", "Revoke admin privileges"),
+            ("delete", "Delete users and their posts"),
+        ],
+    )
+    submit = SubmitField("Apply to selected")
@@ -0,0 +1,182 @@
+"""
+Module for hashing and checking passwords off the request thread.
+
+A bcrypt hash or check takes hundreds of milliseconds of CPU. Running it inline
+pins the worker for that long, and concurrent logins on a threaded worker compete
+for the same cores. Hashing is instead handed to a bounded process pool, so the
+number of hashes running at once never exceeds the pool size. The pool's
+processes are started by a fork server (or spawned where there is none) rather
+than forked from the worker, whose other threads may hold locks the child
+would inherit forever.
+
+The bcrypt cost is configurable, and hashes made with a different cost than the
+configured one are reported by `needs_rehash` so they can be upgraded at login.
+
+Classes:
+    HashingService: Hashes and checks passwords, inline or on a process pool.
+    PasswordHasher: Flask extension creating a HashingService per application.
+
+Configuration:
+    BCRYPT_LOG_ROUNDS: The bcrypt cost factor for new hashes.
+    BCRYPT_POOL_SIZE: Number of hashing processes. 0 hashes inline on the calling
+        thread.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt as _bcrypt
+from flask import current_app
+
+
+def _hash_password(password, rounds):
+    """Hash a password with the given cost. Runs in the pool's processes."""
+    return _bcrypt.hashpw(password.encode("utf-8"), _bcrypt.gensalt(rounds)).decode(
+        "utf-8"
+    )
+
+
+def _check_password(password_hash, password):
+    """Check a password against a hash. Runs in the pool's processes."""
+    return _bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+def _pool_context():
+    """The start method of the pool's processes, which never forks the caller."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def hash_cost(password_hash):
+    """
+    Read the cost factor out of a bcrypt hash.
+
+    Args:
+        password_hash (str): A hash such as "$2b$12$...".
+
+    Returns:
+        int: The cost factor, or None if the hash is not a bcrypt hash.
+    """
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class HashingService:
+    """Hashes and checks passwords, inline or on a bounded process pool."""
+
+    def __init__(self, rounds=12, pool_size=0):
+        self.rounds = rounds
+        self.pool_size = pool_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """Return the process pool, creating it on first use."""
+        if self._pool is None:
+            with self._lock:
+                # Created on first use, so each forked worker gets its own pool
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.pool_size, mp_context=_pool_context()
+                    )
+        return self._pool
+
+    def _run(self, func, *args):
+        """Run a hashing function inline or on the pool and wait for its result."""
+        if not self.pool_size:
+            return func(*args)
+        return self._get_pool().submit(func, *args).result()
+
+    def hash(self, password):
+        """
+        Hash a password with the configured cost.
+
+        Args:
+            password (str): The plain text password.
+
+        Returns:
+            str: The bcrypt hash.
+        """
+        return self._run(_hash_password, password, self.rounds)
+
+    def hash_many(self, passwords):
+        """
+        Hash many passwords, spread over every process of the pool.
+
+        Args:
+            passwords (list): The plain text passwords.
+
+        Returns:
+            list: The bcrypt hashes, in the same order.
+        """
+        rounds = [self.rounds] * len(passwords)
+        if not self.pool_size:
+            return list(map(_hash_password, passwords, rounds))
+        chunksize = max(1, len(passwords) // (self.pool_size * 4))
+        return list(
+            self._get_pool().map(_hash_password, passwords, rounds, chunksize=chunksize)
+        )
+
+    def check(self, password_hash, password):
+        """
+        Check a password against a hash.
+
+        Args:
+            password_hash (str): The stored bcrypt hash.
+            password (str): The plain text password.
+
+        Returns:
+            bool: Whether the password matches.
+        """
+        if not password_hash:
+            return False
+        return self._run(_check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a hash was made with a different cost than the configured one."""
+        return hash_cost(password_hash) != self.rounds
+
+    def shutdown(self):
+        """Stop the process pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class PasswordHasher:
+    """Flask extension creating a HashingService for each application."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the hashing service configured for an application."""
+        app.extensions["password_hasher"] = HashingService(
+            rounds=app.config.get("BCRYPT_LOG_ROUNDS", 12),
+            pool_size=app.config.get("BCRYPT_POOL_SIZE", 0),
+        )
+
+    @property
+    def service(self):
+        """The hashing service of the current application."""
+        return current_app.extensions["password_hasher"]
+
+    def hash(self, password):
+        """Hash a password with the current application's service."""
+        return self.service.hash(password)
+
+    def hash_many(self, passwords):
+        """Hash many passwords with the current application's service."""
+        return self.service.hash_many(passwords)
+
+    def check(self, password_hash, password):
+        """Check a password with the current application's service."""
+        return self.service.check(password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a hash should be upgraded to the configured cost."""
+        return self.service.needs_rehash(password_hash)
@@ -0,0 +1,184 @@
+"""
+Module for storing uploaded profile pictures and generating their resized variants.
+
+Uploads are streamed to disk in fixed-size chunks while being hashed, and named
+after their content hash, so uploading the same picture twice stores it once.
+Resized WebP variants used by the dashboard and post pages are generated by a
+background job (see app.tasks) so the request does not wait for them; until a
+variant exists, pages fall back to the original upload.
+
+Generating variants needs Pillow. Without it, only the original upload is used.
+
+Classes:
+    ImagePipeline: Flask extension storing uploads and serving their variants.
+
+Functions:
+    save_upload(file_storage, folder): Stream an upload to disk under its content hash.
+    make_variants(path): Write the resized WebP variants of a stored picture.
+    variant_name(filename, size): Name of the variant of a picture at a given size.
+    upload_folder(app): Absolute path of an application's upload folder.
+
+Configuration:
+    UPLOAD_FOLDER: Folder of the uploaded pictures, relative to the application
+        package like the static folder, or absolute.
+    MAX_CONTENT_LENGTH: Largest accepted request body, in bytes.
+"""
+
+import hashlib
+import os
+import tempfile
+from flask import current_app, url_for
+from werkzeug.utils import secure_filename
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+CHUNK_SIZE = 64 * 1024
+
+# Square sizes, in pixels, of the variants generated for every picture
+VARIANT_SIZES = (100, 150)
+
+
+def upload_folder(app=None):
+    """
+    Absolute path of an application's upload folder, whatever the working
+    directory.
+
+    Args:
+        app (Flask, optional): The application; defaults to the current one.
+
+    Returns:
+        str: The upload folder.
+    """
+    app = app or current_app
+    return os.path.join(app.root_path, app.config["UPLOAD_FOLDER"])
+
+
+def variant_name(filename, size):
+    """
+    Name of the variant of a picture at a given size.
+
+    Args:
+        filename (str): Name of the original picture.
+        size (int): Width and height of the variant.
+
+    Returns:
+        str: The variant's file name.
+    """
+    stem, _ = os.path.splitext(filename)
+    return f"{stem}_{size}.webp"
+
+
+def save_upload(file_storage, folder):
+    """
+    Stream an upload to disk under its content hash.
+
+    Args:
+        file_storage (FileStorage): The uploaded file.
+        folder (str): The directory to store pictures in.
+
+    Returns:
+        str: The stored file name.
+
+    Raises:
+        ValueError: If the file's extension is not an allowed image type.
+    """
+    _, ext = os.path.splitext(secure_filename(file_storage.filename or ""))
+    ext = ext.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Unsupported image type: {ext or 'none'}")
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        filename = digest.hexdigest()[:32] + ext
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+
+def make_variants(path):
+    """
+    Write the resized WebP variants of a stored picture, skipping existing ones.
+
+    Args:
+        path (str): Path of the stored picture.
+    """
+    try:
+        # Imported here, as only the background jobs generating variants need it
+        from PIL import Image
+    except ImportError:  # pragma: no cover - Pillow is optional
+        return
+    folder, filename = os.path.split(path)
+    missing = [
+        size
+        for size in VARIANT_SIZES
+        if not os.path.exists(os.path.join(folder, variant_name(filename, size)))
+    ]
+    if not missing:
+        return
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        for size in missing:
+            variant = image.copy()
+            variant.thumbnail((size, size))
+            fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".webp")
+            with os.fdopen(fd, "wb") as out:
+                variant.save(out, "WEBP", quality=85)
+            os.replace(tmp_path, os.path.join(folder, variant_name(filename, size)))
+
+
+class ImagePipeline:
+    """Flask extension storing uploaded pictures and serving their variants."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the template helper."""
+        app.add_template_global(self.picture_url)
+
+    @staticmethod
+    def save(file_storage):
+        """
+        Store an uploaded picture. Its variants are generated by the
+        `make_picture_variants` job.
+
+        Args:
+            file_storage (FileStorage): The uploaded file.
+
+        Returns:
+            str: The stored file name.
+        """
+        return save_upload(file_storage, upload_folder())
+
+    @staticmethod
+    def picture_url(filename, size):
+        """
+        URL of a picture's variant at a given size, or of the original until the
+        variant has been generated.
+
+        Args:
+            filename (str): Name of the stored picture.
+            size (int): Width and height of the wanted variant.
+
+        Returns:
+            str: The picture's URL.
+        """
+        variant = variant_name(filename, size)
+        if os.path.exists(os.path.join(upload_folder(), variant)):
+            filename = variant
+        return url_for("static", filename="images/" + filename)
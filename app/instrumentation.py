@@ -0,0 +1,345 @@
+"""
+Module for timing requests and exposing the measurements.
+
+Every request records its wall time, the number and total duration of its SQL
+statements (through SQLAlchemy engine events) and the time spent rendering each
+template. The timings are returned to the client in a `Server-Timing` header,
+which browser developer tools show next to the request, and are aggregated into
+Prometheus counters and histograms served from a `/metrics` endpoint. The
+headers of a streamed page are sent before its body renders, so its header only
+covers the time until streaming starts, while its metrics cover the whole body.
+
+A sample of requests can also be run under cProfile; the profile of any sampled
+request slower than a threshold is dumped to a directory for later inspection
+with `python -m pstats` or snakeviz.
+
+Classes:
+    MetricsRegistry: Thread-safe counters and histograms in Prometheus text format.
+    Instrumentation: Flask extension recording and exposing per-request timings.
+
+Configuration:
+    INSTRUMENTATION_ENABLED: Whether requests are timed at all.
+    SERVER_TIMING_HEADER: Whether responses carry a Server-Timing header.
+    METRICS_PATH: URL of the Prometheus endpoint, or None for no endpoint. It is
+        unauthenticated, so in production it should only be reachable internally.
+    PROFILE_SAMPLE_RATE: Fraction (0-1) of requests run under cProfile.
+    PROFILE_SLOW_MS: Profiles of requests at least this slow are dumped.
+    PROFILE_DIR: Directory the profiles are dumped to (defaults to
+        `<instance_path>/profiles`).
+"""
+
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from flask import Response, current_app, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    """Render a sorted tuple of (name, value) pairs as a Prometheus label set."""
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms rendered in Prometheus text format."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        """Set the help text of a metric."""
+        self._help[name] = help_text
+
+    def inc(self, name, amount=1, **labels):
+        """Add to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record a sample in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def value(self, name, **labels):
+        """Return the current value of a counter, or the count of a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key in self._histograms:
+                return self._histograms[key][1]
+            return self._counters.get(key, 0)
+
+    def render(self, gauges=None):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Args:
+            gauges (dict, optional): Extra gauges, mapping a name to a value.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (counts, count, total) in histograms:
+            header(name, "histogram")
+            for bound, bucket_count in zip(self.buckets, counts):
+                bucket_labels = _format_labels(labels + (("le", bound),))
+                lines.append(f"{name}_bucket{bucket_labels} {bucket_count}")
+            bucket_labels = _format_labels(labels + (("le", "+Inf"),))
+            lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        for name, value in sorted((gauges or {}).items()):
+            header(name, "gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """Timings collected during one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.templates = []
+        self.rendering = []
+        self.profiler = None
+        self.status = None
+        self.endpoint = None
+        self.method = None
+        self.path = None
+
+
+class Instrumentation:
+    """Flask extension recording per-request timings and exposing them."""
+
+    def __init__(self, app=None):
+        self._profile_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the request hooks, engine events and metrics endpoint.
+
+        Must be called after the SQLAlchemy and async database extensions are
+        initialised, whose engines are instrumented.
+        """
+        if not app.config.get("INSTRUMENTATION_ENABLED", True):
+            return
+        registry = MetricsRegistry()
+        registry.describe("http_requests_total", "Requests handled.")
+        registry.describe("http_request_duration_seconds", "Request wall time.")
+        registry.describe("db_statements_total", "SQL statements executed.")
+        registry.describe("db_duration_seconds", "SQL time per request.")
+        registry.describe("template_render_seconds", "Template render time.")
+        app.extensions["instrumentation"] = registry
+
+        with app.app_context():
+            engines = list(app.extensions["sqlalchemy"].engines.values())
+            if "async_database" in app.extensions:
+                engines.append(app.extensions["async_database"].sync_engine)
+                for replica in app.extensions["async_database_replicas"].values():
+                    engines.append(replica.sync_engine)
+            for engine in engines:
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        before_render_template.connect(_before_render_template, app)
+        template_rendered.connect(_template_rendered, app)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._abandon_request)
+
+        metrics_path = app.config.get("METRICS_PATH", "/metrics")
+        if metrics_path:
+            app.add_url_rule(metrics_path, "metrics", self.metrics_view)
+
+    @property
+    def registry(self):
+        """The metrics registry of the current application."""
+        return current_app.extensions["instrumentation"]
+
+    def _start_request(self):
+        """Start timing a request, under cProfile if it is sampled."""
+        g._timings = timings = RequestTimings()
+        rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+        # Only one profiler can be active per process, so overlapping samples are skipped
+        if rate and random.random() < rate and self._profile_lock.acquire(blocking=False):
+            timings.profiler = cProfile.Profile()
+            timings.profiler.enable()
+
+    def _finish_request(self, response):
+        """
+        Add the Server-Timing header and record the request's timings.
+
+        A streamed page renders, and runs most of its queries, after this hook.
+        Its header only covers the time until streaming starts, and its timings
+        are recorded when the server closes the response, after the body is sent.
+        """
+        timings = g.get("_timings")
+        if timings is None:
+            return response
+        if current_app.config.get("SERVER_TIMING_HEADER", True):
+            response.headers["Server-Timing"] = _server_timing(
+                timings, time.perf_counter() - timings.started
+            )
+        timings.status = response.status_code
+        timings.endpoint = request.endpoint or "unmatched"
+        timings.method = request.method
+        timings.path = request.path
+        app = current_app._get_current_object()
+        if response.is_streamed:
+            # The body renders with the request's `g`, so the timings stay there
+            response.call_on_close(lambda: self._record(app, timings))
+        else:
+            g.pop("_timings")
+            self._record(app, timings)
+        return response
+
+    def _abandon_request(self, _error):
+        """Stop the profiler of a request that ended without a response."""
+        timings = g.get("_timings")
+        if timings is not None and timings.status is None:
+            g.pop("_timings")
+            if timings.profiler is not None:
+                timings.profiler.disable()
+                self._profile_lock.release()
+
+    def _record(self, app, timings):
+        """Add a finished request's timings to the metrics."""
+        elapsed = time.perf_counter() - timings.started
+        if timings.profiler is not None:
+            timings.profiler.disable()
+            self._profile_lock.release()
+            if elapsed * 1000 >= app.config.get("PROFILE_SLOW_MS", 500):
+                self._dump_profile(app, timings, elapsed)
+
+        endpoint = timings.endpoint
+        registry = app.extensions["instrumentation"]
+        registry.inc(
+            "http_requests_total",
+            endpoint=endpoint,
+            method=timings.method,
+            status=timings.status,
+        )
+        registry.observe("http_request_duration_seconds", elapsed, endpoint=endpoint)
+        registry.inc("db_statements_total", timings.sql_count, endpoint=endpoint)
+        registry.observe("db_duration_seconds", timings.sql_time, endpoint=endpoint)
+        for name, duration in timings.templates:
+            registry.observe("template_render_seconds", duration, template=name)
+
+    @staticmethod
+    def _dump_profile(app, timings, elapsed):
+        """Write a slow request's profile to the profile directory."""
+        directory = app.config.get("PROFILE_DIR") or os.path.join(
+            app.instance_path, "profiles"
+        )
+        os.makedirs(directory, exist_ok=True)
+        endpoint = re.sub(r"[^\w.-]", "_", timings.endpoint)
+        filename = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{endpoint}-{elapsed * 1000:.0f}ms.prof"
+        )
+        timings.profiler.dump_stats(os.path.join(directory, filename))
+        app.logger.info("Profiled slow request %s to %s", timings.path, filename)
+
+    def metrics_view(self):
+        """Serve the metrics in the Prometheus text format."""
+        gauges = {}
+        for name in ("page_cache", "user_cache", "slug_cache"):
+            backend = current_app.extensions.get(name)
+            if hasattr(backend, "hits"):
+                gauges[f"{name}_hits"] = backend.hits
+                gauges[f"{name}_misses"] = backend.misses
+                gauges[f"{name}_entries"] = len(backend)
+        return Response(
+            self.registry.render(gauges), mimetype="text/plain; version=0.0.4"
+        )
+
+
+def _server_timing(timings, elapsed):
+    """Format a request's timings as a Server-Timing header value."""
+    metrics = [
+        f"app;dur={elapsed * 1000:.2f}",
+        f'db;dur={timings.sql_time * 1000:.2f};desc="{timings.sql_count} queries"',
+    ]
+    for name, duration in timings.templates:
+        metrics.append(f'tpl;dur={duration * 1000:.2f};desc="{name}"')
+    return ", ".join(metrics)
+
+
+def _current_timings():
+    """The timings of the request being handled, if any."""
+    if has_request_context():
+        return g.get("_timings")
+    return None
+
+
+def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _many):
+    """Note when a statement starts."""
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, _cursor, _statement, _parameters, _context, _many):
+    """Add a finished statement to the current request's timings."""
+    started = conn.info["_query_started"].pop()
+    timings = _current_timings()
+    if timings is not None:
+        timings.sql_count += 1
+        timings.sql_time += time.perf_counter() - started
+
+
+def _before_render_template(_app, template, **_extra):
+    """Note when a template starts rendering."""
+    timings = _current_timings()
+    if timings is not None:
+        timings.rendering.append(time.perf_counter())
+
+
+def _template_rendered(_app, template, **_extra):
+    """Add a rendered template to the current request's timings."""
+    timings = _current_timings()
+    if timings is not None and timings.rendering:
+        duration = time.perf_counter() - timings.rendering.pop()
+        timings.templates.append((template.name or "<string>", duration))
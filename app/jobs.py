@@ -0,0 +1,411 @@
+"""
+Module for running the side effects of writes in the background.
+
+Views writing posts and users enqueue their side effects (purging cached pages,
+resizing pictures) as jobs instead of running them before responding. A job is
+a row of the `jobs` table naming a registered function and its arguments, so
+it survives restarts and is shared by every process using the database. Jobs
+are run by worker threads started in the web process (`JOB_WORKERS`), by
+`flask jobs work` running on its own, or both.
+
+- Retries: a job that raises is retried after `JOB_RETRY_DELAY` seconds, doubled
+  on each attempt, and marked failed after `JOB_MAX_ATTEMPTS` attempts.
+- Idempotency keys: enqueuing a job under a key that was already used does
+  nothing, so the same side effect is not queued twice.
+- Bounded concurrency: each process runs at most as many jobs at a time as it
+  has worker threads. Workers claim a job with a conditional update, so any
+  number of them can share the table.
+- A job whose worker died is claimed again after `JOB_TIMEOUT` seconds, so jobs
+  may run more than once and must be safe to repeat.
+
+Jobs run in the process that claims them, so cached pages are only purged from
+a job when the page cache is shared between processes (`PAGE_CACHE_TYPE =
+"filesystem"`); a per-process cache is purged by the writing request instead
+(see `tasks.schedule_purge`).
+
+Classes:
+    JobRunner: Enqueues jobs and runs them for one application.
+    JobQueue: Flask extension creating a JobRunner for each application.
+
+Functions:
+    job(name): Decorator registering a function as a job.
+
+Attributes:
+    jobs_cli (AppGroup): The `flask jobs` command group.
+
+Configuration:
+    JOBS_EAGER: Run jobs as soon as they are enqueued, inside the request.
+    JOB_WORKERS: Worker threads started in each web process on the first
+        enqueue (0 leaves the jobs to `flask jobs work`).
+    JOB_MAX_ATTEMPTS: Attempts before a job is marked failed.
+    JOB_RETRY_DELAY: Seconds before the first retry of a failed job.
+    JOB_TIMEOUT: Seconds after which a running job is assumed lost and claimed again.
+    JOB_POLL_INTERVAL: Seconds an idle worker waits before looking for jobs again.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.functions import count
+
+jobs_cli = AppGroup("jobs", help="Run and inspect background jobs.")
+
+# Registered job functions, by name
+JOBS = {}
+
+
+def job(name):
+    """
+    Decorator registering a function as a job.
+
+    The function is called with the keyword arguments given to `enqueue`, which
+    must be JSON serialisable, inside an application context.
+
+    Args:
+        name (str): Name stored with each enqueued job; must stay stable while
+            jobs of that name may be queued.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def register(func):
+        func.job_name = name
+        JOBS[name] = func
+        return func
+
+    return register
+
+
+def _now():
+    """The current UTC time, naive like the stored timestamps."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _jobs_table():
+    """The jobs table."""
+    # Imported here as the models import the extensions, which import this module
+    from .models import Jobs
+
+    return Jobs.__table__
+
+
+class JobRunner:
+    """
+    Enqueues jobs and runs them for one application.
+
+    Args:
+        app (Flask): The application whose database holds the jobs.
+        eager (bool): Whether to run jobs as soon as they are enqueued.
+        workers (int): Worker threads started in-process on the first enqueue.
+        max_attempts (int): Attempts before a job is marked failed.
+        retry_delay (float): Seconds before the first retry.
+        timeout (float): Seconds after which a running job is claimed again.
+        poll_interval (float): Seconds an idle worker waits between checks.
+    """
+
+    def __init__(
+        self, app, eager, workers, max_attempts, retry_delay, timeout, poll_interval
+    ):
+        self.app = app
+        self.eager = eager
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._started_pid = None
+
+    @property
+    def engine(self):
+        """The engine of the primary database."""
+        return self.app.extensions["sqlalchemy"].engine
+
+    def enqueue(self, func, key=None, delay=0, **kwargs):
+        """
+        Enqueue a job.
+
+        Args:
+            func (callable): A function registered with `job`.
+            key (str, optional): Idempotency key; the job is not enqueued if a
+                job was already enqueued under the same key.
+            delay (float, optional): Seconds to wait before running the job.
+            **kwargs: Keyword arguments of the job.
+
+        Returns:
+            int: The ID of the enqueued job, or None if it was run eagerly or its
+            key was already used.
+        """
+        if self.eager:
+            func(**kwargs)
+            return None
+        now = _now()
+        try:
+            with self.engine.begin() as connection:
+                job_id = connection.execute(
+                    insert(_jobs_table()).values(
+                        name=func.job_name,
+                        payload=json.dumps(kwargs),
+                        idempotency_key=key,
+                        status="queued",
+                        attempts=0,
+                        max_attempts=self.max_attempts,
+                        run_at=now + timedelta(seconds=delay),
+                        created_at=now,
+                    )
+                ).inserted_primary_key[0]
+        except IntegrityError:
+            return None
+        self._start_workers()
+        self._wakeup.set()
+        return job_id
+
+    def _claimable(self, now):
+        """Condition matching the jobs a worker may claim."""
+        table = _jobs_table()
+        return or_(
+            and_(table.c.status == "queued", table.c.run_at <= now),
+            and_(
+                table.c.status == "running",
+                table.c.locked_at < now - timedelta(seconds=self.timeout),
+            ),
+        )
+
+    def _claim(self):
+        """
+        Claim the next job due.
+
+        Returns:
+            Row: The claimed job's id, name, payload, attempts and max_attempts
+            and its claim time as locked_at, or None if no job is due.
+        """
+        table = _jobs_table()
+        with self.engine.connect() as connection:
+            while True:
+                now = _now()
+                job_id = connection.scalar(
+                    select(table.c.id)
+                    .where(self._claimable(now))
+                    .order_by(table.c.run_at, table.c.id)
+                    .limit(1)
+                )
+                # End the read so the update starts from a fresh snapshot
+                connection.rollback()
+                if job_id is None:
+                    return None
+                claimed = connection.execute(
+                    update(table)
+                    .where(table.c.id == job_id, self._claimable(now))
+                    .values(status="running", locked_at=now, attempts=table.c.attempts + 1)
+                ).rowcount
+                connection.commit()
+                if claimed:
+                    # Claimed by this worker only, so it can be read outside the update
+                    return connection.execute(
+                        select(
+                            table.c.id,
+                            table.c.name,
+                            table.c.payload,
+                            table.c.attempts,
+                            table.c.max_attempts,
+                            table.c.locked_at,
+                        ).where(table.c.id == job_id)
+                    ).one()
+                # Another worker claimed it first; look for the next one
+
+    def run_next(self):
+        """
+        Claim and run the next job due.
+
+        Returns:
+            bool: Whether a job was run.
+        """
+        claimed = self._claim()
+        if claimed is None:
+            return False
+        values = {"locked_at": None}
+        try:
+            func = JOBS.get(claimed.name)
+            if func is None:
+                raise LookupError(f"Unknown job: {claimed.name}")
+            with self.app.app_context():
+                func(**json.loads(claimed.payload))
+        except Exception as error:
+            self.app.logger.exception("Job %s (%s) failed", claimed.id, claimed.name)
+            values["last_error"] = repr(error)
+            if claimed.attempts >= claimed.max_attempts:
+                values.update(status="failed", finished_at=_now())
+            else:
+                delay = self.retry_delay * 2 ** (claimed.attempts - 1)
+                values.update(status="queued", run_at=_now() + timedelta(seconds=delay))
+        else:
+            values.update(status="done", finished_at=_now(), last_error=None)
+
+        table = _jobs_table()
+        with self.engine.begin() as connection:
+            # Unless the job timed out and was claimed again in the meantime
+            connection.execute(
+                update(table)
+                .where(
+                    table.c.id == claimed.id,
+                    table.c.status == "running",
+                    table.c.locked_at == claimed.locked_at,
+                )
+                .values(**values)
+            )
+        return True
+
+    def _work(self, stop, burst):
+        """Run jobs until `stop` is set, or until none is due if `burst`."""
+        with self.app.app_context():
+            while not stop.is_set():
+                try:
+                    ran = self.run_next()
+                except Exception:
+                    # The database is unreachable or locked; try again later
+                    self.app.logger.exception("Could not claim a job")
+                    ran = False
+                if not ran:
+                    if burst:
+                        return
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+
+    def work(self, concurrency=1, burst=False, stop=None):
+        """
+        Run jobs on `concurrency` threads, blocking until they are done.
+
+        Args:
+            concurrency (int, optional): Jobs run at the same time.
+            burst (bool, optional): Whether to return once no job is due,
+                instead of waiting for new ones.
+            stop (Event, optional): Event stopping the workers when set.
+        """
+        stop = stop or threading.Event()
+        threads = [
+            threading.Thread(target=self._work, args=(stop, burst), name=f"jobs-{n}")
+            for n in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            stop.set()
+
+    def _start_workers(self):
+        """Start the in-process workers, once per process."""
+        if not self.workers or self._started_pid == os.getpid():
+            return
+        with self._lock:
+            # Started on first use, so each forked worker process gets its own
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            for n in range(self.workers):
+                threading.Thread(
+                    target=self._work,
+                    args=(threading.Event(), False),
+                    name=f"jobs-{n}",
+                    daemon=True,
+                ).start()
+
+    def counts(self):
+        """
+        Count the jobs by status.
+
+        Returns:
+            dict: The number of jobs of each status.
+        """
+        table = _jobs_table()
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.status, count()).group_by(table.c.status)
+            )
+            return dict(rows.all())
+
+    def prune(self, older_than):
+        """
+        Delete finished jobs, freeing their idempotency keys.
+
+        Args:
+            older_than (timedelta): Age of the oldest finished jobs kept.
+
+        Returns:
+            int: The number of jobs deleted.
+        """
+        table = _jobs_table()
+        with self.engine.begin() as connection:
+            return connection.execute(
+                delete(table).where(
+                    table.c.status.in_(["done", "failed"]),
+                    table.c.finished_at < _now() - older_than,
+                )
+            ).rowcount
+
+
+class JobQueue:
+    """Flask extension creating a JobRunner for each application."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the job runner configured for an application."""
+        app.extensions["job_queue"] = JobRunner(
+            app,
+            eager=app.config.get("JOBS_EAGER", False),
+            workers=app.config.get("JOB_WORKERS", 1),
+            max_attempts=app.config.get("JOB_MAX_ATTEMPTS", 5),
+            retry_delay=app.config.get("JOB_RETRY_DELAY", 2),
+            timeout=app.config.get("JOB_TIMEOUT", 300),
+            poll_interval=app.config.get("JOB_POLL_INTERVAL", 1.0),
+        )
+
+    @property
+    def runner(self):
+        """The job runner of the current application."""
+        return current_app.extensions["job_queue"]
+
+    def enqueue(self, func, key=None, delay=0, **kwargs):
+        """Enqueue a job with the current application's runner."""
+        return self.runner.enqueue(func, key=key, delay=delay, **kwargs)
+
+
+@jobs_cli.command("work")
+@click.option("--concurrency", type=int, default=1, show_default=True)
+@click.option("--burst", is_flag=True, help="Exit once no job is due.")
+def work_command(concurrency, burst):
+    """Run queued jobs until interrupted."""
+    runner = current_app.extensions["job_queue"]
+    click.echo(f"Running jobs on {concurrency} thread(s)")
+    try:
+        runner.work(concurrency, burst=burst)
+    except KeyboardInterrupt:
+        click.echo("Stopping after the running jobs")
+
+
+@jobs_cli.command("status")
+def status_command():
+    """Show the number of jobs of each status."""
+    counts = current_app.extensions["job_queue"].counts()
+    for status in ("queued", "running", "done", "failed"):
+        click.echo(f"{status:<8} {counts.get(status, 0)}")
+
+
+@jobs_cli.command("prune")
+@click.option("--days", type=float, default=7, show_default=True)
+def prune_command(days):
+    """Delete jobs finished more than DAYS ago."""
+    deleted = current_app.extensions["job_queue"].prune(timedelta(days=days))
+    click.echo(f"Deleted {deleted} jobs")
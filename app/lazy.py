@@ -0,0 +1,123 @@
+"""
+Module for extensions imported only when they are first used.
+
+Importing Flask-Migrate also imports Alembic, Mako and Pygments, which takes
+longer than creating the rest of the application, yet only the `flask db`
+commands and deploy scripts need it. Flask-CKEditor is only needed by the two
+editor pages. These wrappers register what the application needs at startup
+and import the extension the first time it is used, so web processes (and every
+test) start without them.
+
+Classes:
+    LazyMigrate: Flask-Migrate, imported when a `flask db` command runs or its
+        state is first read.
+    LazyCKEditor: Flask-CKEditor's template helpers, imported when an editor
+        page is rendered.
+"""
+
+import threading
+import click
+from flask import Flask
+
+
+class _LazyCommand(click.Command):
+    """Command standing in for a command group that is loaded when invoked."""
+
+    def __init__(self, name, load, help_text):
+        super().__init__(name, help=help_text)
+        self._load = load
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return self._load().make_context(info_name, args, parent=parent, **extra)
+
+    def invoke(self, ctx):
+        return ctx.command.invoke(ctx)
+
+
+class _DeferredState:
+    """
+    Stands in for an extension's state in `app.extensions`, setting the
+    extension up when any of its attributes is first read.
+    """
+
+    def __init__(self, load):
+        self._load = load
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+class LazyMigrate:
+    """
+    Flask-Migrate, imported when a `flask db` command runs or its state is read,
+    as by `flask_migrate.upgrade()` called from a deploy script.
+
+    Args:
+        **kwargs: Options of `flask_migrate.Migrate`, such as `render_as_batch`.
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        """Register the `flask db` command group and the extension's state."""
+        placeholder = None
+
+        def load():
+            with self._lock:
+                if app.extensions.get("migrate") is placeholder:
+                    from flask_migrate import Migrate
+
+                    # Replaces the placeholders with the real state and `db` group
+                    Migrate(app, db, **self.kwargs)
+            return app.extensions["migrate"]
+
+        def load_commands():
+            load()
+            return app.cli.commands["db"]
+
+        placeholder = app.extensions["migrate"] = _DeferredState(load)
+        app.cli.add_command(
+            _LazyCommand("db", load_commands, "Perform database migrations.")
+        )
+
+
+class LazyCKEditor:
+    """Flask extension providing Flask-CKEditor's `ckeditor` template helpers."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the template helpers, or the full extension if it serves the editor."""
+        if app.config.get("CKEDITOR_SERVE_LOCAL"):
+            # The bundled editor is served by a blueprint, registered at startup
+            from flask_ckeditor import CKEditor
+
+            CKEditor(app)
+            return
+        app.jinja_env.globals["ckeditor"] = _DeferredState(lambda: self._load(app))
+
+    def _load(self, app):
+        """
+        Set Flask-CKEditor up for the application and return its helpers.
+
+        Its blueprint can no longer be registered once requests are served, so
+        the extension is set up on a scratch application, whose helpers and
+        configuration defaults are taken over.
+        """
+        with self._lock:
+            helpers = app.extensions.get("ckeditor")
+            if helpers is None:
+                from flask_ckeditor import CKEditor
+
+                scratch = Flask(__name__)
+                CKEditor(scratch)
+                for key, value in scratch.config.items():
+                    if key.startswith("CKEDITOR_"):
+                        app.config.setdefault(key, value)
+                helpers = app.extensions["ckeditor"] = scratch.extensions["ckeditor"]
+            return helpers
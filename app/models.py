@@ -6,18 +6,23 @@ This module contains the database models for representing users and posts in the
 Classes:
     Users: Model for representing users in the database.
     Posts: Model for representing posts in the database.
+    PostSlugs: Model for the previous slugs of posts.
+    Jobs: Model for the background jobs run by the job queue.
 
 Imports:
     - datetime: Module for working with dates and times.
     - timezone: Class representing a time zone.
     - UserMixin: Class providing default implementations for User class methods.
     - db: Database instance from SQLAlchemy.
-    - bcrypt: Instance of Bcrypt for hashing passwords.
+    - password_hasher: Service hashing and checking passwords off the request thread.
+    - user_cache: Cache of logged-in users, invalidated whenever a user changes.
 """
 
 from datetime import datetime, timezone
 from flask_login import UserMixin
-from .extensions import db, bcrypt
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from .extensions import db, password_hasher, user_cache
 
 
 class Users(db.Model, UserMixin):
@@ -28,9 +33,12 @@ class Users(db.Model, UserMixin):
     name = db.Column(db.String(200), nullable=False)
     email = db.Column(db.String(200), nullable=False, unique=True)
     favorite_pizza_place = db.Column(db.String(200), default="You")
-    date_added = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    date_added = db.Column(db.DateTime, default=datetime.now(timezone.utc), index=True)
     profile_pic = db.Column(db.String(), nullable=True)
     is_admin = db.Column(db.Boolean, nullable=False, default=False)
+    # Maintained by app.counters whenever posts are written
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_posted_at = db.Column(db.DateTime, nullable=True)
 
     password_hash = db.Column(db.String(128))
     posts = db.relationship("Posts", backref="poster")
@@ -43,11 +51,15 @@ class Users(db.Model, UserMixin):
     @password.setter
     def password(self, password):
         """Setter for the user's password."""
-        self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        self.password_hash = password_hasher.hash(password)
 
     def verify_password(self, password):
         """Verify the user's password."""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Whether the password hash was made with a different cost than configured."""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def __repr__(self):
         """Representation of the user object."""
@@ -65,14 +77,28 @@ class Users(db.Model, UserMixin):
         db.session.commit()
 
 
+@event.listens_for(Users, "after_update")
+@event.listens_for(Users, "after_delete")
+def _invalidate_cached_user(_mapper, _connection, target):
+    """Drop a user from the user cache once a change to their row commits."""
+    user_cache.invalidate(target.id, object_session(target))
+
+
 class Posts(db.Model):
     """Model for representing posts in the database."""
 
+    # (poster_id, date_posted) serves both the poster_id lookups and the
+    # newest-first ordering of a single user's posts
+    __table_args__ = (db.Index(None, "poster_id", "date_posted"),)
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255))
     content = db.Column(db.Text)
-    date_posted = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    slug = db.Column(db.String(255))
+    # Sanitized content and plain text summary, rendered by app.content on write
+    body_html = db.Column(db.Text)
+    excerpt = db.Column(db.String(400))
+    date_posted = db.Column(db.DateTime, default=datetime.now(timezone.utc), index=True)
+    slug = db.Column(db.String(255), index=True, unique=True)
     poster_id = db.Column(db.Integer, db.ForeignKey("users.id"))
 
     def get_formatted_date(self):
@@ -94,3 +120,45 @@ class Posts(db.Model):
     def get_date_posted_formatted(self):
         """Get the formatted date the post was posted."""
         return self.date_posted.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class PostSlugs(db.Model):
+    """Model for the previous slugs of posts, kept so their old URLs redirect."""
+
+    slug = db.Column(db.String(255), primary_key=True)
+    post_id = db.Column(
+        db.Integer,
+        db.ForeignKey("posts.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    def __repr__(self):
+        """Representation of the previous slug object."""
+        return f"<PostSlug {self.slug} -> {self.post_id}>"
+
+
+class Jobs(db.Model):
+    """Model for the background jobs run by app.jobs."""
+
+    # Serves the workers' search for the next job due
+    __table_args__ = (db.Index(None, "status", "run_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    # JSON encoded keyword arguments of the job function
+    payload = db.Column(db.Text, nullable=False)
+    idempotency_key = db.Column(db.String(255), unique=True)
+    # "queued", "running", "done" or "failed"
+    status = db.Column(db.String(10), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        """Representation of the job object."""
+        return f"<Job {self.id} {self.name} {self.status}>"
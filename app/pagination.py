@@ -0,0 +1,150 @@
+"""
+Module for cursor-based (keyset) pagination of SQLAlchemy queries.
+
+Listing pages order rows by a timestamp column with the primary key as a
+tie-breaker. Instead of using OFFSET, which gets slower the further a reader
+pages, each page is fetched by seeking past the (timestamp, id) pair of the
+last row shown, so every page costs the same no matter how large the table is.
+
+Classes:
+    KeysetPage: A single page of results along with its next/prev cursors.
+
+Functions:
+    encode_cursor(sort_value, row_id): Encode a (timestamp, id) pair as an opaque cursor.
+    decode_cursor(cursor): Decode a cursor produced by encode_cursor.
+    paginate_keyset(query, sort_column, id_column, after, before, per_page): Fetch
+        one page of a query ordered newest first.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+class KeysetPage:
+    """A single page of keyset-paginated results."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        """Whether there is a page after this one."""
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        """Whether there is a page before this one."""
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(sort_value, row_id):
+    """
+    Encode a (timestamp, id) pair as an opaque, URL-safe cursor.
+
+    Args:
+        sort_value (datetime): The value of the sort column for the row.
+        row_id (int): The primary key of the row.
+
+    Returns:
+        str: The encoded cursor.
+    """
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The encoded cursor.
+
+    Returns:
+        tuple: The (datetime, int) pair, or None if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        sort_value, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+
+
+def paginate_keyset(
+    query, sort_column, id_column, after=None, before=None, per_page=10
+):
+    """
+    Fetch one page of a query ordered by (sort_column, id_column) descending.
+
+    Args:
+        query (Query): The base query, without any ordering applied.
+        sort_column (Column): The timestamp column to order by.
+        id_column (Column): The primary key column, used to break ties.
+        after (str, optional): Cursor of the last row of the previous page.
+        before (str, optional): Cursor of the first row of the next page.
+        per_page (int, optional): Maximum number of rows on the page.
+
+    Returns:
+        KeysetPage: The requested page.
+    """
+    after_key = decode_cursor(after) if after else None
+    before_key = decode_cursor(before) if before else None
+
+    if before_key is not None:
+        sort_value, row_id = before_key
+        rows = (
+            query.filter(
+                or_(
+                    sort_column > sort_value,
+                    and_(sort_column == sort_value, id_column > row_id),
+                )
+            )
+            .order_by(sort_column.asc(), id_column.asc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after_key is not None:
+            sort_value, row_id = after_key
+            query = query.filter(
+                or_(
+                    sort_column < sort_value,
+                    and_(sort_column == sort_value, id_column < row_id),
+                )
+            )
+        rows = (
+            query.order_by(sort_column.desc(), id_column.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_key is not None
+
+    if not items:
+        return KeysetPage(items)
+
+    key = sort_column.key
+    id_key = id_column.key
+    first, last = items[0], items[-1]
+    next_cursor = (
+        encode_cursor(getattr(last, key), getattr(last, id_key)) if has_next else None
+    )
+    prev_cursor = (
+        encode_cursor(getattr(first, key), getattr(first, id_key)) if has_prev else None
+    )
+    return KeysetPage(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
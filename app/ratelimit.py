@@ -0,0 +1,310 @@
+"""
+Module for rate limiting the views that are expensive or abused.
+
+Every login attempt runs a bcrypt check, so a credential stuffing burst against
+`/auth/login` keeps every worker busy hashing and locks legitimate users out.
+Views decorated with `rate_limited` name the limits their submissions are
+subject to, and each limit is a token bucket per client IP or per username:
+
+- A bucket holds up to N tokens and refills at N per period, so a client can
+  burst N requests and then sustain N per period.
+- Each POST (or other unsafe request) to the view takes a token from each of
+  its buckets. GET requests, which only render the form, are not limited.
+- A request finding a bucket empty is answered with 429 Too Many Requests and a
+  `Retry-After` header giving the seconds until a token is available, without
+  running the view. Rejections are counted in the `rate_limited_total` metric.
+
+Limits are configured by name in RATE_LIMITS. The part of the name after the
+last dot says what the bucket is kept per: "ip" (the client address) or
+"username" (the submitted username, so a single account is protected against
+attempts spread over many addresses).
+
+Client addresses are `request.remote_addr`; behind a reverse proxy, the app
+must trust the proxy's `X-Forwarded-For` header (`PROXY_FIX_X_FOR`), or every
+client shares the proxy's buckets.
+
+Buckets are kept in process memory, which suits a single process, or in a
+SQLite file shared by every worker process on the machine, so a client cannot
+multiply its allowance by the number of workers.
+
+Classes:
+    MemoryBuckets: Token buckets in process memory.
+    SqliteBuckets: Token buckets in a SQLite file shared between processes.
+    RateLimiter: Flask extension enforcing the limits of decorated views.
+
+Functions:
+    rate_limited(*names): Decorator naming the limits of a view.
+    parse_limit(limit): Parse a limit such as "5/minute".
+
+Configuration:
+    RATELIMIT_ENABLED: Whether limits are enforced.
+    RATELIMIT_STORAGE: "memory" or "sqlite".
+    RATELIMIT_SQLITE_PATH: File of the sqlite storage (defaults to
+        `<instance_path>/ratelimit.db`).
+    RATELIMIT_MAX_ENTRIES: Buckets kept by the memory storage; the least
+        recently used are dropped (which refills them) beyond this.
+    RATE_LIMITS: Limits by name, such as {"login.ip": "30/minute"}. Names
+        missing or set to None are not enforced.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+from werkzeug.exceptions import TooManyRequests
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Takes between removals of full buckets from the sqlite storage
+PRUNE_INTERVAL = 1000
+
+
+def rate_limited(*names):
+    """
+    Subject a view's submissions to the named limits of RATE_LIMITS.
+
+    Args:
+        *names (str): Names of limits, such as "login.ip".
+
+    Returns:
+        function: Decorator marking the view.
+    """
+
+    def decorator(view):
+        view.rate_limits = names
+        return view
+
+    return decorator
+
+
+def parse_limit(limit):
+    """
+    Parse a limit of requests per period.
+
+    Args:
+        limit (str): "<count>/<period>", where the period is "second", "minute",
+            "hour" or "day", e.g. "5/minute".
+
+    Returns:
+        tuple: The bucket's capacity and its refill rate in tokens per second.
+    """
+    count, _, period = limit.partition("/")
+    if period.strip() not in PERIODS or not count.strip().isdigit() or not int(count):
+        raise ValueError(f"Invalid rate limit: {limit!r}")
+    return int(count), int(count) / PERIODS[period.strip()]
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    """The tokens of a bucket last updated at `updated`, refilled up to `now`."""
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _take(tokens, rate):
+    """
+    Take a token from a bucket holding `tokens`.
+
+    Returns:
+        tuple: The tokens left and the seconds to wait (0 if a token was taken).
+    """
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBuckets:
+    """Token buckets in process memory, the least recently used dropped first."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """
+        Take a token from a bucket.
+
+        Args:
+            key (str): The bucket.
+            capacity (int): Tokens a full bucket holds.
+            rate (float): Tokens added per second.
+
+        Returns:
+            float: 0 if a token was taken, else the seconds until one is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens, wait = _take(_refill(tokens, updated, capacity, rate, now), rate)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SqliteBuckets:
+    """
+    Token buckets in a SQLite file, shared by the worker processes of a machine.
+
+    Each take is one short write transaction; SQLite's write lock serialises
+    the takes of all processes, so two workers cannot both spend a bucket's last
+    token.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_buckets_full_at ON buckets (full_at)"
+            )
+
+    def _connect(self):
+        """Open a connection managing its own transactions."""
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _connection(self):
+        """The connection of the current thread, opened on first use."""
+        connection = getattr(self._local, "connection", None)
+        # Connections are not shared with processes forked after they were opened
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key, capacity, rate):
+        """
+        Take a token from a bucket.
+
+        Args:
+            key (str): The bucket.
+            capacity (int): Tokens a full bucket holds.
+            rate (float): Tokens added per second.
+
+        Returns:
+            float: 0 if a token was taken, else the seconds until one is available.
+        """
+        connection = self._connection()
+        # Wall clock time, which unlike the monotonic clock is shared by processes
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row is not None else (capacity, now)
+            tokens, wait = _take(_refill(tokens, updated, capacity, rate, now), rate)
+            connection.execute(
+                "INSERT INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, "
+                "updated = excluded.updated, full_at = excluded.full_at",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+            self._takes += 1
+            if self._takes % PRUNE_INTERVAL == 0:
+                # A full bucket is the same as no bucket
+                connection.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+
+def _client_ip():
+    """The client's address, as set by ProxyFix behind a reverse proxy."""
+    return request.remote_addr
+
+
+def _submitted_username():
+    """The submitted username, ignoring case, or None if there is none."""
+    username = request.form.get("username", "").strip().lower()
+    return username or None
+
+
+# What each kind of bucket is kept per, by the last part of a limit's name
+BUCKET_KEYS = {"ip": _client_ip, "username": _submitted_username}
+
+
+class RateLimiter:
+    """Flask extension enforcing the limits of views decorated with `rate_limited`."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the configured bucket storage and register the request hook.
+
+        Must be called after the Instrumentation extension, whose registry counts
+        the rejected requests.
+        """
+        if not app.config.get("RATELIMIT_ENABLED", True):
+            return
+        limits = {}
+        for name, limit in (app.config.get("RATE_LIMITS") or {}).items():
+            if name.rpartition(".")[2] not in BUCKET_KEYS:
+                raise ValueError(f"Rate limit {name!r} is not per ip or username")
+            if limit:
+                limits[name] = parse_limit(limit)
+
+        storage = app.config.get("RATELIMIT_STORAGE", "memory")
+        if storage == "memory":
+            buckets = MemoryBuckets(app.config.get("RATELIMIT_MAX_ENTRIES", 10000))
+        elif storage == "sqlite":
+            path = app.config.get("RATELIMIT_SQLITE_PATH") or os.path.join(
+                app.instance_path, "ratelimit.db"
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            buckets = SqliteBuckets(path)
+        else:
+            raise ValueError(f"Unknown RATELIMIT_STORAGE: {storage}")
+        app.extensions["rate_limiter"] = (buckets, limits)
+
+        registry = app.extensions.get("instrumentation")
+        if registry is not None:
+            registry.describe("rate_limited_total", "Requests rejected by a rate limit.")
+        app.before_request(self._check_request)
+
+    @staticmethod
+    def _check_request():
+        """Take a token from each bucket of the request, or reject it."""
+        if request.method in SAFE_METHODS:
+            return
+        view = current_app.view_functions.get(request.endpoint)
+        names = getattr(view, "rate_limits", ())
+        if not names:
+            return
+        buckets, limits = current_app.extensions["rate_limiter"]
+        for name in names:
+            if name not in limits:
+                continue
+            key = BUCKET_KEYS[name.rpartition(".")[2]]()
+            if key is None:
+                continue
+            capacity, rate = limits[name]
+            wait = buckets.take(f"{name}:{key}", capacity, rate)
+            if wait:
+                registry = current_app.extensions.get("instrumentation")
+                if registry is not None:
+                    registry.inc("rate_limited_total", limit=name)
+                current_app.logger.warning(
+                    "Rate limit %s exceeded by %s on %s", name, key, request.path
+                )
+                raise TooManyRequests(retry_after=math.ceil(wait))
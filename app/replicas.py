@@ -0,0 +1,144 @@
+"""
+Module for sending the queries of read-only views to read replicas.
+
+Views decorated with `replica_reads` run their SELECTs on one of the configured
+replica binds, chosen at random per statement, so read traffic can be spread over
+as many replicas as needed. Everything else stays on the primary:
+
+- Views without the decorator, including every view that writes.
+- Flushes and INSERT/UPDATE/DELETE statements.
+- Reads that follow a write in the same request.
+- Every request from a client for a few seconds after it wrote something, so a
+  user who has just added or edited a post sees the change even though the
+  replicas may lag behind the primary.
+
+Without replicas configured, all queries go to the primary as before.
+
+Classes:
+    RoutingSession: Session routing the reads of replica views to a replica bind.
+    ReadReplicas: Flask extension deciding which requests may use the replicas.
+
+Functions:
+    replica_reads(view): Decorator marking a view as read-only.
+    mark_written(): Keep the request, and the client's next requests, on the
+        primary after a write the session did not flush.
+
+Configuration:
+    SQLALCHEMY_BINDS: Must contain a bind for every replica.
+    READ_REPLICAS: Bind keys of the replicas.
+    REPLICA_STICKY_SECONDS: How long a client reads from the primary after writing.
+"""
+
+import random
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Executable, UpdateBase, event
+
+STICKY_SESSION_KEY = "_read_primary_until"
+
+
+def replica_reads(view):
+    """
+    Mark a view as read-only, letting its queries run on a read replica.
+
+    Args:
+        view (function): The view function.
+
+    Returns:
+        function: The same view function.
+    """
+    view.replica_reads = True
+    return view
+
+
+class RoutingSession(Session):
+    """Session sending the reads of replica views to a random replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        """Return a replica engine for reads of replica views, else the usual bind."""
+        if bind is None and self.bind is not None:
+            # Sessions joined to an external connection, such as a test's transaction
+            return self.bind
+        if bind is None and self._reads_from_replica(clause):
+            replicas = current_app.config["READ_REPLICAS"]
+            return self._db.engines[random.choice(replicas)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        """Whether a statement may run on a replica."""
+        return (
+            has_request_context()
+            and g.get("_replica_reads", False)
+            and not g.get("_wrote", False)
+            and not self._flushing
+            and isinstance(clause, Executable)
+            and not isinstance(clause, UpdateBase)
+        )
+
+
+def mark_written():
+    """
+    Keep the rest of the request, and the client's next requests, on the primary.
+
+    Flushes mark their request automatically; statements executed directly, such
+    as bulk UPDATEs and DELETEs, must call this.
+    """
+    if has_request_context():
+        g._wrote = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_write(_session, _flush_context):
+    """Keep the rest of the request, and the client's next requests, on the primary."""
+    mark_written()
+
+
+class ReadReplicas:
+    """Flask extension deciding which requests read from the replicas."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the request hooks if the application has replicas."""
+        replicas = app.config.setdefault("READ_REPLICAS", [])
+        missing = set(replicas) - set(app.config.get("SQLALCHEMY_BINDS") or {})
+        if missing:
+            raise ValueError(f"READ_REPLICAS without a bind: {sorted(missing)}")
+        if replicas:
+            app.before_request(self._route_request)
+            app.after_request(self._stick_to_primary)
+
+    @staticmethod
+    def _route_request():
+        """Let the request use the replicas if its view is read-only."""
+        g._wrote = False
+        view = current_app.view_functions.get(request.endpoint)
+        g._replica_reads = (
+            getattr(view, "replica_reads", False)
+            and session.get(STICKY_SESSION_KEY, 0) < time.time()
+        )
+
+    @staticmethod
+    def _stick_to_primary(response):
+        """
+        Send the client's next requests to the primary after a write.
+
+        A streamed page queries while its body renders, after this hook, so the
+        request's routing is only cleared once the response is closed.
+        """
+        if g.get("_wrote", False):
+            session[STICKY_SESSION_KEY] = time.time() + current_app.config.get(
+                "REPLICA_STICKY_SECONDS", 5
+            )
+        request_globals = g._get_current_object()
+        response.call_on_close(lambda: _clear_routing(request_globals))
+        return response
+
+
+def _clear_routing(request_globals):
+    """Forget whether a finished request read from the replicas."""
+    request_globals.pop("_replica_reads", None)
+    request_globals.pop("_wrote", None)
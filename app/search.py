@@ -0,0 +1,413 @@
+"""
+Module for full-text searching of posts.
+
+Searching used to run `LIKE '%term%'` over the title and content columns, which
+scans the whole posts table on every search. This module keeps a full-text index
+of posts in sync with the `Posts` table and queries it for ranked, highlighted,
+prefix-matched results.
+
+Backends:
+    - SqliteSearchBackend: An FTS5 virtual table (`posts_fts`) holding the plain
+      text of each post's title and body, keyed by the post's id.
+    - PostgresSearchBackend: `to_tsvector`/`to_tsquery` matching with `ts_rank`
+      and `ts_headline`, backed by a GIN expression index.
+    - LikeSearchBackend: The original `LIKE` scan, used for any other database.
+
+Classes:
+    SearchResult: A matching post along with its highlighted title and snippet.
+
+Functions:
+    html_to_text(html): Strip the markup from CKEditor HTML.
+    get_search_backend(): Return the backend for the current database.
+    index_new_posts(connection, post_ids): Index posts inserted in bulk.
+    remove_posts(connection, post_ids): Unindex posts deleted in bulk.
+    search_posts(text, limit): Search posts using the current backend.
+"""
+
+import re
+from html.parser import HTMLParser
+from markupsafe import Markup, escape
+from sqlalchemy import (
+    DDL,
+    column,
+    delete,
+    event,
+    func,
+    literal_column,
+    or_,
+    select,
+    table,
+    text as sql_text,
+)
+from sqlalchemy.orm import joinedload
+from .extensions import db
+from .models import Posts
+
+# Control characters used to mark highlighted terms before the text is escaped
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+SNIPPET_TOKENS = 32
+
+# The FTS5 table, for Core statements; it is not part of the models' metadata
+POSTS_FTS = table("posts_fts", column("rowid"))
+
+
+class _TextExtractor(HTMLParser):
+    """HTML parser collecting only the text content of a document."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def html_to_text(html):
+    """
+    Strip the markup from CKEditor HTML.
+
+    Args:
+        html (str): The HTML to strip.
+
+    Returns:
+        str: The text content with whitespace collapsed.
+    """
+    extractor = _TextExtractor()
+    extractor.feed(html or "")
+    extractor.close()
+    return " ".join(" ".join(extractor.parts).split())
+
+
+def _search_terms(text):
+    """Split user input into the word terms to search for."""
+    return re.findall(r"\w+", text or "")
+
+
+def _highlight(value):
+    """Escape highlighted text and turn the highlight markers into <mark> tags."""
+    escaped = str(escape(value or ""))
+    return Markup(
+        escaped.replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
+class SearchResult:
+    """A post matching a search, with its highlighted title and snippet."""
+
+    def __init__(self, post, title, snippet):
+        self.post = post
+        self.title = title
+        self.snippet = snippet
+
+
+class SqliteSearchBackend:
+    """Search backend using an SQLite FTS5 virtual table."""
+
+    name = "sqlite"
+
+    def index_post(self, connection, post):
+        """Insert or replace the index entry for a post."""
+        self.remove_post(connection, post.id)
+        connection.execute(
+            sql_text(
+                "INSERT INTO posts_fts (rowid, title, body) VALUES (:id, :title, :body)"
+            ),
+            {"id": post.id, "title": post.title or "", "body": html_to_text(post.content)},
+        )
+
+    def remove_post(self, connection, post_id):
+        """Remove the index entry for a post."""
+        connection.execute(
+            sql_text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post_id}
+        )
+
+    def remove_posts(self, connection, post_ids):
+        """Remove the index entries for many posts in one statement."""
+        connection.execute(delete(POSTS_FTS).where(POSTS_FTS.c.rowid.in_(post_ids)))
+
+    def index_new_posts(self, connection, posts):
+        """Add index entries for posts that have none yet, in one executemany."""
+        connection.execute(
+            sql_text(
+                "INSERT INTO posts_fts (rowid, title, body) VALUES (:id, :title, :body)"
+            ),
+            [
+                {
+                    "id": post.id,
+                    "title": post.title or "",
+                    "body": html_to_text(post.content),
+                }
+                for post in posts
+            ],
+        )
+
+    def search(self, text, limit):
+        """
+        Search the FTS5 index.
+
+        Args:
+            text (str): The user's search input.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: SearchResult objects, best match first.
+        """
+        terms = _search_terms(text)
+        if not terms:
+            return []
+        match = " ".join('"' + term + '"*' for term in terms)
+        rows = db.session.execute(
+            sql_text(
+                "SELECT rowid, highlight(posts_fts, 0, :start, :end) AS title, "
+                "snippet(posts_fts, 1, :start, :end, '…', :tokens) AS snippet "
+                "FROM posts_fts WHERE posts_fts MATCH :match "
+                "ORDER BY bm25(posts_fts, 10.0, 1.0) LIMIT :limit"
+            ),
+            {
+                "start": HIGHLIGHT_START,
+                "end": HIGHLIGHT_END,
+                "tokens": SNIPPET_TOKENS,
+                "match": match,
+                "limit": limit,
+            },
+        ).all()
+        if not rows:
+            return []
+        posts = (
+            Posts.query.options(joinedload(Posts.poster))
+            .filter(Posts.id.in_([row.rowid for row in rows]))
+            .all()
+        )
+        posts_by_id = {post.id: post for post in posts}
+        return [
+            SearchResult(
+                posts_by_id[row.rowid], _highlight(row.title), _highlight(row.snippet)
+            )
+            for row in rows
+            if row.rowid in posts_by_id
+        ]
+
+
+class PostgresSearchBackend:
+    """Search backend using Postgres text search over a GIN expression index."""
+
+    name = "postgresql"
+    # Rendered inline so the expression matches the ix_posts_search index
+    config = literal_column("'english'")
+
+    def index_post(self, connection, post):
+        """The index is an expression index, so Postgres maintains it itself."""
+
+    def remove_post(self, connection, post_id):
+        """The index is an expression index, so Postgres maintains it itself."""
+
+    def remove_posts(self, connection, post_ids):
+        """The index is an expression index, so Postgres maintains it itself."""
+
+    def index_new_posts(self, connection, posts):
+        """The index is an expression index, so Postgres maintains it itself."""
+
+    def document(self):
+        """The tsvector expression the GIN index is built on."""
+        return func.to_tsvector(
+            self.config,
+            func.coalesce(Posts.title, literal_column("''"))
+            .op("||")(literal_column("' '"))
+            .op("||")(func.coalesce(Posts.content, literal_column("''"))),
+        )
+
+    def search(self, text, limit):
+        """
+        Search using `to_tsquery` with prefix matching on every term.
+
+        Args:
+            text (str): The user's search input.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: SearchResult objects, best match first.
+        """
+        terms = _search_terms(text)
+        if not terms:
+            return []
+        query = func.to_tsquery(
+            self.config, " & ".join(term + ":*" for term in terms)
+        )
+        options = f"StartSel={HIGHLIGHT_START},StopSel={HIGHLIGHT_END}"
+        document = self.document()
+        rows = (
+            db.session.query(
+                Posts,
+                func.ts_headline(
+                    self.config,
+                    func.coalesce(Posts.title, ""),
+                    query,
+                    options + ",HighlightAll=true",
+                ),
+                func.ts_headline(
+                    self.config,
+                    func.coalesce(Posts.content, ""),
+                    query,
+                    options + f",MaxWords={SNIPPET_TOKENS}",
+                ),
+            )
+            .options(joinedload(Posts.poster))
+            .filter(document.op("@@")(query))
+            .order_by(func.ts_rank(document, query).desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            SearchResult(post, _highlight(title), _highlight(html_to_text(snippet)))
+            for post, title, snippet in rows
+        ]
+
+
+class LikeSearchBackend:
+    """Fallback search backend scanning the posts table with LIKE."""
+
+    name = "like"
+
+    def index_post(self, connection, post):
+        """No index to maintain."""
+
+    def remove_post(self, connection, post_id):
+        """No index to maintain."""
+
+    def remove_posts(self, connection, post_ids):
+        """No index to maintain."""
+
+    def index_new_posts(self, connection, posts):
+        """No index to maintain."""
+
+    def search(self, text, limit):
+        """
+        Search titles and content with `LIKE '%text%'`.
+
+        Args:
+            text (str): The user's search input.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: SearchResult objects, sorted by title.
+        """
+        search_regex = "%" + text + "%"
+        posts = (
+            Posts.query.options(joinedload(Posts.poster))
+            .filter(
+                or_(Posts.content.like(search_regex), Posts.title.like(search_regex))
+            )
+            .order_by(Posts.title)
+            .limit(limit)
+            .all()
+        )
+        return [
+            SearchResult(post, escape(post.title or ""), escape(html_to_text(post.content)))
+            for post in posts
+        ]
+
+
+_backends = {
+    "sqlite": SqliteSearchBackend(),
+    "postgresql": PostgresSearchBackend(),
+}
+_fallback_backend = LikeSearchBackend()
+
+
+def _backend_for(dialect_name):
+    """Return the search backend for a database dialect."""
+    return _backends.get(dialect_name, _fallback_backend)
+
+
+def get_search_backend():
+    """
+    Return the search backend for the current database.
+
+    Returns:
+        object: The search backend.
+    """
+    return _backend_for(db.engine.dialect.name)
+
+
+def index_new_posts(connection, post_ids):
+    """
+    Index the given posts.
+
+    Used by bulk inserts, which bypass the mapper events keeping the index in
+    sync. The posts must not be indexed yet, so the index is best updated in the
+    inserting transaction.
+
+    Args:
+        connection (Connection): The connection of the inserting transaction.
+        post_ids (list): The IDs of the inserted posts.
+
+    Returns:
+        int: The number of posts indexed.
+    """
+    if not post_ids:
+        return 0
+    posts = connection.execute(
+        select(Posts.id, Posts.title, Posts.content).where(Posts.id.in_(post_ids))
+    ).all()
+    _backend_for(connection.dialect.name).index_new_posts(connection, posts)
+    return len(posts)
+
+
+def remove_posts(connection, post_ids):
+    """
+    Remove posts from the index.
+
+    Used by bulk deletes, which bypass the mapper events keeping the index in
+    sync.
+
+    Args:
+        connection (Connection): The connection of the deleting transaction.
+        post_ids (list or Select): The IDs of the deleted posts, or a SELECT
+            of them.
+    """
+    _backend_for(connection.dialect.name).remove_posts(connection, post_ids)
+
+
+def search_posts(text, limit=50):
+    """
+    Search posts using the current backend.
+
+    Args:
+        text (str): The user's search input.
+        limit (int, optional): Maximum number of results.
+
+    Returns:
+        list: SearchResult objects, best match first.
+    """
+    return get_search_backend().search(text, limit)
+
+
+# Create and drop the FTS5 table alongside the posts table (used by db.create_all)
+event.listen(
+    Posts.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts "
+        "USING fts5(title, body, tokenize='porter unicode61')"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    Posts.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS posts_fts").execute_if(dialect="sqlite"),
+)
+
+
+@event.listens_for(Posts, "after_insert")
+@event.listens_for(Posts, "after_update")
+def _index_post(_mapper, connection, target):
+    """Keep the search index in sync when a post is written."""
+    _backend_for(connection.dialect.name).index_post(connection, target)
+
+
+@event.listens_for(Posts, "after_delete")
+def _remove_post(_mapper, connection, target):
+    """Keep the search index in sync when a post is deleted."""
+    _backend_for(connection.dialect.name).remove_post(connection, target.id)
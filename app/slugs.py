@@ -0,0 +1,217 @@
+"""
+Module for the slugs that post URLs are built from.
+
+Posts are served from `/posts/<slug>`. Every post has a slug of its own, backed
+by a unique index:
+
+- When a post is written, its slug (or, if it has none, its title) is reduced
+  to lowercase ASCII words joined by hyphens, and made unique by appending the
+  first free `-2`, `-3`, ... suffix.
+- When a post's slug changes, the previous slug is kept in `post_slugs`, so
+  links and cache keys using it are permanently redirected to the new URL rather
+  than broken. Previous slugs stay reserved for their post until it is deleted.
+
+Views resolve slugs through the slug cache, which these events invalidate once
+their transaction commits.
+
+Functions:
+    slugify(text): Reduce text to a URL slug.
+    unique_slug(connection, base, post_id, exclude): The first free slug for a base.
+    assign_slugs(connection, rows): Give unique slugs to rows about to be inserted.
+    lookup_slug(session, slug): The post ID and current slug of a slug.
+    release_slugs(connection, post_ids): Free the slugs of posts about to be
+        deleted in bulk.
+"""
+
+import re
+import unicodedata
+from sqlalchemy import and_, delete, event, insert, inspect, or_, select
+from sqlalchemy.orm import Session, object_session
+from .extensions import slug_cache
+from .models import Posts, PostSlugs
+
+MAX_SLUG_LENGTH = 200
+# Slugs that would be shadowed by other routes of the posts blueprint
+RESERVED_SLUGS = {"add", "myposts"}
+
+
+def slugify(text):
+    """
+    Reduce text to a URL slug.
+
+    Args:
+        text (str): A title or a slug typed by the author.
+
+    Returns:
+        str: Lowercase ASCII letters and digits in hyphen separated words. Slugs
+        that are empty, all digits (which would match the post ID route) or
+        reserved are prefixed with "post".
+    """
+    ascii_text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore")
+    slug = re.sub(r"[^a-z0-9]+", "-", ascii_text.decode().lower()).strip("-")
+    slug = slug[:MAX_SLUG_LENGTH].rstrip("-")
+    if not slug or slug.isdigit() or slug in RESERVED_SLUGS:
+        slug = f"post-{slug}".rstrip("-")
+    return slug
+
+
+def _slug_range(column, base):
+    """Filter matching a base slug and every suffixed variant of it."""
+    # Suffixed slugs sort between "base-" and "base.", a range indexes can serve
+    return or_(column == base, and_(column > f"{base}-", column < f"{base}."))
+
+
+def unique_slug(connection, base, post_id=None, exclude=()):
+    """
+    Find the first free slug for a base slug.
+
+    Args:
+        connection (Connection): The connection of the transaction writing the post.
+        base (str): A slug returned by `slugify`.
+        post_id (int, optional): The post being written, whose own slugs are free.
+        exclude (iterable, optional): Slugs taken by rows not yet inserted.
+
+    Returns:
+        str: `base`, or `base-N` for the smallest N from 2 that is free.
+    """
+    current = select(Posts.slug).where(_slug_range(Posts.slug, base))
+    previous = select(PostSlugs.slug).where(_slug_range(PostSlugs.slug, base))
+    if post_id is not None:
+        current = current.where(Posts.id != post_id)
+        previous = previous.where(PostSlugs.post_id != post_id)
+    taken = set(connection.execute(current.union(previous)).scalars())
+    taken.update(exclude)
+    slug = base
+    suffix = 2
+    while slug in taken:
+        slug = f"{base}-{suffix}"
+        suffix += 1
+    return slug
+
+
+def assign_slugs(connection, rows):
+    """
+    Give unique slugs to rows about to be inserted with Core, which skips the
+    mapper events.
+
+    Args:
+        connection (Connection): The connection of the inserting transaction.
+        rows (list): Dicts of post columns, updated in place.
+    """
+    bases = [slugify(row.get("slug") or row.get("title")) for row in rows]
+    wanted = set(bases)
+    taken = set(
+        connection.execute(
+            select(Posts.slug)
+            .where(Posts.slug.in_(wanted))
+            .union(select(PostSlugs.slug).where(PostSlugs.slug.in_(wanted)))
+        ).scalars()
+    )
+    used = set()
+    for row, base in zip(rows, bases):
+        slug = base
+        if slug in taken or slug in used:
+            slug = unique_slug(connection, base, exclude=used)
+        used.add(slug)
+        row["slug"] = slug
+
+
+def lookup_slug(session, slug):
+    """
+    Find the post a slug belongs to.
+
+    Args:
+        session (Session): The session to query with.
+        slug (str): A current or previous slug.
+
+    Returns:
+        tuple: The post ID and current slug, or None if no post has or had
+        this slug.
+    """
+    row = session.execute(select(Posts.id, Posts.slug).where(Posts.slug == slug)).first()
+    if row is None:
+        row = session.execute(
+            select(Posts.id, Posts.slug)
+            .join(PostSlugs, PostSlugs.post_id == Posts.id)
+            .where(PostSlugs.slug == slug)
+        ).first()
+    return tuple(row) if row is not None else None
+
+
+def release_slugs(connection, post_ids, session=None):
+    """
+    Free the current and previous slugs of posts about to be deleted with Core,
+    which skips the mapper events.
+
+    Args:
+        connection (Connection): The connection of the deleting transaction.
+        post_ids (list or Select): The IDs of the posts, or a SELECT of them.
+        session (Session, optional): The session of the deleting transaction,
+            once committed by which the slugs are dropped from the cache.
+    """
+    slugs = connection.execute(
+        select(Posts.slug)
+        .where(Posts.id.in_(post_ids))
+        .union_all(select(PostSlugs.slug).where(PostSlugs.post_id.in_(post_ids)))
+    ).scalars().all()
+    connection.execute(delete(PostSlugs).where(PostSlugs.post_id.in_(post_ids)))
+    slug_cache.invalidate(*slugs, session=session)
+
+
+def _flush_slugs(target):
+    """
+    Slugs given earlier in the current flush. A flush runs the before_insert
+    events of all its posts before inserting any of them.
+    """
+    return object_session(target).info.setdefault("_flush_slugs", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _forget_flush_slugs(session, _flush_context):
+    """Forget the slugs of a finished flush, which are now in the table."""
+    session.info.pop("_flush_slugs", None)
+
+
+@event.listens_for(Posts, "before_insert")
+def _slug_new_post(_mapper, connection, target):
+    """Give a new post a unique slug."""
+    taken = _flush_slugs(target)
+    target.slug = unique_slug(
+        connection, slugify(target.slug or target.title), exclude=taken
+    )
+    taken.add(target.slug)
+
+
+@event.listens_for(Posts, "before_update")
+def _slug_edited_post(_mapper, connection, target):
+    """Make an edited slug unique and keep the previous one for redirects."""
+    history = inspect(target).attrs.slug.history
+    if not history.has_changes():
+        return
+    if history.deleted:
+        previous = history.deleted[0]
+    else:
+        # The slug was set without being loaded first; the row still has it
+        previous = connection.execute(
+            select(Posts.slug).where(Posts.id == target.id)
+        ).scalar()
+    slug = unique_slug(connection, slugify(target.slug or target.title), target.id)
+    target.slug = slug
+    if slug == previous:
+        return
+    # The post may be taking back one of its own previous slugs
+    connection.execute(delete(PostSlugs).where(PostSlugs.slug == slug))
+    if previous:
+        connection.execute(insert(PostSlugs).values(slug=previous, post_id=target.id))
+    slug_cache.invalidate(previous, slug, session=object_session(target))
+
+
+@event.listens_for(Posts, "after_delete")
+def _slug_deleted_post(_mapper, connection, target):
+    """Free the current and previous slugs of a deleted post."""
+    previous = connection.execute(
+        select(PostSlugs.slug).where(PostSlugs.post_id == target.id)
+    ).scalars().all()
+    if previous:
+        connection.execute(delete(PostSlugs).where(PostSlugs.post_id == target.id))
+    slug_cache.invalidate(target.slug, *previous, session=object_session(target))
@@ -0,0 +1,95 @@
+"""
+Module for streaming rendered pages.
+
+`render_template` builds the whole page in memory before the first byte is
+sent. `stream_page` renders it with `stream_template` instead, so the head of
+the page (styles, scripts, navigation) reaches the browser while the rest is
+still being rendered, and no more than a buffer's worth of HTML is held at once.
+
+A streamed page is rendered after the response headers, and so the session
+cookie, have been sent. Anything the page would store in the session while
+rendering (the CSRF token, consumed flashed messages) is therefore prepared
+before streaming starts.
+
+Classes:
+    LazyFragment: HTML fragment rendered only when the page reaches it.
+
+Functions:
+    stream_page(template, **context): Render a page as a streamed response.
+
+Configuration:
+    STREAM_TEMPLATES: Whether to stream pages, or render them in full as before.
+    STREAM_BUFFER_SIZE: Characters of HTML collected before each chunk is sent.
+"""
+
+from flask import current_app, get_flashed_messages, render_template, stream_template
+from flask_wtf.csrf import generate_csrf
+
+# Characters of the first chunk, enough for the <head> of base.html
+FIRST_CHUNK_SIZE = 1024
+
+
+class LazyFragment:
+    """
+    HTML fragment rendered only when the page reaches it.
+
+    Passed as the `fragment` of a page streamed around it, the layout before the
+    fragment is sent before the fragment's queries run.
+    """
+
+    def __init__(self, render):
+        self.render = render
+
+    def __html__(self):
+        return self.render()
+
+
+def _buffered(chunks, size):
+    """
+    Join the small chunks Jinja yields into chunks of at least `size` characters.
+    The first chunk is sent once it holds the head of the page, so the browser
+    can start fetching styles and scripts while the body is rendered.
+    """
+    buffer = []
+    buffered = 0
+    threshold = min(size, FIRST_CHUNK_SIZE)
+    try:
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= threshold:
+                yield "".join(buffer)
+                buffer = []
+                buffered = 0
+                threshold = size
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # Pop the request context kept for rendering if the client went away
+        chunks.close()
+
+
+def stream_page(template, **context):
+    """
+    Render a page as a streamed response.
+
+    Args:
+        template (str): The page template.
+        **context: The template context.
+
+    Returns:
+        Response: The streamed page, or the rendered page if `STREAM_TEMPLATES`
+        is off.
+    """
+    config = current_app.config
+    if not config.get("STREAM_TEMPLATES", True):
+        return render_template(template, **context)
+    # Store what the page needs in the session before the cookie is sent
+    get_flashed_messages()
+    if config.get("WTF_CSRF_ENABLED", True):
+        generate_csrf()
+    chunks = stream_template(template, **context)
+    return current_app.response_class(
+        _buffered(chunks, config.get("STREAM_BUFFER_SIZE", 4096)),
+        mimetype="text/html",
+    )
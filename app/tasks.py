@@ -0,0 +1,59 @@
+"""
+Module for the background jobs enqueued by the write views.
+
+Functions:
+    purge_pages(post_ids, feed): Drop the cached pages showing changed posts.
+    schedule_purge(post_ids, feed): Purge the cached pages showing changed posts
+        now or from a job, depending on whether the page cache is shared.
+    make_picture_variants(filename): Generate the resized variants of a picture.
+"""
+
+import os
+from .extensions import job_queue, page_cache
+from .images import make_variants, upload_folder
+from .jobs import job
+
+
+@job("pages.purge")
+def purge_pages(post_ids=(), feed=True):
+    """
+    Drop the cached pages showing changed posts.
+
+    Args:
+        post_ids (list, optional): The IDs of the posts whose pages changed.
+        feed (bool, optional): Whether the feed changed too.
+    """
+    for post_id in post_ids:
+        page_cache.invalidate_post(post_id)
+    if feed:
+        page_cache.invalidate_feed()
+
+
+def schedule_purge(post_ids=(), feed=True):
+    """
+    Purge the cached pages showing changed posts once a write commits.
+
+    A shared page cache (`PAGE_CACHE_TYPE = "filesystem"`) can be purged by any
+    process, so the purge is queued as a job. A per-process cache can only be
+    purged by the process that made the write, so it is purged right away;
+    other workers' copies expire after `PAGE_CACHE_TTL`.
+
+    Args:
+        post_ids (list, optional): The IDs of the posts whose pages changed.
+        feed (bool, optional): Whether the feed changed too.
+    """
+    if page_cache.shared:
+        job_queue.enqueue(purge_pages, post_ids=list(post_ids), feed=feed)
+    else:
+        purge_pages(post_ids=post_ids, feed=feed)
+
+
+@job("images.variants")
+def make_picture_variants(filename):
+    """
+    Generate the resized variants of an uploaded picture.
+
+    Args:
+        filename (str): Name of the stored picture.
+    """
+    make_variants(os.path.join(upload_folder(), filename))
@@ -0,0 +1,262 @@
+"""
+Module for importing and exporting users and posts in bulk.
+
+The web forms insert one row per request, each in its own transaction and through
+a full ORM object, which makes loading a large dump take hours. These commands
+stream rows from and to NDJSON or CSV files instead:
+
+- Imports insert batches of rows with a single Core `insert()` executemany per
+  batch and commit per batch, so memory stays flat however large the file is.
+  Plain text passwords of imported users are hashed in bulk across the hashing
+  pool.
+- Exports read with `yield_per`, so rows are fetched and written in chunks
+  rather than loaded all at once.
+
+Core inserts bypass the mapper events that keep the search index, the per-user
+post counters, the rendered post bodies and unique slugs up to date, so a posts
+import renders each batch's bodies, assigns its slugs and indexes the rows it
+inserted itself, in the batch's transaction, and reconciles the counters once at
+the end.
+
+Usage:
+    flask data export posts posts.ndjson
+    flask data export users users.csv
+    flask data import users users.csv
+    flask data import posts posts.ndjson --batch-size 5000
+
+Attributes:
+    data_cli (AppGroup): The `flask data` command group.
+"""
+
+import csv
+import json
+import os
+import time
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert, select, text
+from .content import render_post
+from .counters import reconcile_post_counters
+from .extensions import db, page_cache, password_hasher
+from .models import Users, Posts
+from .search import index_new_posts
+from .slugs import assign_slugs
+
+MODELS = {"users": Users, "posts": Posts}
+FORMATS = ("ndjson", "csv")
+BATCH_SIZE = 1000
+FORMAT_HELP = "Defaults to the file extension."
+
+data_cli = AppGroup("data", help="Import and export users and posts.")
+
+
+def _detect_format(file, fmt):
+    """Return the explicit format, or guess it from the file name."""
+    if fmt:
+        return fmt
+    return "csv" if os.path.splitext(file.name)[1].lower() == ".csv" else "ndjson"
+
+
+def _read_rows(file, fmt):
+    """Yield each record of an NDJSON or CSV file as a dict."""
+    if fmt == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _parse_value(column, value):
+    """Convert a value read from a file to the type of a column."""
+    if value is None or (value == "" and column.nullable):
+        return None
+    python_type = column.type.python_type
+    if value == "" and python_type is not str:
+        return _column_default(column)
+    if isinstance(value, python_type):
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is bool:
+        return str(value).lower() in ("1", "true", "yes")
+    return python_type(value)
+
+
+def _format_value(value):
+    """Convert a column value to a JSON and CSV friendly value."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _column_default(column):
+    """The value used for a column a record leaves out."""
+    if column.default is not None and column.default.is_scalar:
+        return column.default.arg
+    return None
+
+
+def _prepare_batch(model, records):
+    """
+    Turn raw records into rows for an executemany insert.
+
+    Unknown keys are dropped and every row gets the same keys, with the column's
+    default for those a record leaves out. Plain text passwords of users are
+    hashed in bulk, and the display columns of posts are rendered from their
+    content rather than trusted from the file.
+
+    Args:
+        model (type): The model the records are for.
+        records (list): Dicts read from the file.
+
+    Returns:
+        list: Rows ready to be inserted.
+    """
+    columns = model.__table__.columns
+    rows = [
+        {
+            key: _parse_value(columns[key], value)
+            for key, value in record.items()
+            if key in columns
+        }
+        for record in records
+    ]
+    if model is Users:
+        to_hash = [
+            (row, record["password"])
+            for row, record in zip(rows, records)
+            if record.get("password") and not row.get("password_hash")
+        ]
+        hashes = password_hasher.hash_many([password for _, password in to_hash])
+        for (row, _), password_hash in zip(to_hash, hashes):
+            row["password_hash"] = password_hash
+    if model is Posts:
+        for row in rows:
+            if row.get("content") is not None:
+                row.update(render_post(row["content"]))
+    keys = set().union(*rows)
+    for row in rows:
+        for key in keys - row.keys():
+            row[key] = _column_default(columns[key])
+    return rows
+
+
+def import_records(model, records, batch_size=BATCH_SIZE):
+    """
+    Insert records in batches, committing each batch.
+
+    Args:
+        model (type): Users or Posts.
+        records (iterable): Dicts keyed by column name.
+        batch_size (int, optional): Rows per insert and per transaction.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    engine = db.engine
+    count = 0
+    batch = []
+
+    def flush():
+        rows = _prepare_batch(model, batch)
+        with engine.begin() as connection:
+            if model is Posts:
+                assign_slugs(connection, rows)
+                # Posts created meanwhile are indexed already, so only this
+                # batch's rows are added
+                post_ids = connection.scalars(
+                    insert(model).returning(Posts.id), rows
+                ).all()
+                index_new_posts(connection, post_ids)
+            else:
+                connection.execute(insert(model), rows)
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+            count += len(batch)
+            batch = []
+    if batch:
+        flush()
+        count += len(batch)
+
+    if engine.dialect.name == "postgresql" and count:
+        # Imported IDs do not advance the sequence of the primary key
+        table = model.__tablename__
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                )
+            )
+    if model is Posts and count:
+        with engine.begin() as connection:
+            reconcile_post_counters(connection)
+        page_cache.invalidate_feed()
+    return count
+
+
+def export_records(model, batch_size=BATCH_SIZE):
+    """
+    Yield every row of a model's table as a dict, fetched in chunks.
+
+    Args:
+        model (type): Users or Posts.
+        batch_size (int, optional): Rows fetched at a time.
+
+    Yields:
+        dict: The row, keyed by column name.
+    """
+    with db.engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(
+            select(model.__table__).order_by(model.__table__.c.id)
+        )
+        for row in result.mappings():
+            yield {key: _format_value(value) for key, value in row.items()}
+
+
+def _report(verb, count, model_name, started):
+    """Print the number of rows moved and the rate, to stderr."""
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else 0
+    click.echo(
+        f"{verb} {count} {model_name} in {elapsed:.1f}s ({rate:.0f} rows/s)", err=True
+    )
+
+
+@data_cli.command("import")
+@click.argument("model_name", type=click.Choice(MODELS))
+@click.argument("file", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help=FORMAT_HELP)
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+def import_command(model_name, file, fmt, batch_size):
+    """Import users or posts from an NDJSON or CSV file ("-" for stdin)."""
+    started = time.perf_counter()
+    records = _read_rows(file, _detect_format(file, fmt))
+    count = import_records(MODELS[model_name], records, batch_size)
+    _report("Imported", count, model_name, started)
+
+
+@data_cli.command("export")
+@click.argument("model_name", type=click.Choice(MODELS))
+@click.argument("file", type=click.File("w", encoding="utf-8"), default="-")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help=FORMAT_HELP)
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+def export_command(model_name, file, fmt, batch_size):
+    """Export users or posts to an NDJSON or CSV file (stdout by default)."""
+    started = time.perf_counter()
+    model = MODELS[model_name]
+    count = 0
+    if _detect_format(file, fmt) == "csv":
+        writer = csv.DictWriter(file, fieldnames=list(model.__table__.columns.keys()))
+        writer.writeheader()
+        for count, row in enumerate(export_records(model, batch_size), start=1):
+            writer.writerow(row)
+    else:
+        for count, row in enumerate(export_records(model, batch_size), start=1):
+            file.write(json.dumps(row) + "\n")
+    _report("Exported", count, model_name, started)
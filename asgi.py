@@ -0,0 +1,115 @@
+"""
+Production ASGI entry point.
+
+Serves the same application as wsgi.py from an ASGI server. The request body is
+read on the server's event loop before the request is given a thread, so a
+client uploading slowly holds a connection rather than a worker thread. Views
+run on a pool of `ASGI_THREADS` threads; the feed, single post, search and
+profile update views run their queries on the event loop through the async
+engine (`ASYNC_ENGINE`) and render back on their thread.
+
+asgiref's WSGI adapter runs every request on one shared thread; `ThreadedWsgiToAsgi`
+gives it a thread pool instead.
+
+Usage:
+    uvicorn --workers 4 asgi:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from asgiref.sync import AsyncToSync, sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import create_app
+from app.extensions import async_db
+
+# The adapter's synchronous request handler, without its one-thread wrapper
+_run_wsgi_app = WsgiToAsgiInstance.__dict__["run_wsgi_app"].func
+
+# Bodies up to this size are buffered in memory, larger ones in a temporary file
+SPOOL_SIZE = 64 * 1024
+
+
+class _ThreadedInstance(WsgiToAsgiInstance):
+    """Adapter instance running the application on a thread pool."""
+
+    def __init__(self, wsgi_application, executor, max_body_size):
+        super().__init__(wsgi_application)
+        self.executor = executor
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError("WSGI wrapper received a non-HTTP scope")
+        self.scope = scope
+        with SpooledTemporaryFile(max_size=SPOOL_SIZE) as body:
+            size = 0
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    raise ValueError("WSGI wrapper received a non-HTTP-request message")
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if self.max_body_size is not None and size > self.max_body_size:
+                    # Refuse oversized uploads before spooling them to disk
+                    await send(
+                        {
+                            "type": "http.response.start",
+                            "status": 413,
+                            "headers": [(b"content-type", b"text/plain")],
+                        }
+                    )
+                    await send({"type": "http.response.body", "body": b"Payload Too Large"})
+                    return
+                body.write(chunk)
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            self.sync_send = AsyncToSync(send)
+            await sync_to_async(
+                _run_wsgi_app, thread_sensitive=False, executor=self.executor
+            )(self, body)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """
+    Wraps a Flask application as an ASGI application running on a thread pool.
+
+    Args:
+        app (Flask): The application.
+        threads (int): Requests handled at the same time.
+    """
+
+    def __init__(self, app, threads):
+        super().__init__(app)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="asgi")
+        self.max_body_size = app.config.get("MAX_CONTENT_LENGTH")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        await _ThreadedInstance(self.wsgi_application, self.executor, self.max_body_size)(
+            scope, receive, send
+        )
+
+    async def _lifespan(self, receive, send):
+        """Close the async engine's connections when the server shuts down."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                with self.wsgi_application.app_context():
+                    await async_db.dispose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+flask_app = create_app(
+    os.environ.get("FLASK_CONFIG", "prod"),
+    {"ASYNC_ENGINE": os.environ.get("ASYNC_ENGINE", "1") == "1"},
+)
+app = ThreadedWsgiToAsgi(flask_app, flask_app.config["ASGI_THREADS"])
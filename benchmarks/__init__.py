@@ -0,0 +1,6 @@
+"""
+Benchmarks for the Flask blog application.
+
+Each module in this package is a standalone script run from the repository root,
+for example `python -m benchmarks.query_plans`.
+"""
@@ -0,0 +1,131 @@
+"""
+Connections a single worker sustains: gunicorn sync and gthread vs the ASGI app.
+
+Seeds a temporary SQLite database and starts one worker of each server model:
+gunicorn `sync`, gunicorn `gthread` and uvicorn running asgi:app with the async
+engine. Against each, `--slow` clients open a connection and upload a request
+body a byte at a time (a slow mobile upload), holding their connection for the
+whole run, while `--concurrency` clients read /posts/. The read throughput and
+latency show how many slow connections the worker absorbs before readers
+starve: a sync worker is blocked by one, gthread by one per thread, and the ASGI
+server buffers the bodies on its event loop without taking a thread.
+
+Usage:
+    python -m benchmarks.async_views --slow 0 16 64 256 --duration 10
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine
+from benchmarks.common import drive, format_stats, wait_for_port
+from benchmarks.seed import seed
+
+# Bytes in each slow upload, of which one is sent every SLOW_INTERVAL seconds
+SLOW_BODY_SIZE = 64 * 1024
+SLOW_INTERVAL = 0.5
+
+
+def _servers(args):
+    """The command line of each server model, by label."""
+    gunicorn = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+    gunicorn += ["--access-logfile", "/dev/null", "--timeout", "0"]
+    return {
+        "gunicorn sync": gunicorn + ["-k", "sync", "wsgi:app"],
+        f"gunicorn gthread ({args.threads})": gunicorn
+        + ["-k", "gthread", "--threads", str(args.threads), "wsgi:app"],
+        "uvicorn asgi": [sys.executable, "-m", "uvicorn", "asgi:app"]
+        + ["--port", str(args.port), "--log-level", "warning", "--no-access-log"],
+    }
+
+
+def _slow_upload(port, stop):
+    """Trickle a request body to the server until `stop` is set."""
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=60) as sock:
+            sock.sendall(
+                b"POST /auth/login HTTP/1.1\r\nHost: localhost\r\n"
+                b"Content-Type: application/x-www-form-urlencoded\r\n"
+                + f"Content-Length: {SLOW_BODY_SIZE}\r\n\r\n".encode()
+            )
+            sent = 0
+            while not stop.wait(SLOW_INTERVAL) and sent < SLOW_BODY_SIZE - 1:
+                sock.sendall(b"x")
+                sent += 1
+    except OSError:
+        pass
+
+
+def measure(port, slow, concurrency, duration):
+    """
+    Read the feed while `slow` connections trickle uploads.
+
+    Returns:
+        dict: Read statistics (see benchmarks.common.summarize).
+    """
+    stop = threading.Event()
+    uploaders = [
+        threading.Thread(target=_slow_upload, args=(port, stop), daemon=True)
+        for _ in range(slow)
+    ]
+    for uploader in uploaders:
+        uploader.start()
+    # Let the uploads connect and occupy whatever they occupy
+    time.sleep(1)
+    try:
+        return drive(
+            "127.0.0.1", port, [("GET", "/posts/", None, None)], concurrency, duration
+        )["all"]
+    finally:
+        stop.set()
+
+
+def main():
+    """Parse arguments, seed the database and benchmark each server model."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--slow", type=int, nargs="+", default=[0, 16, 64, 256])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        engine = create_engine(database_url)
+        seed(engine, 100, args.posts)
+        engine.dispose()
+
+        print(
+            f"1 worker, {args.concurrency} feed readers, {args.duration:.0f}s per run, "
+            f"{args.posts} posts"
+        )
+        env = dict(
+            os.environ,
+            SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+            DATABASE_URL=database_url,
+            WEB_CONCURRENCY="1",
+            GUNICORN_BIND=f"127.0.0.1:{args.port}",
+            GUNICORN_MAX_REQUESTS="0",
+            SESSION_COOKIE_SECURE="0",
+        )
+        for label, command in _servers(args).items():
+            for slow in args.slow:
+                with subprocess.Popen(command, env=env, stderr=subprocess.DEVNULL) as server:
+                    try:
+                        wait_for_port("127.0.0.1", args.port)
+                        stats = measure(args.port, slow, args.concurrency, args.duration)
+                    finally:
+                        server.terminate()
+                        server.wait()
+                print(format_stats(f"{label}, {slow} slow", stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Functions:
+    summarize(latencies, elapsed, errors): Throughput and latency percentiles.
+    format_stats(label, stats): One line of results.
+    drive(host, port, requests, concurrency, duration): Concurrent HTTP load driver.
+    wait_for_port(host, port): Block until a server accepts connections.
+    save_results(path, results): Write results as JSON.
+    compare_results(results, baseline_path, tolerance): Report regressions.
+"""
+
+import http.client
+import json
+import socket
+import threading
+import time
+
+
+def percentile(samples, fraction):
+    """Return the given fraction (0-1) percentile of a list of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """
+    Summarize latency samples.
+
+    Args:
+        latencies (list): Latency of each request, in milliseconds.
+        elapsed (float): Wall time the samples were collected over, in seconds.
+        errors (int, optional): Number of failed requests.
+
+    Returns:
+        dict: Request count, errors, throughput and p50/p95/p99 latency (ms).
+    """
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else float("nan"),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def format_stats(label, stats):
+    """Format one line of benchmark results."""
+    return (
+        f"  {label:<24} {stats['rps']:8.1f} req/s   "
+        f"p50 {stats['p50']:7.1f} ms   p95 {stats['p95']:7.1f} ms   "
+        f"p99 {stats['p99']:7.1f} ms   errors {stats['errors']}"
+    )
+
+
+def drive(host, port, requests, concurrency, duration):
+    """
+    Send requests from `concurrency` threads for `duration` seconds.
+
+    Each thread keeps its own connection alive and cycles through `requests`,
+    starting at a different offset so the mix is spread across threads.
+
+    Args:
+        host (str): Server host.
+        port (int): Server port.
+        requests (list): (method, path, body, headers) tuples to cycle through.
+        concurrency (int): Number of client threads.
+        duration (float): Seconds to run for.
+
+    Returns:
+        dict: Per-path statistics (see summarize), plus an "all" entry.
+    """
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local, local_errors = {}, {}
+        i = offset
+        while time.perf_counter() < deadline:
+            method, path, body, headers = requests[i % len(requests)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors[path] = local_errors.get(path, 0) + 1
+            except (OSError, http.client.HTTPException):
+                local_errors[path] = local_errors.get(path, 0) + 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            local.setdefault(path, []).append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            for path, samples in local.items():
+                latencies.setdefault(path, []).extend(samples)
+            for path, count in local_errors.items():
+                errors[path] = errors.get(path, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {
+        path: summarize(samples, elapsed, errors.get(path, 0))
+        for path, samples in latencies.items()
+    }
+    results["all"] = summarize(
+        [sample for samples in latencies.values() for sample in samples],
+        elapsed,
+        sum(errors.values()),
+    )
+    return results
+
+
+def wait_for_port(host, port, timeout=30):
+    """Block until a TCP port accepts connections."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} did not start")
+
+
+def save_results(path, results):
+    """Write benchmark results as JSON."""
+    with open(path, "w", encoding="utf-8") as out:
+        json.dump(results, out, indent=2, sort_keys=True)
+
+
+def compare_results(results, baseline_path, tolerance):
+    """
+    Compare results with a saved baseline.
+
+    A benchmark regresses when its p95 latency grew, or its throughput (if it
+    has one) dropped, by more than `tolerance` (a fraction, e.g. 0.2 for 20%).
+
+    Args:
+        results (dict): Results keyed by benchmark name.
+        baseline_path (str): Path of results saved by an earlier run.
+        tolerance (float): Allowed relative change.
+
+    Returns:
+        list: A description of each regression.
+    """
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if stats["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {before['p95']:.1f} ms -> {stats['p95']:.1f} ms"
+            )
+        if "rps" in stats and stats["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {before['rps']:.1f} req/s -> {stats['rps']:.1f} req/s"
+            )
+    return regressions
@@ -0,0 +1,135 @@
+"""
+Benchmark of read latency while posts are being written, per SQLite journal mode.
+
+Seeds an SQLite database, then runs reader threads issuing the feed query while a
+writer thread keeps inserting posts, once with SQLite's default rollback journal
+and once with the connection pragmas of the app (WAL, synchronous=NORMAL, mmap,
+busy timeout). Prints reader throughput and latency percentiles, the writer's
+commits per second, and the number of "database is locked" errors of each.
+
+Usage:
+    python -m benchmarks.concurrency --readers 8 --duration 10
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from app.database import tune_engine
+from app.models import Posts, Users
+from benchmarks.common import format_stats, summarize
+from benchmarks.seed import seed
+from config import Config
+
+FEED_QUERY = (
+    select(Posts.id, Posts.title, Users.name)
+    .join(Users, Posts.poster_id == Users.id)
+    .order_by(Posts.date_posted.desc(), Posts.id.desc())
+    .limit(10)
+)
+
+
+def run(engine, readers, duration, batch):
+    """
+    Read the feed from `readers` threads while one thread writes posts.
+
+    Args:
+        engine (Engine): The database to use.
+        readers (int): Number of reader threads.
+        duration (float): Seconds to run for.
+        batch (int): Posts inserted per write transaction.
+
+    Returns:
+        tuple: Reader statistics (see common.summarize) and writer commits/sec.
+    """
+    deadline = time.perf_counter() + duration
+    latencies = []
+    errors = []
+    commits = []
+    lock = threading.Lock()
+
+    def reader():
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(FEED_QUERY).all()
+            except OperationalError:
+                failed += 1
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    def writer():
+        count = 0
+        serial = itertools.count()
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        insert(Posts),
+                        [
+                            {
+                                "title": "Concurrent post",
+                                "content": "<p>" + "text " * 200 + "</p>",
+                                "slug": f"concurrent-{next(serial)}",
+                                "poster_id": 1,
+                                "date_posted": datetime.now(),
+                            }
+                            for _ in range(batch)
+                        ],
+                    )
+                count += 1
+            except OperationalError:
+                with lock:
+                    errors.append(1)
+        commits.append(count)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, sum(errors)), commits[0] / elapsed
+
+
+def main():
+    """Parse arguments, seed the database and compare the journal modes."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+
+    print(
+        f"{args.readers} readers, 1 writer ({args.batch} posts per commit), "
+        f"{args.duration:.0f}s per run, {args.posts} posts"
+    )
+    for label, pragmas in (
+        ("rollback journal", {"busy_timeout": 5000}),
+        ("WAL (app pragmas)", Config.SQLITE_PRAGMAS),
+    ):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine("sqlite:///" + os.path.join(tmp, "bench.db"))
+            seed(engine, 100, args.posts)
+            engine.dispose()
+            tune_engine(engine, pragmas)
+            stats, commits = run(engine, args.readers, args.duration, args.batch)
+            engine.dispose()
+        print(format_stats(label, stats) + f"   writer {commits:.1f} commits/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Concurrent load test of the blueprint routes against a running server.
+
+Seeds a temporary SQLite database, starts gunicorn on benchmarks.server:app with
+gunicorn.conf.py, logs in as the admin user, then drives a weighted mix of the
+routes in benchmarks.routes from concurrent keep-alive clients and prints
+throughput and p50/p95/p99 latency for each route and for the whole mix.
+
+Results can be saved as JSON and compared with an earlier run; the script exits
+non-zero on a regression beyond the tolerance.
+
+Usage:
+    python -m benchmarks.load --scale 100k --concurrency 16 --duration 30
+    python -m benchmarks.load --baseline load.json --tolerance 0.2
+"""
+
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+from urllib.parse import urlencode
+from sqlalchemy import create_engine
+from benchmarks.common import (
+    compare_results,
+    drive,
+    format_stats,
+    save_results,
+    wait_for_port,
+)
+from benchmarks.routes import BENCHMARK_CONFIG, ROUTES
+from benchmarks.seed import PASSWORD, SCALES, seed
+
+# Relative share of each route in the traffic mix, roughly that of a blog
+WEIGHTS = {
+    "posts.posts": 10,
+    "posts.post": 10,
+    "general.search": 3,
+    "auth.login": 1,
+    "general.admin": 1,
+}
+
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+def admin_cookie(host, port):
+    """Log in as the admin user and return the session cookie header."""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request(
+        "POST",
+        "/auth/login",
+        body=urlencode({"username": "user0", "password": PASSWORD}),
+        headers=FORM_HEADERS,
+    )
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    cookie = response.getheader("Set-Cookie")
+    if response.status != 302 or not cookie:
+        raise RuntimeError("admin login failed")
+    return cookie.split(";", 1)[0]
+
+
+def request_mix(cookie):
+    """Return the (method, path, body, headers) list matching WEIGHTS."""
+    mix = []
+    for name, weight in WEIGHTS.items():
+        method, path, form, as_admin = ROUTES[name]
+        headers = dict(FORM_HEADERS) if form else {}
+        if as_admin:
+            headers["Cookie"] = cookie
+        body = urlencode(form) if form else None
+        mix += [(method, path, body, headers)] * weight
+    return mix
+
+
+def main():
+    """Parse arguments, seed the database, start the server and drive load."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--baseline", help="compare with results saved earlier")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        user_count, post_count = SCALES[args.scale]
+        engine = create_engine(database_url)
+        seed(engine, user_count, post_count, rounds=BENCHMARK_CONFIG["BCRYPT_LOG_ROUNDS"])
+        engine.dispose()
+
+        env = dict(
+            os.environ,
+            SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+            DATABASE_URL=database_url,
+            WEB_CONCURRENCY=str(args.workers),
+            GUNICORN_BIND=f"127.0.0.1:{args.port}",
+            GUNICORN_MAX_REQUESTS="0",
+        )
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+        command += ["--access-logfile", "/dev/null", "benchmarks.server:app"]
+        with subprocess.Popen(command, env=env, stderr=subprocess.DEVNULL) as server:
+            try:
+                wait_for_port("127.0.0.1", args.port)
+                mix = request_mix(admin_cookie("127.0.0.1", args.port))
+                by_path = drive(
+                    "127.0.0.1", args.port, mix, args.concurrency, args.duration
+                )
+            finally:
+                server.terminate()
+                server.wait()
+
+    paths = {path: name for name, (_, path, _, _) in ROUTES.items()}
+    results = {paths.get(path, path): stats for path, stats in by_path.items()}
+    print(
+        f"{user_count} users, {post_count} posts, {args.workers} workers, "
+        f"{args.concurrency} concurrent clients, {args.duration:.0f}s"
+    )
+    for name, stats in sorted(results.items()):
+        print(format_stats(name, stats))
+    if args.json:
+        save_results(args.json, results)
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
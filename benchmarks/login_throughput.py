@@ -0,0 +1,53 @@
+"""
+Benchmark of password checks per second against the hashing pool size.
+
+Simulates concurrent logins on a threaded worker: a fixed number of threads each
+check a password through a HashingService, once inline (pool size 0) and once for
+every pool size given.
+
+Usage:
+    python -m benchmarks.login_throughput --rounds 12 --threads 8 --pools 1 2 4 8
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.hashing import HashingService
+
+
+def run(service, password_hash, threads, checks):
+    """Run `checks` password checks from `threads` threads; return checks/sec."""
+    service.check(password_hash, "password")  # start the pool outside the timing
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(
+            executor.map(lambda _: service.check(password_hash, "password"), range(checks))
+        )
+    elapsed = time.perf_counter() - started
+    assert all(results)
+    return checks / elapsed
+
+
+def main():
+    """Parse arguments and print checks/sec for each pool size."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--checks", type=int, default=32)
+    parser.add_argument("--pools", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    password_hash = HashingService(rounds=args.rounds).hash("password")
+    print(f"bcrypt cost {args.rounds}, {args.threads} concurrent logins")
+    for pool_size in [0] + args.pools:
+        service = HashingService(rounds=args.rounds, pool_size=pool_size)
+        try:
+            rate = run(service, password_hash, args.threads, args.checks)
+        finally:
+            service.shutdown()
+        label = "inline" if pool_size == 0 else f"pool of {pool_size}"
+        print(f"  {label:<12} {rate:8.1f} logins/sec")
+
+
+if __name__ == "__main__":
+    main()
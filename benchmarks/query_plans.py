@@ -0,0 +1,85 @@
+"""
+Benchmark of the hot listing and lookup queries with and without secondary indexes.
+
+Seeds an SQLite database with users and posts, then prints the query plan and the
+best-of-N timing of each query twice: once with the indexes declared on the
+models, and once after dropping them.
+
+Usage:
+    python -m benchmarks.query_plans --posts 1000000 --users 1000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, select, text
+from app.models import Users, Posts
+from benchmarks.seed import seed
+
+QUERIES = {
+    "feed page": select(Posts.id)
+    .order_by(Posts.date_posted.desc(), Posts.id.desc())
+    .limit(10),
+    "my posts page": select(Posts.id)
+    .where(Posts.poster_id == 1)
+    .order_by(Posts.date_posted.desc(), Posts.id.desc())
+    .limit(10),
+    "poster backref": select(Posts.id).where(Posts.poster_id == 1),
+    "post by slug": select(Posts.id).where(Posts.slug == "post-12345"),
+    "admin users page": select(Users.id)
+    .order_by(Users.date_added.desc(), Users.id.desc())
+    .limit(25),
+}
+
+
+def measure(engine, repeat):
+    """Print the plan and the best-of-`repeat` time of every query."""
+    with engine.connect() as conn:
+        for label, query in QUERIES.items():
+            compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+            best = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(query).all()
+                best = min(best, time.perf_counter() - started)
+            print(f"  {label:<18} {best * 1000:10.3f} ms")
+            for row in plan:
+                print(f"      {row[-1]}")
+
+
+def main():
+    """Parse arguments, seed the database and run both passes."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine("sqlite:///" + os.path.join(tmp, "bench.db"))
+        started = time.perf_counter()
+        seed(engine, args.users, args.posts)
+        print(
+            f"Seeded {args.users} users and {args.posts} posts "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        print("With indexes:")
+        measure(engine, args.repeat)
+
+        with engine.begin() as conn:
+            for table in (Users.__table__, Posts.__table__):
+                for index in table.indexes:
+                    conn.execute(text(f"DROP INDEX {index.name}"))
+        # Start from fresh connections so no statement prepared against the
+        # indexed schema is reused
+        engine.dispose()
+        print("Without indexes:")
+        measure(engine, args.repeat)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
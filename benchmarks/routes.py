@@ -0,0 +1,131 @@
+"""
+Microbenchmarks of every hot blueprint route.
+
+Seeds a temporary SQLite database at the chosen scale, then times each route
+in-process through the Flask test client, so the numbers measure the view,
+queries and templates without any network or server overhead. The page cache is
+disabled so every request renders.
+
+Results can be saved as JSON and compared with an earlier run; the script exits
+non-zero when any route's p95 latency or throughput regressed by more than the
+tolerance.
+
+Usage:
+    python -m benchmarks.routes --scale 100k --iterations 200 --json routes.json
+    python -m benchmarks.routes --scale 100k --baseline routes.json --tolerance 0.2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from app import create_app
+from app.extensions import db
+from benchmarks.common import compare_results, format_stats, save_results, summarize
+from benchmarks.seed import PASSWORD, SCALES, seed
+
+# Benchmarked routes: name -> (method, path, form data, needs an admin session)
+ROUTES = {
+    "posts.posts": ("GET", "/posts/", None, False),
+    "posts.post": ("GET", "/posts/post-0", None, False),
+    "general.search": ("POST", "/search", {"searched": "pizza oven"}, False),
+    "auth.login": ("POST", "/auth/login", {"username": "user1", "password": PASSWORD}, False),
+    "general.admin": ("GET", "/admin", None, True),
+}
+
+# Settings of the benchmarked app: CSRF tokens would make the POSTs replay-unsafe,
+# the shared password is hashed with a cheap cost so logins do not rehash, and
+# rate limits would reject the repeated logins and searches.
+BENCHMARK_CONFIG = {
+    "WTF_CSRF_ENABLED": False,
+    "PAGE_CACHE_TYPE": "null",
+    "BCRYPT_LOG_ROUNDS": 4,
+    "BCRYPT_POOL_SIZE": 0,
+    "RATELIMIT_ENABLED": False,
+}
+
+
+def login(client):
+    """Log the test client in as the admin user."""
+    response = client.post(
+        "/auth/login", data={"username": "user0", "password": PASSWORD}
+    )
+    assert response.status_code == 302, "admin login failed"
+
+
+def run(app, iterations, warmup=5):
+    """
+    Time every route in ROUTES.
+
+    Args:
+        app (Flask): The application to benchmark.
+        iterations (int): Timed requests per route.
+        warmup (int, optional): Untimed requests per route made first.
+
+    Returns:
+        dict: Statistics (see common.summarize) keyed by route name.
+    """
+    anonymous = app.test_client()
+    admin = app.test_client()
+    login(admin)
+
+    results = {}
+    for name, (method, path, form, as_admin) in ROUTES.items():
+        client = admin if as_admin else anonymous
+        latencies = []
+        errors = 0
+        for i in range(warmup + iterations):
+            started = time.perf_counter()
+            response = client.open(path, method=method, data=form)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                errors += 1
+            if i >= warmup:
+                latencies.append(elapsed)
+        results[name] = summarize(latencies, sum(latencies) / 1000, errors)
+        # A successful login replaces the anonymous client's session
+        anonymous = app.test_client()
+    return results
+
+
+def main():
+    """Parse arguments, seed the database and benchmark each route."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--baseline", help="compare with results saved earlier")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        user_count, post_count = SCALES[args.scale]
+        engine = create_engine(database_url)
+        seed(engine, user_count, post_count, rounds=BENCHMARK_CONFIG["BCRYPT_LOG_ROUNDS"])
+        engine.dispose()
+
+        app = create_app(
+            "test", dict(BENCHMARK_CONFIG, SQLALCHEMY_DATABASE_URI=database_url)
+        )
+        print(f"{user_count} users, {post_count} posts, {args.iterations} requests per route")
+        results = run(app, args.iterations)
+        with app.app_context():
+            db.engine.dispose()
+
+    for name, stats in results.items():
+        print(format_stats(name, stats))
+    if args.json:
+        save_results(args.json, results)
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
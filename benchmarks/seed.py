@@ -0,0 +1,125 @@
+"""
+Seeded data generator for benchmarks.
+
+Fills a database with users and posts using batched Core inserts, deterministic
+for a given seed so runs are comparable. Every user gets the same password
+("password") hashed once, and the full-text search index is populated so search
+benchmarks see realistic data.
+
+Usage:
+    python -m benchmarks.seed sqlite:///bench.db --scale 100k
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, text
+from app.content import render_post
+from app.counters import reconcile_post_counters
+from app.extensions import db
+from app.hashing import HashingService
+from app.models import Users, Posts
+
+BATCH_SIZE = 10_000
+PASSWORD = "password"
+
+# Number of (users, posts) for each named scale
+SCALES = {
+    "1k": (100, 1_000),
+    "100k": (1_000, 100_000),
+    "1m": (10_000, 1_000_000),
+}
+
+WORDS = (
+    "pizza pasta flask python query index cache worker thread garden tomato "
+    "basil oven dough crust cheese sauce travel coffee morning evening blog "
+    "story recipe weekend kitchen market river mountain city music"
+).split()
+
+
+def _paragraph(rng, words):
+    """Random filler text of `words` words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _post_body(rng):
+    """A random post body with its rendered display columns."""
+    content = f"<p>{_paragraph(rng, 60)}</p>"
+    return {"content": content, **render_post(content)}
+
+
+def seed(engine, user_count, post_count, rounds=4, random_seed=0):
+    """
+    Create the schema and insert `user_count` users and `post_count` posts.
+
+    Args:
+        engine (Engine): The database to fill.
+        user_count (int): Number of users; user 1 is an admin.
+        post_count (int): Number of posts, spread randomly over the users.
+        rounds (int, optional): bcrypt cost of the shared password hash.
+        random_seed (int, optional): Seed making the data reproducible.
+    """
+    db.metadata.create_all(engine)
+    rng = random.Random(random_seed)
+    start = datetime(2020, 1, 1)
+    password_hash = HashingService(rounds=rounds).hash(PASSWORD)
+    with engine.begin() as conn:
+        for offset in range(0, user_count, BATCH_SIZE):
+            conn.execute(
+                insert(Users),
+                [
+                    {
+                        "username": f"user{i}",
+                        "name": f"User {i}",
+                        "email": f"user{i}@example.com",
+                        "date_added": start + timedelta(minutes=rng.randrange(10**6)),
+                        "is_admin": i == 0,
+                        "password_hash": password_hash,
+                    }
+                    for i in range(offset, min(offset + BATCH_SIZE, user_count))
+                ],
+            )
+        for offset in range(0, post_count, BATCH_SIZE):
+            conn.execute(
+                insert(Posts),
+                [
+                    {
+                        "title": f"Post {i} {_paragraph(rng, 3)}",
+                        "slug": f"post-{i}",
+                        "poster_id": rng.randrange(user_count) + 1,
+                        "date_posted": start + timedelta(seconds=rng.randrange(10**8)),
+                        **_post_body(rng),
+                    }
+                    for i in range(offset, min(offset + BATCH_SIZE, post_count))
+                ],
+            )
+        reconcile_post_counters(conn)
+        if engine.dialect.name == "sqlite":
+            conn.execute(
+                text(
+                    "INSERT INTO posts_fts (rowid, title, body) "
+                    "SELECT id, title, content FROM posts"
+                )
+            )
+
+
+def main():
+    """Parse arguments and seed the given database."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("database_url")
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    args = parser.parse_args()
+
+    user_count, post_count = SCALES[args.scale]
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+    seed(engine, user_count, post_count)
+    print(
+        f"Seeded {user_count} users and {post_count} posts "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+WSGI entry point of the application under load tests.
+
+Like wsgi.py, but with the benchmark settings of benchmarks.routes applied so the
+load driver can replay form POSTs without CSRF tokens.
+
+Usage:
+    gunicorn -c gunicorn.conf.py benchmarks.server:app
+"""
+
+import os
+from app import create_app
+from benchmarks.routes import BENCHMARK_CONFIG
+
+app = create_app(
+    os.environ.get("FLASK_CONFIG", "prod"),
+    dict(BENCHMARK_CONFIG, PAGE_CACHE_TYPE="memory", SESSION_COOKIE_SECURE=False),
+)
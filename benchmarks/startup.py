@@ -0,0 +1,149 @@
+"""
+Cold start time of the application.
+
+Starts a fresh interpreter `--runs` times and measures, in each, the time to
+import the app package, to run `create_app` and to serve a first request to
+/posts/ from a seeded temporary SQLite database, printing p50/p95 per phase.
+With `--importtime` it also prints the packages taking longest to import
+(from `python -X importtime`), which is where most of a cold start goes.
+
+Usage:
+    python -m benchmarks.startup --runs 20 --json startup.json
+    python -m benchmarks.startup --baseline startup.json --tolerance 0.2
+    python -m benchmarks.startup --importtime
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from sqlalchemy import create_engine
+from benchmarks.common import compare_results, percentile, save_results
+from benchmarks.seed import seed
+
+# Run in each fresh interpreter; prints the phase timings as JSON
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app(sys.argv[1], {"SQLALCHEMY_DATABASE_URI": sys.argv[2]})
+created = time.perf_counter()
+status = app.test_client().get("/posts/").status_code
+served = time.perf_counter()
+assert status == 200, status
+print(json.dumps({
+    "import": (imported - started) * 1000,
+    "create_app": (created - imported) * 1000,
+    "first_request": (served - created) * 1000,
+    "total": (served - started) * 1000,
+}))
+"""
+
+
+def measure(config_name, database_url, runs):
+    """
+    Time the phases of `runs` cold starts.
+
+    Returns:
+        dict: p50 and p95 milliseconds of each phase.
+    """
+    samples = defaultdict(list)
+    env = dict(
+        os.environ,
+        PYTHONWARNINGS="ignore",
+        SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+    )
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, config_name, database_url],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        ).stdout
+        for phase, elapsed in json.loads(output.splitlines()[-1]).items():
+            samples[phase].append(elapsed)
+    return {
+        phase: {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+        for phase, values in samples.items()
+    }
+
+
+def import_profile(config_name, limit):
+    """
+    Import time of each top-level package imported by `create_app`.
+
+    Returns:
+        list: (package, milliseconds) pairs, slowest first.
+    """
+    stderr = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"from app import create_app; create_app({config_name!r})",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=dict(
+            os.environ,
+            PYTHONWARNINGS="ignore",
+            SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+        ),
+    ).stderr
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, module = line[len("import time:") :].split("|")
+        totals[module.strip().split(".")[0]] += int(self_us)
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [(package, micros / 1000) for package, micros in ranked[:limit]]
+
+
+def main():
+    """Parse arguments, seed the database and time the cold starts."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--config", default="prod")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--baseline", help="compare with results saved earlier")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.importtime:
+        print(f"Slowest packages to import ({args.config} config):")
+        for package, elapsed in import_profile(args.config, args.top):
+            print(f"  {package:<24} {elapsed:7.1f} ms")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        engine = create_engine(database_url)
+        seed(engine, 10, 100)
+        engine.dispose()
+        results = measure(args.config, database_url, args.runs)
+
+    print(f"{args.runs} cold starts ({args.config} config)")
+    for phase, stats in results.items():
+        print(f"  {phase:<14} p50 {stats['p50']:7.1f} ms   p95 {stats['p95']:7.1f} ms")
+    if args.json:
+        save_results(args.json, results)
+    if args.baseline:
+        regressions = compare_results(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
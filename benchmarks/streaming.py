@@ -0,0 +1,131 @@
+"""
+Time to first byte, total time, size and peak memory of the streamed pages.
+
+Seeds a temporary SQLite database, then requests the feed, search and admin
+pages through the Flask test client with every combination of streamed or
+buffered rendering and compressed or plain responses. Each page is made large
+(many posts and users per page) so the difference is visible:
+
+- TTFB is the time until the first chunk of the body is available.
+- Peak memory is the largest amount of memory traced while handling the request,
+  measured with tracemalloc in a separate pass (tracing slows requests down).
+
+Usage:
+    python -m benchmarks.streaming --scale 100k --iterations 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine
+from app import create_app
+from app.extensions import db
+from benchmarks.common import percentile
+from benchmarks.routes import BENCHMARK_CONFIG, login
+from benchmarks.seed import SCALES, seed
+
+PAGES = {
+    "feed": ("GET", "/posts/", None),
+    "search": ("POST", "/search", {"searched": "pizza"}),
+    "admin": ("GET", "/admin", None),
+}
+PAGE_SIZES = {"POSTS_PER_PAGE": 200, "USERS_PER_PAGE": 500, "SEARCH_RESULTS_LIMIT": 500}
+
+
+def _request(client, method, path, form, encoding):
+    """Make one request and return (ttfb, total) in ms and the body size."""
+    started = time.perf_counter()
+    response = client.open(
+        path,
+        method=method,
+        data=form,
+        headers={"Accept-Encoding": encoding} if encoding else {},
+        buffered=False,
+    )
+    size = 0
+    first = None
+    for chunk in response.response:
+        if first is None:
+            first = time.perf_counter()
+        size += len(chunk)
+    total = time.perf_counter()
+    response.close()
+    return (first - started) * 1000, (total - started) * 1000, size
+
+
+def measure(app, iterations, encoding):
+    """
+    Measure every page in PAGES.
+
+    Args:
+        app (Flask): The application, logged in as the admin.
+        iterations (int): Timed requests per page.
+        encoding (str): The Accept-Encoding header, or None.
+
+    Returns:
+        dict: p50 TTFB, p50 total time, body size and peak memory per page.
+    """
+    client = app.test_client()
+    login(client)
+    results = {}
+    for name, (method, path, form) in PAGES.items():
+        _request(client, method, path, form, encoding)
+        ttfbs, totals = [], []
+        for _ in range(iterations):
+            ttfb, total, size = _request(client, method, path, form, encoding)
+            ttfbs.append(ttfb)
+            totals.append(total)
+        tracemalloc.start()
+        _request(client, method, path, form, encoding)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {
+            "ttfb_p50": percentile(ttfbs, 0.5),
+            "total_p50": percentile(totals, 0.5),
+            "bytes": size,
+            "peak_kib": peak / 1024,
+        }
+    return results
+
+
+def main():
+    """Parse arguments, seed the database and measure each configuration."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        engine = create_engine(database_url)
+        seed(engine, *SCALES[args.scale], rounds=BENCHMARK_CONFIG["BCRYPT_LOG_ROUNDS"])
+        engine.dispose()
+
+        for streamed in (False, True):
+            for encoding in (None, "gzip"):
+                app = create_app(
+                    "test",
+                    dict(
+                        BENCHMARK_CONFIG,
+                        **PAGE_SIZES,
+                        SQLALCHEMY_DATABASE_URI=database_url,
+                        STREAM_TEMPLATES=streamed,
+                        COMPRESSION_ENABLED=encoding is not None,
+                    ),
+                )
+                label = f"{'streamed' if streamed else 'buffered'}, {encoding or 'identity'}"
+                for name, stats in measure(app, args.iterations, encoding).items():
+                    print(
+                        f"  {name:<7} {label:<20} ttfb {stats['ttfb_p50']:7.1f} ms"
+                        f"   total {stats['total_p50']:7.1f} ms"
+                        f"   {stats['bytes'] / 1024:7.1f} KiB"
+                        f"   peak {stats['peak_kib']:8.0f} KiB"
+                    )
+                with app.app_context():
+                    db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of gunicorn worker classes against the /posts/ route.
+
+Seeds a temporary SQLite database, then for each worker class starts gunicorn on
+wsgi:app with gunicorn.conf.py and drives /posts/ from concurrent client threads,
+printing throughput and p50/p95/p99 latency. gevent is skipped when it is not
+installed.
+
+Usage:
+    python -m benchmarks.workers --workers 2 --concurrency 32 --duration 10
+"""
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+from sqlalchemy import create_engine
+from benchmarks.common import drive, format_stats, wait_for_port
+from benchmarks.seed import seed
+
+WORKER_CLASSES = ("sync", "gthread", "gevent")
+
+
+def main():
+    """Parse arguments, seed the database and benchmark each worker class."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        engine = create_engine(database_url)
+        seed(engine, 100, args.posts)
+        engine.dispose()
+
+        print(
+            f"{args.workers} workers, {args.concurrency} concurrent clients, "
+            f"{args.duration:.0f}s per run, {args.posts} posts"
+        )
+        for worker_class in WORKER_CLASSES:
+            if worker_class == "gevent" and importlib.util.find_spec("gevent") is None:
+                print(f"  {worker_class:<24} skipped (gevent is not installed)")
+                continue
+            env = dict(
+                os.environ,
+                SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+                DATABASE_URL=database_url,
+                WEB_CONCURRENCY=str(args.workers),
+                GUNICORN_WORKER_CLASS=worker_class,
+                GUNICORN_THREADS=str(args.threads),
+                GUNICORN_BIND=f"127.0.0.1:{args.port}",
+                GUNICORN_MAX_REQUESTS="0",
+            )
+            command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+            command += ["--access-logfile", "/dev/null", "wsgi:app"]
+            with subprocess.Popen(command, env=env, stderr=subprocess.DEVNULL) as server:
+                try:
+                    wait_for_port("127.0.0.1", args.port)
+                    stats = drive(
+                        "127.0.0.1",
+                        args.port,
+                        [("GET", "/posts/", None, None)],
+                        args.concurrency,
+                        args.duration,
+                    )["all"]
+                finally:
+                    server.terminate()
+                    server.wait()
+            label = worker_class
+            if worker_class == "gthread":
+                label += f" ({args.threads} threads)"
+            print(format_stats(label, stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,79 @@
 Configuration Classes
 
 Defines configuration classes for different environments: base configuration,
-development configuration, and test configuration.
+development configuration, test configuration, and production configuration.
 
 Attributes:
     - Config: Base configuration class with common settings such as secret key,
-      database URI, track modifications, and upload folder.
+      database URI and engine options, track modifications, upload folder, page
+      sizes, caches, password hashing, background jobs, request instrumentation
+      and rate limits.
     - DevConfig: Development configuration class inheriting from Config,
-      enabling debug mode.
-    - TestConfig: Test configuration class inheriting from Config, configuring
-      the database URI for testing and enabling testing mode with CSRF protection.
+      enabling debug mode and profiling a sample of requests.
+    - TestConfig: Test configuration class inheriting from Config, using an
+      in-memory database (or TEST_DATABASE_URL) for testing, hashing passwords
+      cheaply and inline and running jobs inline, and enabling testing mode with
+      CSRF protection.
+    - ProdConfig: Production configuration class inheriting from Config, reading
+      the secret key (which must be set), database URI (SQLite or Postgres), read replicas and pool
+      sizes from the environment and sharing the page cache, user cache
+      invalidations and rate limit buckets between worker processes.
 
     - config_by_name: Dictionary mapping environment names to their respective
       configuration classes for easy access and configuration loading.
 
 """
+import os
 from dataclasses import dataclass
+from sqlalchemy.pool import QueuePool
+
+
+def _database_url(default):
+    """
+    Read the database URL from the environment.
+
+    Hosting platforms commonly export Postgres URLs with the "postgres://" scheme,
+    which SQLAlchemy no longer accepts, so it is rewritten to "postgresql://".
+    """
+    return _normalise_url(os.environ.get("DATABASE_URL", default))
+
+
+def _normalise_url(url):
+    """Rewrite a "postgres://" URL to the "postgresql://" scheme."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://") :]
+    return url
+
+
+def _test_database_url():
+    """
+    Read the test database URL from TEST_DATABASE_URL.
+
+    The default is a shared-cache in-memory SQLite database, which every engine
+    of the test process opens by name and which lives as long as a connection
+    to it is open. "{worker}" in the URL is replaced with the pytest-xdist worker
+    ID ("main" without xdist), so parallel test processes sharing a database
+    server or directory each get a database of their own, e.g.
+    TEST_DATABASE_URL=sqlite:///test_blog_{worker}.db.
+    """
+    url = os.environ.get(
+        "TEST_DATABASE_URL", "sqlite:///file:test_blog?mode=memory&cache=shared&uri=true"
+    )
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return _normalise_url(url.replace("{worker}", worker))
+
+
+def _replica_binds():
+    """
+    Read the read replica URLs from the comma-separated DATABASE_REPLICA_URLS.
+
+    Returns:
+        dict: A bind named "replica_<n>" for each URL.
+    """
+    urls = [url for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url]
+    return {
+        f"replica_{n}": _normalise_url(url) for n, url in enumerate(urls, start=1)
+    }
 
 
 @dataclass
@@ -26,7 +84,80 @@ class Config:
     SECRET_KEY = "1234"
     SQLALCHEMY_DATABASE_URI = "sqlite:///blog.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    UPLOAD_FOLDER = "app/static/images"
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": True, "pool_recycle": 1800}
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "busy_timeout": 5000,
+    }
+    POSTGRES_STATEMENT_TIMEOUT_MS = 0
+    READ_REPLICAS = []
+    REPLICA_STICKY_SECONDS = 5
+    # Relative to the app package, like its static folder
+    UPLOAD_FOLDER = "static/images"
+    MAX_CONTENT_LENGTH = 4 * 1024 * 1024
+    ASSET_FINGERPRINTING = True
+    SERVE_VENDORED_ASSETS = False
+    POSTS_PER_PAGE = 10
+    USERS_PER_PAGE = 25
+    SEARCH_RESULTS_LIMIT = 50
+    PAGE_CACHE_TYPE = "memory"
+    PAGE_CACHE_TTL = 300
+    PAGE_CACHE_MAX_ENTRIES = 512
+    USER_CACHE_TYPE = "memory"
+    USER_CACHE_TTL = 30
+    USER_CACHE_MAX_ENTRIES = 1024
+    SLUG_CACHE_TYPE = "memory"
+    SLUG_CACHE_TTL = 60
+    SLUG_CACHE_MAX_ENTRIES = 4096
+    BCRYPT_LOG_ROUNDS = 12
+    BCRYPT_POOL_SIZE = 2
+    INSTRUMENTATION_ENABLED = True
+    SERVER_TIMING_HEADER = True
+    METRICS_PATH = "/metrics"
+    PROFILE_SAMPLE_RATE = 0.0
+    PROFILE_SLOW_MS = 500
+    COMPRESSION_ENABLED = False
+    COMPRESSION_ALGORITHMS = ["br", "gzip"]
+    COMPRESSION_MIN_SIZE = 500
+    COMPRESSION_MIMETYPES = [
+        "text/html",
+        "text/css",
+        "text/plain",
+        "text/javascript",
+        "application/javascript",
+        "application/json",
+        "image/svg+xml",
+    ]
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4
+    STREAM_TEMPLATES = True
+    STREAM_BUFFER_SIZE = 4096
+    ASYNC_ENGINE = False
+    ASYNC_DATABASE_URI = None
+    ASYNC_ENGINE_OPTIONS = {"pool_pre_ping": True, "pool_recycle": 1800}
+    ASGI_THREADS = 32
+    JOBS_EAGER = False
+    JOB_WORKERS = 1
+    JOB_MAX_ATTEMPTS = 5
+    JOB_RETRY_DELAY = 2
+    JOB_TIMEOUT = 300
+    JOB_POLL_INTERVAL = 1.0
+    # Proxies in front of the app whose X-Forwarded-For / X-Forwarded-Proto
+    # headers are trusted; 0 uses the connecting address and scheme as they are
+    PROXY_FIX_X_FOR = 0
+    PROXY_FIX_X_PROTO = 0
+    RATELIMIT_ENABLED = True
+    RATELIMIT_STORAGE = "memory"
+    RATELIMIT_SQLITE_PATH = None
+    RATELIMIT_MAX_ENTRIES = 10000
+    RATE_LIMITS = {
+        "login.ip": "30/minute",
+        "login.username": "5/minute",
+        "signup.ip": "10/hour",
+        "search.ip": "30/minute",
+    }
 
 
 @dataclass
@@ -34,15 +165,70 @@ class DevConfig(Config):
     """Development configuration class."""
 
     DEBUG = True
+    PROFILE_SAMPLE_RATE = 0.1
 
 
 @dataclass
 class TestConfig(Config):
     """Test configuration class."""
 
-    SQLALCHEMY_DATABASE_URI = "sqlite:///test_blog.db"
+    SQLALCHEMY_DATABASE_URI = _test_database_url()
+    if SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        # A connection per checkout, as for a database file, rather than one
+        # per thread. A test's connection is also used by the threads running
+        # async views.
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            "poolclass": QueuePool,
+            "connect_args": {"check_same_thread": False},
+        }
+    # bcrypt's lowest cost; hashing at the production cost dominated test time
+    BCRYPT_LOG_ROUNDS = 4
+    BCRYPT_POOL_SIZE = 0
+    JOBS_EAGER = True
     TESTING = True
     WTF_CSRF_ENABLED = True
 
 
-config_by_name = {"dev": DevConfig, "test": TestConfig}
+@dataclass
+class ProdConfig(Config):
+    """Production configuration class."""
+
+    DEBUG = False
+    # Required: create_app refuses to start without it
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+    REQUIRE_SECRET_KEY = True
+    SQLALCHEMY_DATABASE_URI = _database_url(Config.SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+    POSTGRES_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 30000))
+    SQLALCHEMY_BINDS = _replica_binds()
+    READ_REPLICAS = list(SQLALCHEMY_BINDS)
+    PAGE_CACHE_TYPE = "filesystem"
+    USER_CACHE_TYPE = "filesystem"
+    SLUG_CACHE_TYPE = "filesystem"
+    # Served behind one reverse proxy, so rate limits see each client's address
+    PROXY_FIX_X_FOR = int(os.environ.get("PROXY_FIX_X_FOR", 1))
+    PROXY_FIX_X_PROTO = int(os.environ.get("PROXY_FIX_X_PROTO", 1))
+    # Buckets shared by the worker processes, so limits do not scale with them
+    RATELIMIT_STORAGE = os.environ.get("RATELIMIT_STORAGE", "sqlite")
+    SESSION_COOKIE_SECURE = os.environ.get("SESSION_COOKIE_SECURE", "1") == "1"
+    # Off by default, as a reverse proxy usually compresses responses already
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "0") == "1"
+    ASYNC_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+    ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 32))
+    # 0 when jobs are run by `flask jobs work` instead of the web processes
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+
+
+config_by_name = {"dev": DevConfig, "test": TestConfig, "prod": ProdConfig}
@@ -0,0 +1,56 @@
+"""
+Gunicorn configuration for the production entry point in wsgi.py.
+
+Every setting can be overridden from the environment:
+    - WEB_CONCURRENCY: Number of worker processes (default: 2 x CPUs + 1).
+    - GUNICORN_WORKER_CLASS: "sync", "gthread" or "gevent" (default: "gthread").
+    - GUNICORN_THREADS: Threads per worker for gthread workers (default: 4).
+    - GUNICORN_BIND: Address to listen on (default: "0.0.0.0:8000").
+    - GUNICORN_PRELOAD: "1" to run create_app once in the master before forking.
+    - GUNICORN_MAX_REQUESTS: Requests after which a worker is recycled (0 disables).
+
+Reloading:
+    `kill -HUP <master pid>` starts new workers with reloaded code and config, then
+    gracefully stops the old ones after they finish their in-flight requests (up
+    to `graceful_timeout`). With preload enabled the application code itself is
+    only reloaded by a full restart (`USR2` then `TERM` on the old master).
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import multiprocessing
+import os
+from app.extensions import async_db, db
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically, staggered so they do not all restart together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+
+
+def post_fork(server, _worker):
+    """
+    Drop database connections inherited from the master process.
+
+    With preload_app, anything create_app opened in the master is shared by every
+    forked worker; a connection must never be used by two processes. This
+    covers the primary, the read replica binds and the async engines.
+    """
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+        for engine in async_db.engines:
+            engine.sync_engine.dispose(close=False)
@@ -45,6 +45,21 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+def include_object(object_, name, type_, reflected, compare_to):
+    """Leave out the search index, which is created by hand, not by the models.
+
+    SQLite's FTS5 table `posts_fts` comes with shadow tables (`posts_fts_data`,
+    `_idx`, `_content`, `_docsize`, `_config`), and Postgres has the
+    expression index `ix_posts_search`. Without this, autogenerate would drop
+    them.
+    """
+    if type_ == 'table' and name.startswith('posts_fts'):
+        return False
+    if type_ == 'index' and name == 'ix_posts_search':
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +80,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +109,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault('include_object', include_object)
 
     connectable = get_engine()
 
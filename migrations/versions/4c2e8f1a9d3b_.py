@@ -0,0 +1,70 @@
+"""add full-text search index for posts
+
+Revision ID: 4c2e8f1a9d3b
+Revises: 137d0a151031
+Create Date: 2026-10-18 09:12:31.204518
+
+"""
+from html.parser import HTMLParser
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2e8f1a9d3b'
+down_revision = '137d0a151031'
+branch_labels = None
+depends_on = None
+
+
+# A frozen copy of app.search.html_to_text as of this revision, so the index
+# built here does not change if the application's helper does
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def html_to_text(html):
+    extractor = _TextExtractor()
+    extractor.feed(html or '')
+    extractor.close()
+    return ' '.join(' '.join(extractor.parts).split())
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts "
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        )
+        posts = bind.execute(sa.text('SELECT id, title, content FROM posts')).all()
+        if posts:
+            bind.execute(
+                sa.text(
+                    'INSERT INTO posts_fts (rowid, title, body) '
+                    'VALUES (:id, :title, :body)'
+                ),
+                [
+                    {'id': id_, 'title': title or '', 'body': html_to_text(content)}
+                    for id_, title, content in posts
+                ],
+            )
+    elif bind.dialect.name == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_posts_search ON posts USING GIN ("
+            "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, '')))"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS posts_fts')
+    elif bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_posts_search')
@@ -8,7 +8,12 @@ such as the Flask application, database session, etc.
 
 Fixtures:
     - app: Fixture to initialize the Flask application and set up the application context.
-    - session: Fixture to create a database session for each test.
+    - database: Fixture creating the schema of the test database once per session.
+    - session: Fixture running each test in a transaction rolled back afterwards.
+    - committed_session: Fixture for tests of code committing on its own connections.
+    - count_queries: Fixture returning a context manager that counts SQL statements.
+    - seed_post: Fixture returning a factory of a user with a password and a post.
+    - seed_posts: Fixture returning a factory of posts, one minute apart.
 
 Usage:
     Fixtures defined in this file are automatically discovered by pytest and made available
@@ -18,9 +23,15 @@ Usage:
         # Use app and session fixtures in the test
 """
 
+import re
+from datetime import datetime, timedelta
 import pytest
+from sqlalchemy import event, text
 from app import create_app
 from app.extensions import db  # Rename the imported db object
+from app.models import Users, Posts
+
+SAVEPOINT_STATEMENT = re.compile(r"(RELEASE |ROLLBACK TO )?SAVEPOINT ", re.IGNORECASE)
 
 
 # Fixture to initialize the Flask application
@@ -60,25 +71,228 @@ def client(app):
     return app.test_client()
 
 
+# Fixture to create the database schema once per test session
+@pytest.fixture(scope="session")
+def database():
+    """
+    Fixture creating the schema of the test database once per test session.
+
+    The test database is an in-memory SQLite database by default (see
+    TestConfig), which only lives while a connection to it is open, so one is
+    kept open until the session ends. Each pytest-xdist worker is a process of
+    its own, with a database of its own.
+
+    Returns:
+        Engine: The engine the schema was created with.
+    """
+    app = create_app("test")
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+    with engine.connect():
+        yield engine
+    with app.app_context():
+        db.drop_all()
+
+
 # Fixture to create a database session for each test
 @pytest.fixture
-def session(app):
+def session(app, database):
     """
     Fixture to create a database session for each test.
 
-    This fixture creates and manages a database session for each test function.
-    It sets up the application context, initializes the database, and creates
-    a session for database operations. After each test, it rolls back the session
-    to maintain a clean state for subsequent tests.
+    The test runs in a transaction on a single connection, rolled back after the
+    test. Every session opened during the test, including those of the requests
+    made with the test client, is bound to that connection and its commits only
+    release a SAVEPOINT, so nothing a test writes outlives it and the schema is
+    not recreated for each test.
+
+    Code committing on connections of its own (CLI commands, job workers, the
+    async engine) cannot join the transaction; tests running it use the
+    `committed_session` fixture instead.
 
     Args:
         app: Flask application fixture.
+        database: Database schema fixture.
 
     Returns:
         Session: Database session.
     """
-    with app.app_context():
-        db.create_all()
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    if connection.dialect.name == "sqlite":
+        # pysqlite only begins a transaction before a write, so releasing the
+        # test's first SAVEPOINT would commit it
+        connection.exec_driver_sql("BEGIN")
+    factory = db.session.session_factory
+    options = dict(factory.kw)
+    factory.configure(bind=connection, join_transaction_mode="create_savepoint")
+    db.session.remove()
+    try:
         yield db.session
-        db.session.rollback()
-        db.drop_all()
+    finally:
+        db.session.remove()
+        factory.kw = options
+        transaction.rollback()
+        connection.close()
+
+
+# Fixture for tests whose code commits on connections of its own
+@pytest.fixture
+def committed_session(app, database):
+    """
+    Fixture to create a database session whose commits are real.
+
+    For tests of code opening its own connections, which cannot join the
+    transaction of the `session` fixture. The tables are emptied after the test.
+
+    Args:
+        app: Flask application fixture.
+        database: Database schema fixture.
+
+    Returns:
+        Session: Database session.
+    """
+    yield db.session
+    db.session.remove()
+    reset_database()
+
+
+def reset_database():
+    """
+    Delete every row of the test database, keeping the schema that the
+    `database` fixture created once for the session.
+    """
+    with db.engine.begin() as connection:
+        for table in reversed(db.metadata.sorted_tables):
+            connection.execute(table.delete())
+        if connection.dialect.name == "sqlite":
+            # The search index is not part of the metadata
+            connection.execute(text("DELETE FROM posts_fts"))
+
+
+class QueryCounter:
+    """
+    Context manager counting the SQL statements executed on an engine.
+
+    The SAVEPOINTs of sessions joined to a test's transaction are not counted.
+
+    Attributes:
+        count (int): Number of statements executed inside the block.
+        statements (list): The SQL of each statement, for failure messages.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _record(self, _conn, _cursor, statement, *_args):
+        if SAVEPOINT_STATEMENT.match(statement):
+            return
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.count = 0
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+# Fixture to count the SQL statements issued by a block of code
+@pytest.fixture
+def count_queries(session):
+    """
+    Fixture returning a context manager that counts SQL statements.
+
+    Usage:
+        with count_queries() as counter:
+            client.get("/posts/")
+        assert counter.count == 1, counter.statements
+
+    Args:
+        session: Database session fixture.
+
+    Returns:
+        Callable: Factory creating a QueryCounter bound to the database engine.
+    """
+    return lambda: QueryCounter(db.engine)
+
+
+# Fixture to create a user and a single post
+@pytest.fixture
+def seed_post(session):
+    """
+    Fixture returning a factory of a user with a password and a single post.
+
+    The user can log in as "test_user" with the password "password123".
+
+    Usage:
+        slug = seed_post(title="Cached post", slug="cached")
+
+    Args:
+        session: Database session fixture.
+
+    Returns:
+        Callable: Factory committing the user and post and returning the slug.
+    """
+
+    def seed(title="Test post", slug="test-post"):
+        user = Users(username="test_user", name="Test User", email="test@example.com")
+        user.password = "password123"
+        post = Posts(title=title, content="<p>Hello</p>", slug=slug, poster=user)
+        session.add(post)
+        session.commit()
+        return post.slug
+
+    return seed
+
+
+# Fixture to create a number of posts
+@pytest.fixture
+def seed_posts(session):
+    """
+    Fixture returning a factory of posts titled "Post 0", "Post 1", ... about
+    pizza, posted one minute apart from 2024-01-01.
+
+    The posts are expunged from the session once committed, so later reads
+    load them (and their posters) again.
+
+    Usage:
+        seed_posts(25)
+        seed_posts(5, distinct_posters=True)
+
+    Args:
+        session: Database session fixture.
+
+    Returns:
+        Callable: Factory committing `count` posts, all by "test_user", or
+            each by a different user ("User 0", "User 1", ...) with
+            `distinct_posters`.
+    """
+
+    def seed(count, distinct_posters=False):
+        user = Users(username="test_user", name="Test User", email="test@example.com")
+        start = datetime(2024, 1, 1)
+        for i in range(count):
+            if distinct_posters:
+                user = Users(
+                    username=f"user{i}", name=f"User {i}", email=f"user{i}@example.com"
+                )
+            session.add(
+                Posts(
+                    title=f"Post {i}",
+                    content=f"Pizza {i}",
+                    slug=f"post-{i}",
+                    poster=user,
+                    date_posted=start + timedelta(minutes=i),
+                )
+            )
+        session.commit()
+        session.expunge_all()
+
+    return seed
@@ -0,0 +1,212 @@
+"""
+Test suite for the user management of the admin portal.
+
+This module contains tests checking that selected users are promoted, demoted
+and deleted with a fixed number of statements, that deleting users removes
+their posts along with the posts' index entries, slugs and cached pages, that
+the changes keep the admin on the primary and reach the user cache once they
+commit, and that the admin page is filtered and paginated on the server.
+"""
+
+import re
+from datetime import datetime
+from flask import g
+from app.admin import set_admin
+from app.extensions import db, page_cache, user_cache
+from app.models import Posts, PostSlugs, Users
+from app.search import search_posts
+
+
+def _make_users(session, *usernames, is_admin=False):
+    """Create users, dated in the order given."""
+    users = [
+        Users(
+            username=username,
+            name=username.title(),
+            email=f"{username}@example.com",
+            is_admin=is_admin,
+            date_added=datetime(2024, 1, 1, 0, 0, n),
+        )
+        for n, username in enumerate(usernames)
+    ]
+    session.add_all(users)
+    session.commit()
+    return users
+
+
+def _login_admin(app, client, session):
+    """Create an admin, newer than every other user, and log them in."""
+    app.config["WTF_CSRF_ENABLED"] = False
+    admin = Users(
+        username="admin",
+        name="Admin",
+        email="admin@example.com",
+        is_admin=True,
+        date_added=datetime(2024, 2, 1),
+    )
+    admin.password = "password123"
+    session.add(admin)
+    session.commit()
+    client.post("/auth/login", data={"username": "admin", "password": "password123"})
+    return admin
+
+
+def test_bulk_admin_privileges(app, client, session, count_queries):
+    """
+    Test granting and revoking admin privileges of several users at once.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+        count_queries: Query counting fixture.
+
+    Asserts:
+        - Whether the selected users are promoted with a single UPDATE.
+        - Whether only users whose role changes are counted.
+        - Whether admins cannot revoke their own privileges.
+    """
+    admin = _login_admin(app, client, session)
+    ann, bob, _cat = _make_users(session, "ann", "bob", "cat")
+
+    with count_queries() as queries:
+        response = client.post(
+            "/users/bulk",
+            data={"action": "promote", "user_ids": [ann.id, bob.id, admin.id]},
+        )
+    assert response.status_code == 302
+    updates = [sql for sql in queries.statements if sql.startswith("UPDATE")]
+    assert len(updates) == 1, queries.statements
+    assert "2 users" in client.get("/admin").get_data(as_text=True)
+    session.expire_all()
+    assert [user.is_admin for user in (ann, bob, _cat)] == [True, True, False]
+
+    client.post("/users/bulk", data={"action": "demote", "user_ids": [ann.id, admin.id]})
+    session.expire_all()
+    assert not ann.is_admin
+    assert bob.is_admin
+    assert admin.is_admin
+
+
+def test_bulk_delete_removes_posts(app, client, session, count_queries):
+    """
+    Test deleting several users along with their posts.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+        count_queries: Query counting fixture.
+
+    Asserts:
+        - Whether the users and their posts are deleted, and other users' posts kept.
+        - Whether the number of DELETEs does not depend on how many rows go.
+        - Whether the deleted posts leave the search index, free their slugs and
+          drop out of the cached feed.
+    """
+    _login_admin(app, client, session)
+    ann, bob, cat = _make_users(session, "ann", "bob", "cat")
+    for user in (ann, bob, ann, cat):
+        session.add(
+            Posts(title=f"Pizza by {user.name}", content="<p>pizza</p>", poster=user)
+        )
+    session.commit()
+    renamed = Posts.query.filter_by(poster_id=bob.id).one()
+    renamed.slug = "renamed"
+    session.commit()
+    page_cache.backend.set(page_cache.post_key(renamed.id), "cached")
+
+    with count_queries() as queries:
+        client.post("/users/bulk", data={"action": "delete", "user_ids": [ann.id, bob.id]})
+    deletes = [sql for sql in queries.statements if sql.startswith("DELETE")]
+    # The search index, the previous slugs, the posts and the users
+    assert len(deletes) == 4, deletes
+    assert "Deleted 2 users and 3 posts" in client.get("/admin").get_data(as_text=True)
+
+    session.expire_all()
+    assert [user.username for user in Users.query.order_by(Users.id)] == ["admin", "cat"]
+    assert [post.poster_id for post in Posts.query] == [cat.id]
+    assert [result.post.poster_id for result in search_posts("pizza")] == [cat.id]
+    assert session.query(PostSlugs).count() == 0
+    assert client.get("/posts/renamed").status_code == 404
+    assert page_cache.backend.get(page_cache.post_key(renamed.id)) is None
+
+
+def test_bulk_operations_need_an_admin(client, session):
+    """
+    Test that other users cannot change users in bulk.
+
+    Args:
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether the request is redirected to the dashboard without changes.
+    """
+    (ann,) = _make_users(session, "ann")
+    ann.password = "password123"
+    session.commit()
+    client.application.config["WTF_CSRF_ENABLED"] = False
+    client.post("/auth/login", data={"username": "ann", "password": "password123"})
+
+    response = client.post("/users/bulk", data={"action": "promote", "user_ids": [ann.id]})
+    assert response.location.endswith("/dashboard")
+    session.expire_all()
+    assert not ann.is_admin
+
+
+def test_admin_page_is_filtered_and_paginated(app, client, session):
+    """
+    Test the filters and pages of the admin page.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether users are matched by username, name or email, ignoring case.
+        - Whether the role filter keeps only admins.
+        - Whether the links to the next page keep the filters.
+    """
+    app.config["USERS_PER_PAGE"] = 2
+    _login_admin(app, client, session)
+    _make_users(session, "pizza_fan", "pasta_fan", "pizzaiolo", "baker")
+
+    html = client.get("/admin?q=PIZZA").get_data(as_text=True)
+    assert "pizzaiolo" in html and "pizza_fan" in html
+    assert "pasta_fan" not in html and "baker" not in html
+
+    html = client.get("/admin?q=_fan").get_data(as_text=True)
+    assert "pizza_fan" in html and "pasta_fan" in html
+    assert "pizzaiolo" not in html
+
+    html = client.get("/admin?role=admin").get_data(as_text=True)
+    assert "admin@example.com" in html and "baker" not in html
+
+    html = client.get("/admin?q=a").get_data(as_text=True)
+    (next_page,) = re.findall(r'href="([^"]*after=[^"]*)"', html)
+    assert "q=a" in next_page
+
+
+def test_bulk_changes_mark_the_request_as_a_writer(app, session):
+    """
+    Test that bulk changes keep the admin on the primary and drop cached users
+    only once they commit.
+
+    Args:
+        app: Flask application instance.
+        session: Database session.
+
+    Asserts:
+        - Whether the request is marked as having written.
+        - Whether the changed users stay cached until the transaction commits.
+    """
+    (ann,) = _make_users(session, "ann")
+    with app.test_request_context("/users/bulk", method="POST"):
+        user_cache.load(db.session, Users, ann.id)
+        set_admin(db.session, [ann.id], True)
+        assert g._wrote
+        assert user_cache.backend.get(ann.id) is not None
+        db.session.commit()
+        assert user_cache.backend.get(ann.id) is None
@@ -20,6 +20,19 @@ Assertions:
     - Whether the "general" blueprint is registered.
 """
 
+import os
+import runpy
+from types import SimpleNamespace
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import inspect
+from app import create_app
+from app.extensions import async_db, db
+from config import config_by_name
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
 def test_create_app(app):
     """
     Test whether the app is created correctly for testing.
@@ -53,3 +66,109 @@ def test_blueprints_registered(app):
         assert "posts" in app.blueprints
         assert "users" in app.blueprints
         assert "general" in app.blueprints
+
+
+def test_error_pages_registered(client):
+    """
+    Test whether the app factory registers the custom error pages.
+
+    Args:
+        client: Flask test client.
+
+    Asserts:
+        - Whether an unknown URL renders the custom 404 page.
+    """
+    response = client.get("/does-not-exist")
+    assert response.status_code == 404
+    assert b"404 error" in response.data
+
+
+def test_prod_config_registered():
+    """
+    Test whether a production configuration is available to the app factory.
+
+    Asserts:
+        - Whether the "prod" configuration disables debug mode.
+        - Whether it shares the page cache between worker processes.
+    """
+    prod = config_by_name["prod"]
+    assert prod.DEBUG is False
+    assert prod.PAGE_CACHE_TYPE == "filesystem"
+
+
+def test_config_overrides_applied():
+    """
+    Test whether settings passed to the app factory replace the configuration's.
+
+    Asserts:
+        - Whether the overridden setting takes the given value.
+        - Whether other settings keep the configuration's value.
+    """
+    app = create_app("test", {"POSTS_PER_PAGE": 3})
+    assert app.config["POSTS_PER_PAGE"] == 3
+    assert app.config["TESTING"] is True
+
+
+def test_prod_config_requires_secret_key():
+    """
+    Test that the production configuration refuses to start without a secret key.
+
+    Asserts:
+        - Whether create_app raises instead of signing sessions with the public
+          default key.
+    """
+    with pytest.raises(ValueError, match="SECRET_KEY"):
+        create_app("prod", {"SECRET_KEY": None})
+
+
+def test_post_fork_disposes_every_engine(database, tmp_path):
+    """
+    Test that gunicorn workers drop every connection pool inherited from the master.
+
+    Args:
+        database: Database schema fixture.
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether the primary, replica and async engines get new pools.
+    """
+    app = create_app(
+        "test",
+        {
+            "SQLALCHEMY_BINDS": {"replica": f"sqlite:///{tmp_path / 'replica.db'}"},
+            "READ_REPLICAS": ["replica"],
+            "ASYNC_ENGINE": True,
+        },
+    )
+    post_fork = runpy.run_path(os.path.join(ROOT, "gunicorn.conf.py"))["post_fork"]
+    try:
+        with app.app_context():
+            engines = [*db.engines.values(), async_db.engine.sync_engine]
+            pools = [engine.pool for engine in engines]
+            post_fork(SimpleNamespace(app=SimpleNamespace(wsgi=lambda: app)), None)
+            assert all(
+                engine.pool is not pool for engine, pool in zip(engines, pools)
+            )
+    finally:
+        # The extension keeps a metadata per bind key across apps
+        db.metadatas.pop("replica", None)
+
+
+def test_migrations_run_from_code(tmp_path):
+    """
+    Test that the migrations can be run from code, as deploy scripts do.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether `flask_migrate.upgrade()` finds the Migrate extension and
+          creates the tables.
+    """
+    app = create_app(
+        "test", {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'migrated.db'}"}
+    )
+    with app.app_context():
+        upgrade()
+        assert "posts" in inspect(db.engine).get_table_names()
+        db.engine.dispose()
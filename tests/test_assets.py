@@ -0,0 +1,138 @@
+"""
+Test suite for fingerprinted static assets in the Flask application.
+
+This module contains unit tests checking that static URLs carry a content hash,
+that fingerprinted files are served with immutable caching, and that
+precompressed siblings are served to clients accepting their encoding.
+"""
+
+import gzip
+from flask import Flask, url_for
+from app import create_app
+from app.assets import AssetManifest
+
+
+def _static_app(tmp_path):
+    """Create a bare app serving a temporary static folder."""
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_text("body { color: red; }")
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path="/static")
+    AssetManifest(app)
+    return app
+
+
+def test_static_urls_are_fingerprinted(app):
+    """
+    Test that url_for("static") produces fingerprinted URLs for known files.
+
+    Args:
+        app: Flask application instance.
+
+    Asserts:
+        - Whether the stylesheet URL contains a content hash.
+        - Whether unknown files keep their plain URL.
+    """
+    with app.test_request_context():
+        url = url_for("static", filename="css/styles.css")
+        assert url.startswith("/static/css/styles.")
+        assert url != "/static/css/styles.css"
+        assert url_for("static", filename="images/new.png") == "/static/images/new.png"
+
+
+def test_fingerprinted_file_is_immutable(tmp_path):
+    """
+    Test the caching headers of fingerprinted and plain static URLs.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether the fingerprinted URL is served with immutable caching.
+        - Whether the plain URL is still served, without immutable caching.
+    """
+    app = _static_app(tmp_path)
+    client = app.test_client()
+    with app.test_request_context():
+        url = url_for("static", filename="css/site.css")
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == b"body { color: red; }"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+    plain = client.get("/static/css/site.css")
+    assert plain.status_code == 200
+    assert "immutable" not in plain.headers.get("Cache-Control", "")
+
+
+def test_precompressed_sibling_is_served(tmp_path):
+    """
+    Test that a .gz sibling is served to clients accepting gzip.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether gzip-accepting clients get the compressed sibling.
+        - Whether other clients get the original file.
+    """
+    app = _static_app(tmp_path)
+    (tmp_path / "css" / "site.css.gz").write_bytes(gzip.compress(b"body { color: red; }"))
+    client = app.test_client()
+    with app.test_request_context():
+        url = url_for("static", filename="css/site.css")
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.mimetype == "text/css"
+    assert gzip.decompress(compressed.data) == b"body { color: red; }"
+
+    identity = client.get(url)
+    assert "Content-Encoding" not in identity.headers
+    assert identity.data == b"body { color: red; }"
+
+
+def test_upload_folder_is_not_fingerprinted(tmp_path):
+    """
+    Test that the upload folder is left out of the manifest.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether assets are fingerprinted while uploaded pictures keep their
+          plain URL.
+    """
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_text("body { color: red; }")
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "picture.png").write_bytes(b"png")
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path="/static")
+    app.config["UPLOAD_FOLDER"] = str(tmp_path / "images")
+    AssetManifest(app)
+
+    assert list(app.extensions["asset_manifest"]["fingerprinted"]) == ["css/site.css"]
+    with app.test_request_context():
+        assert url_for("static", filename="images/picture.png") == "/static/images/picture.png"
+
+
+def test_upload_folder_is_resolved_from_the_app(tmp_path, monkeypatch):
+    """
+    Test that the upload folder is left out of the manifest whatever the working
+    directory.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+        monkeypatch: Pytest fixture changing the working directory.
+
+    Asserts:
+        - Whether the relative UPLOAD_FOLDER is resolved against the app package,
+          like the static folder.
+    """
+    monkeypatch.chdir(tmp_path)
+    app = create_app("test")
+
+    manifest = app.extensions["asset_manifest"]["fingerprinted"]
+    assert "css/styles.css" in manifest
+    assert not any(filename.startswith("images/") for filename in manifest)
@@ -0,0 +1,176 @@
+"""
+Test suite for the async views and the async engine.
+
+This module contains tests checking the async driver URLs, that the feed, post,
+search and profile update views query through the async engine when it is
+enabled and stay synchronous when it is not, and that the usual session is
+restored afterwards.
+"""
+
+import inspect
+import io
+import pytest
+from sqlalchemy.pool import NullPool
+from app import create_app
+from app.async_database import async_database_url
+from app.extensions import async_db, db
+from app.models import Users, Posts
+from tests.conftest import QueryCounter, reset_database
+
+
+@pytest.fixture
+def async_app(database):
+    """
+    Fixture creating an application whose async views use the async engine.
+
+    The test client runs each coroutine on a new event loop, so connections are
+    not pooled between requests. The async engine commits on connections of
+    its own, so the tables are emptied afterwards.
+
+    Args:
+        database: Database schema fixture.
+
+    Returns:
+        Flask app: The Flask application object.
+    """
+    app = create_app(
+        "test",
+        {
+            "ASYNC_ENGINE": True,
+            "ASYNC_ENGINE_OPTIONS": {"poolclass": NullPool},
+            "WTF_CSRF_ENABLED": False,
+        },
+    )
+    with app.app_context():
+        yield app
+        db.session.rollback()
+        reset_database()
+
+
+def test_async_database_url():
+    """
+    Test the async driver variants of database URLs.
+
+    Asserts:
+        - Whether SQLite and Postgres URLs get the aiosqlite and asyncpg drivers.
+        - Whether URLs already using an async driver, or of other backends,
+          are kept.
+    """
+    assert async_database_url("sqlite:///blog.db") == "sqlite+aiosqlite:///blog.db"
+    assert (
+        async_database_url("postgresql+psycopg2://blog:secret@db/blog")
+        == "postgresql+asyncpg://blog:secret@db/blog"
+    )
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+    assert async_database_url("mysql://db/blog") == "mysql://db/blog"
+
+
+def test_async_views_use_async_engine(async_app):
+    """
+    Test that the async views query through the async engine.
+
+    Args:
+        async_app: Flask application with the async engine enabled.
+
+    Asserts:
+        - Whether the feed, post, search and profile update views respond as
+          before.
+        - Whether their queries run on the async engine, not the primary one.
+    """
+    user = Users(username="async_user", name="Async User", email="async@example.com")
+    user.password = "password123"
+    db.session.add(Posts(title="Async pizza", content="<p>Hot</p>", slug="hot", poster=user))
+    db.session.commit()
+    client = async_app.test_client()
+    client.post("/auth/login", data={"username": "async_user", "password": "password123"})
+
+    with QueryCounter(async_db.engine.sync_engine) as async_queries, QueryCounter(
+        db.engine
+    ) as sync_queries:
+        assert b"Async pizza" in client.get("/posts/").data
+        assert b"Hot" in client.get("/posts/hot").data
+        results = client.post("/search", data={"searched": "pizza"})
+        assert b"Posted by: Async User" in results.data
+        response = client.post(
+            f"/users/update/{user.id}",
+            data={
+                "name": "Renamed",
+                "email": "async@example.com",
+                "favorite_pizza_place": "",
+                "username": "async_user",
+                "profile_pic": (io.BytesIO(b""), ""),
+            },
+            content_type="multipart/form-data",
+        )
+        assert b"User updated!!" in response.data
+
+    assert async_queries.count > 0
+    assert not any("posts" in statement for statement in sync_queries.statements)
+    db.session.expire_all()
+    assert db.session.get(Users, user.id).name == "Renamed"
+
+
+def test_load_restores_session(async_app):
+    """
+    Test that `load` swaps `db.session` only while the function runs.
+
+    Args:
+        async_app: Flask application with the async engine enabled.
+
+    Asserts:
+        - Whether the function sees the async session's sync facade.
+        - Whether the usual session is back afterwards.
+    """
+    before = db.session()
+    inner = async_db.load(db.session)
+    assert inner is not before
+    assert db.session() is before
+
+
+def test_views_are_synchronous_without_async_engine(app):
+    """
+    Test that the views loading through `load` are plain functions.
+
+    Args:
+        app: Flask application instance.
+
+    Asserts:
+        - Whether no event loop is needed to serve them under WSGI.
+    """
+    for endpoint in ("posts.posts", "posts.post", "general.search", "users.update"):
+        assert not inspect.iscoroutinefunction(app.view_functions[endpoint])
+
+
+def test_replica_views_load_from_async_replicas(database):
+    """
+    Test that replica views load through the async engine of a replica.
+
+    Args:
+        database: Database schema fixture.
+
+    Asserts:
+        - Whether the feed's queries run on the replica's async engine.
+        - Whether the primary's async engine is not used.
+    """
+    url = create_app("test").config["SQLALCHEMY_DATABASE_URI"]
+    app = create_app(
+        "test",
+        {
+            "ASYNC_ENGINE": True,
+            "ASYNC_ENGINE_OPTIONS": {"poolclass": NullPool},
+            "SQLALCHEMY_BINDS": {"replica": url},
+            "READ_REPLICAS": ["replica"],
+        },
+    )
+    try:
+        with app.app_context():
+            replica = app.extensions["async_database_replicas"]["replica"]
+            with QueryCounter(replica.sync_engine) as replica_queries, QueryCounter(
+                async_db.engine.sync_engine
+            ) as primary_queries:
+                assert app.test_client().get("/posts/").status_code == 200
+            assert replica_queries.count > 0
+            assert primary_queries.count == 0
+    finally:
+        # The extension keeps a metadata per bind key across apps
+        db.metadatas.pop("replica", None)
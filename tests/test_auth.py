@@ -10,6 +10,7 @@ securely.
 
 from flask_login import current_user, login_user
 from app.extensions import bcrypt
+from app.hashing import hash_cost
 from app.models import Users
 
 # Test login route
@@ -162,3 +163,38 @@ def test_logout(client, app, session):
 
         # check that user is logged out
         assert current_user.is_authenticated is False
+
+
+def test_login_rehashes_outdated_cost(client, app, session):
+    """
+    Test that logging in upgrades a hash made with a different bcrypt cost.
+
+    Args:
+        client: Flask test client.
+        app: Flask application object.
+        session: Database session fixture.
+
+    Asserts:
+        - Whether the stored hash uses the configured cost after logging in.
+        - Whether the password still verifies against the new hash.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.test_request_context():
+        user = Users(
+            username="test_user",
+            name="Test User",
+            email="test@example.com",
+            password_hash=bcrypt.generate_password_hash(
+                "correct_password", app.config["BCRYPT_LOG_ROUNDS"] + 1
+            ).decode("utf-8"),
+        )
+        session.add(user)
+        session.commit()
+
+        client.post(
+            "/auth/login",
+            data={"username": "test_user", "password": "correct_password"},
+        )
+
+        assert hash_cost(user.password_hash) == app.config["BCRYPT_LOG_ROUNDS"]
+        assert user.verify_password("correct_password")
@@ -0,0 +1,272 @@
+"""
+Test suite for the rendered page cache in the Flask application.
+
+This module contains unit tests for the cache backends, and tests checking that
+anonymous post views are served from the cache, answered with 304 when the
+reader's copy is current, and invalidated when posts are written, and that
+cached users are invalidated in every worker sharing the cache.
+"""
+
+from flask import g
+from app import create_app
+from app.cache import MemoryCache, FileSystemCache
+from app.extensions import db, slug_cache, user_cache
+from app.models import Users, Posts
+from tests.conftest import reset_database
+
+
+def _start_new_request(session):
+    """
+    Drop what flask-login and the session kept from the previous request, since
+    the fixture's app context outlives individual requests.
+    """
+    g.pop("_login_user", None)
+    session.expunge_all()
+
+
+def test_memory_cache_evicts_and_expires():
+    """
+    Test the LRU eviction and TTL of the in-process backend.
+
+    Asserts:
+        - Whether the least recently used entry is evicted when full.
+        - Whether entries are dropped once their TTL has passed.
+    """
+    cache = MemoryCache(max_entries=2, ttl=300)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    expired = MemoryCache(max_entries=2, ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_filesystem_cache_round_trip(tmp_path):
+    """
+    Test storing, reading and deleting entries with the filesystem backend.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether a second backend on the same directory sees the entry.
+        - Whether the oldest entries are pruned beyond max_entries.
+        - Whether deleted entries are gone.
+    """
+    cache = FileSystemCache(str(tmp_path), max_entries=2)
+    cache.set("a", {"html": "<p>a</p>"})
+    assert FileSystemCache(str(tmp_path)).get("a") == {"html": "<p>a</p>"}
+
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert len(list(tmp_path.iterdir())) == 2
+
+    cache.delete("c")
+    assert cache.get("c") is None
+
+
+def test_post_view_is_cached(app, client, session, count_queries, seed_post):
+    """
+    Test that repeat anonymous views are served from the cache.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session fixture.
+        count_queries: Query counting fixture.
+        seed_post: Post factory fixture.
+
+    Asserts:
+        - Whether the second view issues no queries.
+        - Whether a matching If-None-Match is answered with 304.
+    """
+    with app.app_context():
+        slug = seed_post(title="Cached post", slug="cached")
+
+        first = client.get(f"/posts/{slug}")
+        assert first.status_code == 200
+        assert first.headers["ETag"]
+
+        with count_queries() as counter:
+            second = client.get(f"/posts/{slug}")
+        assert b"Cached post" in second.data
+        assert counter.count == 0, counter.statements
+
+        not_modified = client.get(
+            f"/posts/{slug}", headers={"If-None-Match": first.headers["ETag"]}
+        )
+        assert not_modified.status_code == 304
+
+
+def test_feed_is_invalidated_by_new_post(app, client, session, seed_post):
+    """
+    Test that adding a post invalidates the cached feed.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session fixture.
+        seed_post: Post factory fixture.
+
+    Asserts:
+        - Whether the new post appears in the feed after it is added.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        seed_post()
+
+        assert b"Fresh post" not in client.get("/posts/").data
+
+        client.post(
+            "/auth/login", data={"username": "test_user", "password": "password123"}
+        )
+        client.post(
+            "/posts/add",
+            data={"title": "Fresh post", "content": "<p>New</p>", "slug": "fresh"},
+        )
+        client.get("/auth/logout")
+        # Consume the logout flash, which would otherwise bypass the cache
+        client.get("/auth/login")
+
+        assert b"Fresh post" in client.get("/posts/").data
+
+
+def test_logged_in_user_is_cached(app, client, session, count_queries, seed_post):
+    """
+    Test that authenticated page views load the user from the user cache.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session fixture.
+        count_queries: Query counting fixture.
+        seed_post: Post factory fixture.
+
+    Asserts:
+        - Whether a steady-state authenticated view of /about issues no queries.
+        - Whether updating the user invalidates the cached copy.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        seed_post()
+        client.post(
+            "/auth/login", data={"username": "test_user", "password": "password123"}
+        )
+        _start_new_request(session)
+        client.get("/about")
+
+        _start_new_request(session)
+        with count_queries() as counter:
+            assert b"Logout" in client.get("/about").data
+        assert counter.count == 0, counter.statements
+        assert user_cache.stats()["hits"] >= 1
+
+        user = Users.query.filter_by(username="test_user").first()
+        user.update_profile(name="Renamed User")
+        _start_new_request(session)
+        assert b"Renamed User" in client.get("/dashboard").data
+
+
+def test_user_invalidations_are_shared(database, tmp_path):
+    """
+    Test that a user invalidated in one worker is reloaded by the others.
+
+    Args:
+        database: Database schema fixture.
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether each worker serves the user from its own cache.
+        - Whether a change committed in one worker drops the user in another,
+          and only once the change commits.
+    """
+    overrides = {"USER_CACHE_TYPE": "filesystem", "USER_CACHE_DIR": str(tmp_path)}
+    workers = [create_app("test", overrides), create_app("test", overrides)]
+
+    def load(app, user_id):
+        with app.app_context():
+            user = user_cache.load(db.session, Users, user_id)
+            is_admin = user.is_admin
+            db.session.remove()
+            return is_admin
+
+    try:
+        with workers[0].app_context():
+            user = Users(username="worker", name="Worker", email="worker@example.com")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            db.session.remove()
+        assert [load(app, user_id) for app in workers] == [False, False]
+
+        with workers[0].app_context():
+            db.session.get(Users, user_id).is_admin = True
+            db.session.flush()
+            # Not committed yet, so the old row may still be cached
+            assert load(workers[1], user_id) is False
+            db.session.commit()
+            db.session.remove()
+        misses = workers[1].extensions["user_cache"].misses
+        assert load(workers[1], user_id) is True
+        assert workers[1].extensions["user_cache"].misses == misses + 1
+    finally:
+        with workers[0].app_context():
+            reset_database()
+
+
+def test_slug_cache_is_shared(database, tmp_path):
+    """
+    Test that the filesystem slug cache is shared between workers.
+
+    Args:
+        database: Database schema fixture.
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether a slug resolved in one worker is served to another without
+          a lookup.
+        - Whether a slug invalidated in one worker is looked up again in
+          another.
+        - Whether a renamed post's slug is only dropped once the rename
+          commits, so no worker caches the old mapping again in between.
+    """
+    overrides = {"SLUG_CACHE_TYPE": "filesystem", "SLUG_CACHE_DIR": str(tmp_path)}
+    workers = [create_app("test", overrides), create_app("test", overrides)]
+    lookups = []
+
+    def resolve(app, slug):
+        with app.app_context():
+            return slug_cache.resolve(slug, lambda key: lookups.append(key) or (7, key))
+
+    assert resolve(workers[0], "pizza") == (7, "pizza")
+    assert resolve(workers[1], "pizza") == (7, "pizza")
+    assert lookups == ["pizza"]
+
+    with workers[1].app_context():
+        slug_cache.invalidate("pizza")
+    resolve(workers[0], "pizza")
+    assert lookups == ["pizza", "pizza"]
+
+    try:
+        with workers[0].app_context():
+            user = Users(username="slugs", name="Slugs", email="slugs@example.com")
+            post = Posts(title="Pizza", content="<p>x</p>", slug="pizza", poster=user)
+            db.session.add(post)
+            db.session.commit()
+            post.slug = "calzone"
+            db.session.flush()
+            # Not committed yet, so the old mapping stays cached
+            resolve(workers[1], "pizza")
+            assert lookups == ["pizza", "pizza"]
+            db.session.commit()
+            db.session.remove()
+        resolve(workers[1], "pizza")
+        assert lookups == ["pizza", "pizza", "pizza"]
+    finally:
+        with workers[0].app_context():
+            reset_database()
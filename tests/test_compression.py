@@ -0,0 +1,115 @@
+"""
+Test suite for response compression.
+
+This module contains tests running an app with compression enabled, checking
+which responses are compressed and with which encoding, and that streamed pages
+are compressed chunk by chunk.
+"""
+
+import gzip
+import zlib
+import pytest
+from flask import Response
+from app import create_app
+
+
+@pytest.fixture
+def compressed_app():
+    """Fixture creating an app that compresses responses of 100 bytes and more."""
+    app = create_app(
+        "test", {"COMPRESSION_ENABLED": True, "COMPRESSION_MIN_SIZE": 100}
+    )
+
+    @app.route("/_test/page")
+    def page():
+        response = Response("<p>" + "pizza " * 100 + "</p>", mimetype="text/html")
+        response.set_etag("page")
+        return response
+
+    @app.route("/_test/tiny")
+    def tiny():
+        return "ok"
+
+    @app.route("/_test/binary")
+    def binary():
+        return Response(b"\x89PNG" * 100, mimetype="image/png")
+
+    @app.route("/_test/stream")
+    def stream():
+        return Response((f"<p>part {i}</p>" * 50 for i in range(3)), mimetype="text/html")
+
+    with app.app_context():
+        yield app
+
+
+def test_compresses_allowed_responses(compressed_app):
+    """
+    Test which buffered responses are compressed.
+
+    Args:
+        compressed_app: App with compression enabled.
+
+    Asserts:
+        - Whether a large HTML page is gzipped with a weak ETag and a Vary header.
+        - Whether clients not accepting gzip get the page uncompressed.
+        - Whether small bodies and other content types are left alone.
+    """
+    client = compressed_app.test_client()
+    gzipped = {"Accept-Encoding": "gzip"}
+
+    response = client.get("/_test/page", headers=gzipped)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).startswith(b"<p>pizza pizza")
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert response.headers["ETag"] == 'W/"page"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    plain = client.get("/_test/page")
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    assert "Content-Encoding" not in client.get("/_test/tiny", headers=gzipped).headers
+    assert "Content-Encoding" not in client.get("/_test/binary", headers=gzipped).headers
+
+
+def test_prefers_brotli(compressed_app):
+    """
+    Test that Brotli is used when the client accepts it.
+
+    Args:
+        compressed_app: App with compression enabled.
+
+    Asserts:
+        - Whether the response is Brotli encoded and decodes to the page.
+    """
+    brotli = pytest.importorskip("brotli")
+    response = compressed_app.test_client().get(
+        "/_test/page", headers={"Accept-Encoding": "gzip, br"}
+    )
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data).startswith(b"<p>pizza")
+
+
+def test_compresses_streams_chunk_by_chunk(compressed_app):
+    """
+    Test that streamed responses are compressed as they are produced.
+
+    Args:
+        compressed_app: App with compression enabled.
+
+    Asserts:
+        - Whether the first chunk can be decoded before the stream ends.
+        - Whether the whole stream decodes to the original body.
+    """
+    response = compressed_app.test_client().get(
+        "/_test/stream", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks = iter(response.response)
+    assert decoder.decompress(next(chunks)).startswith(b"<p>part 0</p>")
+    rest = b"".join(decoder.decompress(chunk) for chunk in chunks)
+    assert rest.endswith(b"<p>part 2</p>")
+    response.close()
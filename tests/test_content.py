@@ -0,0 +1,159 @@
+"""
+Test suite for the post bodies rendered at write time.
+
+This module contains tests checking that the sanitizer keeps formatting and
+drops anything executable, that `body_html` and `excerpt` follow post writes,
+that the feed shows excerpts without loading full bodies, and that the backfill
+command renders posts written before the columns existed.
+"""
+
+from app.content import make_excerpt, sanitize_html
+from app.extensions import db
+from app.models import Users, Posts
+
+
+def _make_post(session, content, slug="post"):
+    """Create a post with the given body."""
+    user = Users(username=f"u-{slug}", name="Writer", email=f"{slug}@example.com")
+    post = Posts(title="Title", content=content, slug=slug, poster=user)
+    session.add(post)
+    session.commit()
+    return post
+
+
+def test_sanitize_html():
+    """
+    Test that the sanitizer keeps formatting and drops executable markup.
+
+    Asserts:
+        - Whether allowed tags and attributes are kept.
+        - Whether scripts, event handlers and javascript: URLs are removed.
+        - Whether unclosed tags are closed.
+    """
+    html = (
+        '<p onclick="steal()">Hi <strong>there</strong>'
+        '<script>alert(1)</script><a href="https://example.com" style="x">ok</a>'
+        '<a href=" JaVa\tscript:alert(1)">bad</a><img src="/a.png" onerror="x()"/>'
+        "<em>open"
+    )
+    assert sanitize_html(html) == (
+        '<p>Hi <strong>there</strong><a href="https://example.com">ok</a>'
+        '<a>bad</a><img src="/a.png"><em>open</em></p>'
+    )
+    assert sanitize_html("1 &lt; 2 <b>&amp;</b>") == "1 &lt; 2 <b>&amp;</b>"
+
+
+def test_make_excerpt():
+    """
+    Test that excerpts are plain text cut at a word boundary.
+
+    Asserts:
+        - Whether short bodies are kept whole.
+        - Whether long bodies are cut before the limit with an ellipsis.
+    """
+    assert make_excerpt("<p>Short <b>post</b></p>") == "Short post"
+    excerpt = make_excerpt("<p>" + "word " * 100 + "</p>", length=22)
+    assert excerpt == "word word word word…"
+
+
+def test_columns_follow_post_writes(session):
+    """
+    Test that adding and editing a post renders its display columns.
+
+    Args:
+        session: Database session.
+
+    Asserts:
+        - Whether a new post gets a sanitized body and an excerpt.
+        - Whether editing the content renders them again.
+    """
+    post = _make_post(session, "<p>First <script>x</script>draft</p>")
+    assert post.body_html == "<p>First draft</p>"
+    assert post.excerpt == "First draft"
+
+    post.content = "<p>Second draft</p>"
+    session.commit()
+    assert post.body_html == "<p>Second draft</p>"
+    assert post.excerpt == "Second draft"
+
+
+def test_feed_shows_excerpts_without_loading_bodies(app, client, session, count_queries):
+    """
+    Test that the feed renders excerpts from a query leaving out full bodies.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+        count_queries: Query counting fixture.
+
+    Asserts:
+        - Whether the feed shows the excerpt and not the rest of the body.
+        - Whether the listing query does not select the body columns.
+    """
+    app.config["PAGE_CACHE_TYPE"] = "null"
+    _make_post(session, "<p>" + "lorem " * 80 + "<b>ending</b></p>")
+
+    with count_queries() as queries:
+        response = client.get("/posts/")
+    page = response.get_data(as_text=True)
+    assert "lorem lorem" in page
+    assert "ending" not in page
+    listing = [sql for sql in queries.statements if "FROM posts" in sql]
+    assert listing and "posts.content" not in listing[0]
+    assert "posts.body_html" not in listing[0]
+
+
+def test_backfill_command(app, committed_session):
+    """
+    Test that the backfill renders posts that have no display columns yet.
+
+    Args:
+        app: Flask application instance.
+        committed_session: Database session committing for real.
+
+    Asserts:
+        - Whether posts without a rendered body are rendered.
+        - Whether a second run finds nothing left to render.
+    """
+    post = _make_post(committed_session, "<p>Old <i>post</i></p>")
+    committed_session.execute(db.update(Posts).values(body_html=None, excerpt=None))
+    committed_session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["content", "backfill", "--batch-size", "1"])
+    assert "Rendered 1 posts" in result.output
+    committed_session.expire_all()
+    assert post.body_html == "<p>Old <i>post</i></p>"
+    assert post.excerpt == "Old post"
+    assert "Rendered 0 posts" in runner.invoke(args=["content", "backfill"]).output
+
+
+def test_feed_loads_missing_excerpts_at_once(app, client, session, count_queries):
+    """
+    Test that posts written before excerpts existed are listed without a query
+    per post.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+        count_queries: Query counting fixture.
+
+    Asserts:
+        - Whether the feed shows an excerpt computed from each body.
+        - Whether the bodies are loaded in one query, and not saved.
+    """
+    app.config["PAGE_CACHE_TYPE"] = "null"
+    for i in range(3):
+        _make_post(session, f"<p>Old post {i}</p><script>alert(1)</script>", f"old-{i}")
+    session.execute(db.update(Posts).values(body_html=None, excerpt=None))
+    session.commit()
+
+    with count_queries() as queries:
+        page = client.get("/posts/").get_data(as_text=True)
+    assert all(f"Old post {i}" in page for i in range(3))
+    assert "alert" not in page
+    bodies = [sql for sql in queries.statements if "posts.content" in sql]
+    assert len(bodies) == 1
+    assert not any(sql.startswith("UPDATE") for sql in queries.statements)
@@ -0,0 +1,152 @@
+"""
+Test suite for the denormalized per-user post counters.
+
+This module contains tests checking that `Users.post_count` and
+`Users.last_posted_at` follow post writes in the same transaction, that the
+reconcile function repairs them, and that the admin portal shows them without a
+query per user.
+"""
+
+from datetime import datetime
+from app.counters import reconcile_post_counters
+from app.extensions import db, user_cache
+from app.models import Users, Posts
+
+
+def _make_user(session, username="writer", is_admin=False):
+    """Create a user; admins get a password so they can log in."""
+    user = Users(
+        username=username,
+        name=username.title(),
+        email=f"{username}@example.com",
+        is_admin=is_admin,
+    )
+    if is_admin:
+        user.password = "password123"
+    session.add(user)
+    session.commit()
+    return user
+
+
+def _add_post(session, user, day):
+    """Add a post by a user dated on the given day of January 2024."""
+    post = Posts(
+        title=f"Post {day}",
+        content="<p>x</p>",
+        slug=f"post-{day}",
+        poster=user,
+        date_posted=datetime(2024, 1, day),
+    )
+    session.add(post)
+    session.commit()
+    return post
+
+
+def test_counters_follow_post_writes(session):
+    """
+    Test that adding and deleting posts updates the poster's counters.
+
+    Args:
+        session: Database session.
+
+    Asserts:
+        - Whether each added post is counted and dated.
+        - Whether deleting the newest post falls back to the previous date.
+        - Whether a rolled back post is never counted.
+    """
+    user = _make_user(session)
+    _add_post(session, user, 1)
+    newest = _add_post(session, user, 5)
+    assert user.post_count == 2
+    assert user.last_posted_at == datetime(2024, 1, 5)
+
+    session.delete(newest)
+    session.commit()
+    assert user.post_count == 1
+    assert user.last_posted_at == datetime(2024, 1, 1)
+
+    session.add(Posts(title="Draft", content="x", slug="draft", poster=user))
+    session.flush()
+    session.rollback()
+    assert user.post_count == 1
+
+
+def test_reconcile_repairs_counters(session):
+    """
+    Test that reconciling rebuilds counters changed behind the ORM's back.
+
+    Args:
+        session: Database session.
+
+    Asserts:
+        - Whether only the out-of-date user is reported.
+        - Whether the counters match the posts table afterwards.
+    """
+    user = _make_user(session)
+    _make_user(session, "idle")
+    _add_post(session, user, 3)
+    session.execute(db.update(Users).values(post_count=7, last_posted_at=None))
+    session.commit()
+
+    assert reconcile_post_counters(session.connection()) == 2
+    session.commit()
+    assert user.post_count == 1
+    assert user.last_posted_at == datetime(2024, 1, 3)
+    assert reconcile_post_counters(session.connection()) == 0
+
+
+def test_admin_shows_counters_without_per_row_queries(app, client, session, count_queries):
+    """
+    Test that the admin portal renders the counters from the users rows alone.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+        count_queries: Query counting fixture.
+
+    Asserts:
+        - Whether each user's post count is shown.
+        - Whether the query count does not grow with the number of users.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    admin = _make_user(session, "admin", is_admin=True)
+    _add_post(session, admin, 2)
+    client.post("/auth/login", data={"username": "admin", "password": "password123"})
+
+    with count_queries() as few_users:
+        client.get("/admin")
+    for i in range(5):
+        _add_post(session, _make_user(session, f"user{i}"), i + 1)
+    client.get("/admin")  # reload the admin expired by the commits above
+    with count_queries() as many_users:
+        response = client.get("/admin")
+
+    assert b"2024-01-02" in response.data
+    assert response.data.count(b"<td>1</td>") >= 5
+    assert many_users.count == few_users.count, many_users.statements
+
+
+def test_cached_poster_is_dropped_on_commit(committed_session):
+    """
+    Test that a poster's cached counters are dropped when the post commits.
+
+    Args:
+        committed_session: Database session committing for real.
+
+    Asserts:
+        - Whether the cached poster is kept while the post is only flushed, so
+          no request can cache the old counters again before the commit.
+        - Whether the cached poster is dropped once the post commits.
+    """
+    user = _make_user(committed_session)
+    user_cache.load(committed_session, Users, user.id)
+    assert len(user_cache.backend) == 1
+
+    committed_session.add(
+        Posts(title="Post", content="<p>x</p>", slug="post", poster=user)
+    )
+    committed_session.flush()
+    assert len(user_cache.backend) == 1
+    committed_session.commit()
+    assert len(user_cache.backend) == 0
@@ -0,0 +1,78 @@
+"""
+Test suite for the database connection tuning of the Flask application.
+
+This module contains unit tests checking that SQLite connections are opened in
+WAL mode with the configured pragmas, and that Postgres URLs from the environment
+are accepted.
+"""
+
+from sqlalchemy import text
+from app import create_app
+from app.extensions import db
+from config import _database_url
+
+
+def _pragmas(app, *names):
+    """Read pragmas from a new connection of the app's engine."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            return [conn.execute(text(f"PRAGMA {name}")).scalar() for name in names]
+
+
+def test_sqlite_connections_use_wal(tmp_path):
+    """
+    Test that new SQLite connections get the configured pragmas.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether the journal is in WAL mode with synchronous=NORMAL.
+        - Whether writers wait for the lock instead of failing at once.
+    """
+    app = create_app(
+        "test", {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'wal.db'}"}
+    )
+    journal_mode, synchronous, busy_timeout = _pragmas(
+        app, "journal_mode", "synchronous", "busy_timeout"
+    )
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == 5000
+
+
+def test_sqlite_pragmas_can_be_disabled(tmp_path):
+    """
+    Test that an empty SQLITE_PRAGMAS leaves connections untouched.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether the journal keeps SQLite's default mode.
+    """
+    app = create_app(
+        "test",
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'plain.db'}",
+            "SQLITE_PRAGMAS": {},
+        },
+    )
+    assert _pragmas(app, "journal_mode") == ["delete"]
+
+
+def test_postgres_scheme_is_normalised(monkeypatch):
+    """
+    Test that "postgres://" URLs from the environment are rewritten.
+
+    Args:
+        monkeypatch: Pytest fixture for patching the environment.
+
+    Asserts:
+        - Whether the scheme is rewritten to "postgresql://".
+        - Whether the default is used when DATABASE_URL is unset.
+    """
+    monkeypatch.setenv("DATABASE_URL", "postgres://blog:secret@db/blog")
+    assert _database_url("sqlite:///blog.db") == "postgresql://blog:secret@db/blog"
+    monkeypatch.delenv("DATABASE_URL")
+    assert _database_url("sqlite:///blog.db") == "sqlite:///blog.db"
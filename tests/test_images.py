@@ -0,0 +1,97 @@
+"""
+Test suite for the profile picture pipeline in the Flask application.
+
+This module contains unit tests for storing uploads under their content hash,
+generating resized variants, and the size limit on uploads.
+"""
+
+import io
+import os
+import pytest
+from werkzeug.datastructures import FileStorage
+from app.images import save_upload, make_variants, variant_name, VARIANT_SIZES
+from app.models import Users
+
+
+def _png_bytes(color="red"):
+    """Render a small PNG image."""
+    pil_image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    pil_image.new("RGB", (300, 200), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_save_upload_deduplicates(tmp_path):
+    """
+    Test that identical uploads are stored once under their content hash.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether the same bytes under different names map to the same file.
+        - Whether different bytes map to a different file.
+        - Whether no temporary files are left behind.
+        - Whether unsupported extensions are rejected.
+    """
+    first = save_upload(FileStorage(io.BytesIO(b"same"), "a.png"), str(tmp_path))
+    second = save_upload(FileStorage(io.BytesIO(b"same"), "b.PNG"), str(tmp_path))
+    third = save_upload(FileStorage(io.BytesIO(b"other"), "c.png"), str(tmp_path))
+
+    assert first == second
+    assert first != third
+    assert sorted(os.listdir(tmp_path)) == sorted([first, third])
+    with pytest.raises(ValueError):
+        save_upload(FileStorage(io.BytesIO(b"x"), "script.html"), str(tmp_path))
+
+
+def test_make_variants(tmp_path):
+    """
+    Test that resized WebP variants are generated for a stored picture.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether a variant exists for every size and fits within it.
+    """
+    pil_image = pytest.importorskip("PIL.Image")
+    filename = save_upload(FileStorage(io.BytesIO(_png_bytes()), "a.png"), str(tmp_path))
+    make_variants(os.path.join(tmp_path, filename))
+
+    for size in VARIANT_SIZES:
+        with pil_image.open(tmp_path / variant_name(filename, size)) as variant:
+            assert variant.format == "WEBP"
+            assert max(variant.size) == size
+
+
+def test_update_rejects_large_upload(app, client, session):
+    """
+    Test that uploads over MAX_CONTENT_LENGTH are rejected.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session fixture.
+
+    Asserts:
+        - Whether the user is redirected back with an error message.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    app.config["MAX_CONTENT_LENGTH"] = 1024
+    with app.app_context():
+        user = Users(username="test_user", name="Test User", email="test@example.com")
+        user.password = "password123"
+        session.add(user)
+        session.commit()
+        client.post(
+            "/auth/login", data={"username": "test_user", "password": "password123"}
+        )
+
+        response = client.post(
+            f"/users/update/{user.id}",
+            data={"profile_pic": (io.BytesIO(b"x" * 4096), "big.png")},
+            content_type="multipart/form-data",
+            follow_redirects=True,
+        )
+        assert b"Profile picture is too large" in response.data
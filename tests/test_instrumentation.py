@@ -0,0 +1,158 @@
+"""
+Test suite for request instrumentation in the Flask application.
+
+This module contains unit tests for the metrics registry, and tests checking that
+responses carry Server-Timing headers, that requests are counted on the /metrics
+endpoint and that slow sampled requests are profiled.
+"""
+
+import re
+from app import create_app
+from app.instrumentation import MetricsRegistry
+from app.models import Users, Posts
+
+
+def test_registry_renders_prometheus_text():
+    """
+    Test the text format of counters and histograms.
+
+    Asserts:
+        - Whether counters are rendered with their labels.
+        - Whether histogram buckets are cumulative and end with +Inf.
+    """
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("hits_total", endpoint="posts.posts")
+    registry.inc("hits_total", endpoint="posts.posts")
+    registry.observe("latency_seconds", 0.5)
+    text = registry.render({"cache_entries": 3})
+
+    assert "# TYPE hits_total counter" in text
+    assert 'hits_total{endpoint="posts.posts"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "cache_entries 3" in text
+
+
+def test_server_timing_header(client, count_queries, seed_post):
+    """
+    Test that responses report their app, database and template timings.
+
+    Args:
+        client: Flask test client.
+        count_queries: Factory of SQL statement counters.
+        seed_post: Post factory.
+
+    Asserts:
+        - Whether the header has the total, database and template timings.
+        - Whether the database timing counts the request's queries.
+    """
+    slug = seed_post()
+
+    with count_queries() as counter:
+        response = client.get(f"/posts/{slug}")
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("app;dur=")
+    assert f'desc="{counter.count} queries"' in timing
+    assert 'tpl;dur=' in timing and 'desc="posts/post.html"' in timing
+
+
+def test_metrics_endpoint_counts_requests(client, seed_post):
+    """
+    Test that handled requests show up on the metrics endpoint.
+
+    Args:
+        client: Flask test client.
+        seed_post: Post factory.
+
+    Asserts:
+        - Whether requests are counted by endpoint and status.
+        - Whether SQL statements and template renders are recorded.
+    """
+    seed_post()
+    client.get("/posts/")
+    client.get("/posts/")
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert (
+        'http_requests_total{endpoint="posts.posts",method="GET",status="200"} 2'
+        in text
+    )
+    assert 'db_statements_total{endpoint="posts.posts"}' in text
+    assert 'template_render_seconds_count{template="posts/_feed.html"}' in text
+    assert "user_cache_hits" in text
+
+
+def test_streamed_pages_are_timed(app, client, session):
+    """
+    Test that a streamed page's metrics include what ran while it streamed.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether the queries run while the body rendered are counted.
+        - Whether the templates rendered while streaming are timed.
+        - Whether the request is counted once, with its status.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    user = Users(username="streamer", name="Streamer", email="stream@example.com")
+    user.password = "password123"
+    session.add(Posts(title="Streamed post", content="<p>Hi</p>", poster=user))
+    session.commit()
+    client.post("/auth/login", data={"username": "streamer", "password": "password123"})
+
+    response = client.get("/posts/myposts")
+    assert response.is_streamed
+    assert "Streamed post" in response.get_data(as_text=True)
+    response.close()
+
+    text = client.get("/metrics").get_data(as_text=True)
+    (statements,) = re.findall(
+        r'^db_statements_total\{endpoint="posts.my_posts"\} (\d+)$', text, re.M
+    )
+    assert int(statements) > 0
+    assert 'template_render_seconds_count{template="posts/_feed.html"} 1' in text
+    assert (
+        'http_requests_total{endpoint="posts.my_posts",method="GET",status="200"} 1'
+        in text
+    )
+
+
+def test_slow_sampled_requests_are_profiled(database, tmp_path):
+    """
+    Test that sampled requests slower than the threshold are dumped.
+
+    Args:
+        database: Database schema fixture.
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether a profile file is written for the request.
+    """
+    app = create_app(
+        "test",
+        {"PROFILE_SAMPLE_RATE": 1.0, "PROFILE_SLOW_MS": 0, "PROFILE_DIR": str(tmp_path)},
+    )
+    app.test_client().get("/posts/")
+
+    profiles = list(tmp_path.iterdir())
+    assert len(profiles) == 1
+    assert profiles[0].name.endswith(".prof")
+    assert "posts.posts" in profiles[0].name
+
+
+def test_instrumentation_can_be_disabled():
+    """
+    Test that disabled instrumentation adds no header and no endpoint.
+
+    Asserts:
+        - Whether the metrics endpoint is missing.
+        - Whether responses have no Server-Timing header.
+    """
+    app = create_app("test", {"INSTRUMENTATION_ENABLED": False})
+    response = app.test_client().get("/metrics")
+    assert response.status_code == 404
+    assert "Server-Timing" not in response.headers
@@ -0,0 +1,202 @@
+"""
+Test suite for the background job queue.
+
+This module contains tests checking that jobs are deduplicated by their
+idempotency keys, retried with a limit, claimed again when their worker died,
+run by `flask jobs work`, and that the write views enqueue their side effects.
+"""
+
+from datetime import timedelta
+import pytest
+from app import create_app
+from app.cache import FileSystemCache
+from app.extensions import db, job_queue, page_cache
+from app.jobs import job
+from app.models import Jobs, Posts, Users
+from tests.conftest import reset_database
+
+calls = []
+
+
+@job("tests.record")
+def record(value, failures=0):
+    """Record a call, failing the first `failures` attempts."""
+    calls.append(value)
+    if calls.count(value) <= failures:
+        raise RuntimeError(f"attempt {calls.count(value)} of {value} failed")
+
+
+@pytest.fixture
+def queue_app(database):
+    """
+    Fixture creating an application whose jobs are queued, not run inline.
+
+    No worker threads are started, so tests run the jobs explicitly. Jobs are
+    stored and claimed on connections of their own, so the rows are committed
+    and the tables emptied afterwards.
+
+    Args:
+        database: Database schema fixture.
+
+    Returns:
+        Flask app: The Flask application object.
+    """
+    calls.clear()
+    app = create_app(
+        "test",
+        {"JOBS_EAGER": False, "JOB_WORKERS": 0, "JOB_RETRY_DELAY": 0},
+    )
+    with app.app_context():
+        yield app
+        db.session.rollback()
+        reset_database()
+
+
+def test_idempotency_keys(queue_app):
+    """
+    Test that a job is enqueued once per idempotency key.
+
+    Args:
+        queue_app: Flask application queuing its jobs.
+
+    Asserts:
+        - Whether the second job with the same key is not enqueued.
+        - Whether each queued job runs once.
+    """
+    assert job_queue.enqueue(record, key="once", value="a") is not None
+    assert job_queue.enqueue(record, key="once", value="b") is None
+    job_queue.enqueue(record, value="c")
+
+    queue_app.extensions["job_queue"].work(burst=True)
+    assert sorted(calls) == ["a", "c"]
+    assert queue_app.extensions["job_queue"].counts() == {"done": 2}
+
+
+def test_failed_jobs_are_retried(queue_app):
+    """
+    Test retries of failing jobs.
+
+    Args:
+        queue_app: Flask application queuing its jobs.
+
+    Asserts:
+        - Whether a job failing once succeeds on its second attempt.
+        - Whether a job failing every attempt is marked failed with its error
+          after JOB_MAX_ATTEMPTS attempts.
+    """
+    runner = queue_app.extensions["job_queue"]
+    runner.max_attempts = 3
+    flaky = job_queue.enqueue(record, value="flaky", failures=1)
+    broken = job_queue.enqueue(record, value="broken", failures=10)
+
+    runner.work(burst=True)
+    flaky, broken = db.session.get(Jobs, flaky), db.session.get(Jobs, broken)
+    assert (flaky.status, flaky.attempts, flaky.last_error) == ("done", 2, None)
+    assert (broken.status, broken.attempts) == ("failed", 3)
+    assert "attempt 3 of broken failed" in broken.last_error
+    assert calls.count("broken") == 3
+
+
+def test_lost_jobs_are_claimed_again(queue_app):
+    """
+    Test that a job left running by a dead worker is run again after the timeout.
+
+    Args:
+        queue_app: Flask application queuing its jobs.
+
+    Asserts:
+        - Whether a recently claimed job is left alone.
+        - Whether it is run once its claim is older than JOB_TIMEOUT.
+    """
+    runner = queue_app.extensions["job_queue"]
+    lost = db.session.get(Jobs, job_queue.enqueue(record, value="lost"))
+    lost.status, lost.attempts, lost.locked_at = "running", 1, lost.created_at
+    db.session.commit()
+    assert not runner.run_next()
+
+    lost.locked_at -= timedelta(seconds=runner.timeout + 1)
+    db.session.commit()
+    assert runner.run_next()
+    assert calls == ["lost"]
+    db.session.refresh(lost)
+    assert (lost.status, lost.attempts) == ("done", 2)
+
+
+def test_work_command(queue_app):
+    """
+    Test the `flask jobs` commands.
+
+    Args:
+        queue_app: Flask application queuing its jobs.
+
+    Asserts:
+        - Whether `work --burst` runs the queued jobs and exits.
+        - Whether `status` and `prune` report on the finished jobs.
+    """
+    job_queue.enqueue(record, value="cli")
+    runner = queue_app.test_cli_runner()
+
+    result = runner.invoke(args=["jobs", "work", "--burst", "--concurrency", "2"])
+    assert result.exit_code == 0, result.output
+    assert calls == ["cli"]
+    assert "done     1" in runner.invoke(args=["jobs", "status"]).output
+    assert "Deleted 0 jobs" in runner.invoke(args=["jobs", "prune"]).output
+    assert "Deleted 1 jobs" in runner.invoke(args=["jobs", "prune", "--days", "-1"]).output
+
+
+def _edit_cached_post(app):
+    """Cache a post's page for a reader, then edit the post; return both."""
+    app.config["WTF_CSRF_ENABLED"] = False
+    user = Users(username="writer", name="Writer", email="writer@example.com")
+    user.password = "password123"
+    post = Posts(title="Before", content="<p>x</p>", slug="story", poster=user)
+    db.session.add(post)
+    db.session.commit()
+    reader, writer = app.test_client(), app.test_client()
+    assert b"Before" in reader.get("/posts/story").data
+    writer.post("/auth/login", data={"username": "writer", "password": "password123"})
+    writer.post(
+        f"/posts/edit/{post.id}", data={"title": "After", "slug": "story", "content": "y"}
+    )
+    return post, reader
+
+
+def test_write_views_enqueue_side_effects(queue_app, tmp_path):
+    """
+    Test that editing a post purges its page in a shared cache from a job, not
+    the request.
+
+    Args:
+        queue_app: Flask application queuing its jobs.
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether the cached page survives the edit until the job runs.
+        - Whether running the queued job purges it.
+    """
+    queue_app.extensions["page_cache"] = FileSystemCache(str(tmp_path))
+    post, reader = _edit_cached_post(queue_app)
+    assert page_cache.backend.get(page_cache.post_key(post.id)) is not None
+    assert queue_app.extensions["job_queue"].counts() == {"queued": 1}
+
+    queue_app.extensions["job_queue"].work(burst=True)
+    assert page_cache.backend.get(page_cache.post_key(post.id)) is None
+    assert b"After" in reader.get("/posts/story").data
+
+
+def test_per_process_page_cache_is_purged_at_once(queue_app):
+    """
+    Test that a per-process page cache is purged by the writing request.
+
+    Args:
+        queue_app: Flask application queuing its jobs.
+
+    Asserts:
+        - Whether the edited post's page is purged without queuing a job,
+          which another process could claim.
+    """
+    post, reader = _edit_cached_post(queue_app)
+    assert page_cache.backend.get(page_cache.post_key(post.id)) is None
+    assert queue_app.extensions["job_queue"].counts() == {}
+    assert b"After" in reader.get("/posts/story").data
+
@@ -0,0 +1,89 @@
+"""
+Test suite for the extensions loaded on first use.
+
+This module contains tests checking that creating the application imports
+neither Flask-Migrate nor Flask-CKEditor, and that the `flask db` commands and
+the CKEditor on the editor pages work when they are only imported as they are
+used.
+"""
+
+import os
+import subprocess
+import sys
+from app.models import Users
+
+
+def test_create_app_defers_imports():
+    """
+    Test that a fresh interpreter creates the application without importing the
+    deferred extensions.
+
+    Asserts:
+        - Whether flask_migrate and flask_ckeditor are not imported.
+        - Whether the Migrate state is registered anyway.
+    """
+    script = (
+        "import sys\n"
+        "from app import create_app\n"
+        "app = create_app('test')\n"
+        "assert 'migrate' in app.extensions\n"
+        "print(sorted(name for name in ('flask_migrate', 'flask_ckeditor') "
+        "if name in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_db_commands_load_flask_migrate(app):
+    """
+    Test the `flask db` command group standing in for Flask-Migrate's.
+
+    Args:
+        app: Flask application instance.
+
+    Asserts:
+        - Whether the group's own options and subcommands are Flask-Migrate's.
+        - Whether running it sets Flask-Migrate up.
+    """
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["db", "--help"])
+    assert result.exit_code == 0, result.output
+    assert "--directory" in result.output
+    assert "upgrade" in result.output
+    assert app.extensions["migrate"].directory == "migrations"
+
+    # Alembic prints to the real stdout, so only the outcome is checked
+    assert runner.invoke(args=["db", "heads"]).exit_code == 0
+
+
+def test_editor_page_loads_ckeditor(app, client, session):
+    """
+    Test that the add post page still turns its content field into a CKEditor.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether the content text area is marked for CKEditor.
+        - Whether the editor script and its configuration are included.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    user = Users(username="editor", name="Editor", email="editor@example.com")
+    user.password = "password123"
+    session.add(user)
+    session.commit()
+    client.post("/auth/login", data={"username": "editor", "password": "password123"})
+
+    html = client.get("/posts/add").data.decode()
+    assert 'class="ckeditor form-control"' in html
+    assert "ckeditor.js" in html
+    assert 'CKEDITOR.replace( "content"' in html or 'CKEDITOR.replace("content"' in html
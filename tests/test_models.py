@@ -7,6 +7,7 @@ data validation, database operations, and relationships between different models
 
 """
 
+from app.hashing import HashingService, hash_cost
 from app.models import Users, Posts
 
 
@@ -82,3 +83,24 @@ def test_post_creation(app, session):
         assert queried_post is not None
         assert queried_post.content == "This is a test post."
         assert queried_post.poster == user
+
+
+def test_hashing_service_process_pool():
+    """
+    Test hashing and checking passwords on a process pool.
+
+    Asserts:
+        - Whether a hash made on the pool uses the configured cost and verifies.
+        - Whether a wrong password does not verify.
+        - Whether the pool's processes are not forked from the caller.
+    """
+    service = HashingService(rounds=4, pool_size=1)
+    try:
+        assert service._get_pool()._mp_context.get_start_method() != "fork"
+        password_hash = service.hash("password123")
+        assert hash_cost(password_hash) == 4
+        assert not service.needs_rehash(password_hash)
+        assert service.check(password_hash, "password123")
+        assert not service.check(password_hash, "wrong_password")
+    finally:
+        service.shutdown()
@@ -0,0 +1,88 @@
+"""
+Test suite for the keyset pagination helpers in the Flask application.
+
+This module contains unit tests for cursor encoding and decoding and for
+walking forwards and backwards through a paginated posts query, as well as
+a check that the posts feed only renders a single page.
+"""
+
+from datetime import datetime
+from app.models import Posts
+from app.pagination import paginate_keyset, encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    """
+    Test that a cursor decodes back to the values it was built from.
+
+    Asserts:
+        - Whether the decoded pair matches the original timestamp and id.
+        - Whether a malformed cursor decodes to None.
+    """
+    stamp = datetime(2024, 3, 17, 19, 42, 55, 541151)
+    assert decode_cursor(encode_cursor(stamp, 42)) == (stamp, 42)
+    assert decode_cursor("not-a-cursor") is None
+
+
+def test_paginate_forward_and_back(app, seed_posts):
+    """
+    Test walking forwards then backwards through a paginated query.
+
+    Args:
+        app: Flask application instance.
+        seed_posts: Post factory fixture.
+
+    Asserts:
+        - Whether pages are ordered newest first without gaps or repeats.
+        - Whether the first and last pages report no prev/next page.
+        - Whether paging back returns the same rows as paging forward.
+    """
+    with app.app_context():
+        seed_posts(25)
+
+        first = paginate_keyset(Posts.query, Posts.date_posted, Posts.id, per_page=10)
+        assert [p.title for p in first] == [f"Post {i}" for i in range(24, 14, -1)]
+        assert not first.has_prev
+        assert first.has_next
+
+        second = paginate_keyset(
+            Posts.query, Posts.date_posted, Posts.id, after=first.next_cursor, per_page=10
+        )
+        third = paginate_keyset(
+            Posts.query, Posts.date_posted, Posts.id, after=second.next_cursor, per_page=10
+        )
+        assert [p.title for p in third] == [f"Post {i}" for i in range(4, -1, -1)]
+        assert not third.has_next
+
+        back = paginate_keyset(
+            Posts.query, Posts.date_posted, Posts.id, before=third.prev_cursor, per_page=10
+        )
+        assert [p.id for p in back] == [p.id for p in second]
+        back = paginate_keyset(
+            Posts.query, Posts.date_posted, Posts.id, before=back.prev_cursor, per_page=10
+        )
+        assert [p.id for p in back] == [p.id for p in first]
+        assert not back.has_prev
+
+
+def test_posts_feed_is_paginated(app, client, seed_posts):
+    """
+    Test that the posts feed renders only one page of posts.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        seed_posts: Post factory fixture.
+
+    Asserts:
+        - Whether only the newest POSTS_PER_PAGE posts are rendered.
+        - Whether a link to the next page is rendered.
+    """
+    with app.app_context():
+        seed_posts(app.config["POSTS_PER_PAGE"] + 1)
+
+        response = client.get("/posts/")
+        assert response.status_code == 200
+        assert b"Post 1<" in response.data
+        assert b"Post 0<" not in response.data
+        assert b"after=" in response.data
@@ -0,0 +1,60 @@
+"""
+Test suite for the number of SQL queries issued by listing pages.
+
+This module contains tests asserting that rendering a list of posts costs a
+fixed number of queries no matter how many posts (and posters) are shown, so
+that N+1 lazy loads of `post.poster` fail the suite.
+"""
+
+
+def test_posts_feed_query_count(app, client, count_queries, seed_posts):
+    """
+    Test that the posts feed loads posters without a query per post.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        count_queries: Query counting fixture.
+        seed_posts: Post factory fixture.
+
+    Asserts:
+        - Whether every poster's name is rendered.
+        - Whether the page is rendered with a single query.
+    """
+    with app.app_context():
+        seed_posts(5, distinct_posters=True)
+
+        with count_queries() as counter:
+            response = client.get("/posts/")
+
+        assert response.status_code == 200
+        for i in range(5):
+            assert f"User {i}".encode() in response.data
+        assert counter.count == 1, counter.statements
+
+
+def test_search_query_count(app, client, count_queries, seed_posts):
+    """
+    Test that search results load posters without a query per result.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        count_queries: Query counting fixture.
+        seed_posts: Post factory fixture.
+
+    Asserts:
+        - Whether every poster's name is rendered.
+        - Whether the results are rendered with two queries (index, then posts).
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        seed_posts(5, distinct_posters=True)
+
+        with count_queries() as counter:
+            response = client.post("/search", data={"searched": "pizza"})
+
+        assert response.status_code == 200
+        for i in range(5):
+            assert f"User {i}".encode() in response.data
+        assert counter.count == 2, counter.statements
@@ -0,0 +1,179 @@
+"""
+Test suite for the rate limits of the login, sign-up and search views.
+
+This module contains unit tests for the token buckets of both storages, and
+tests checking that logins are limited per username and per address with a
+`Retry-After` header, that rejections are counted on the /metrics endpoint and
+that limits can be disabled.
+"""
+
+import pytest
+from app import create_app
+from app import ratelimit
+from app.ratelimit import MemoryBuckets, SqliteBuckets, parse_limit
+
+
+def test_parse_limit():
+    """
+    Test parsing limits of requests per period.
+
+    Asserts:
+        - Whether the capacity and the refill rate per second are returned.
+        - Whether limits with an unknown period or no requests are rejected.
+    """
+    assert parse_limit("5/minute") == (5, 5 / 60)
+    assert parse_limit("10 / hour") == (10, 10 / 3600)
+    for limit in ("5/fortnight", "0/minute", "five/minute", "5"):
+        with pytest.raises(ValueError):
+            parse_limit(limit)
+
+
+def test_memory_buckets_refill(monkeypatch):
+    """
+    Test that a bucket allows a burst, then one request per refilled token.
+
+    Args:
+        monkeypatch: Pytest fixture replacing the clock.
+
+    Asserts:
+        - Whether a full bucket's tokens are all taken before it refuses.
+        - Whether the wait until the next token is returned.
+        - Whether buckets are separate and the least recently used are dropped.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    buckets = MemoryBuckets(max_entries=2)
+
+    assert [buckets.take("a", 3, 0.5) for _ in range(4)] == [0, 0, 0, 2]
+    now[0] += 1
+    assert buckets.take("a", 3, 0.5) == 1
+    now[0] += 1
+    assert buckets.take("a", 3, 0.5) == 0
+
+    assert buckets.take("b", 3, 0.5) == 0
+    assert buckets.take("c", 3, 0.5) == 0
+    assert len(buckets) == 2
+    assert buckets.take("a", 3, 0.5) == 0
+
+
+def test_sqlite_buckets_are_shared(tmp_path):
+    """
+    Test that the sqlite storage shares buckets between its users.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether tokens taken through one storage are gone for another on the
+          same file, as for two worker processes.
+    """
+    path = str(tmp_path / "ratelimit.db")
+    first, second = SqliteBuckets(path), SqliteBuckets(path)
+
+    assert first.take("login.ip:1.2.3.4", 2, 1 / 60) == 0
+    assert second.take("login.ip:1.2.3.4", 2, 1 / 60) == 0
+    assert first.take("login.ip:1.2.3.4", 2, 1 / 60) > 59
+    assert second.take("login.ip:5.6.7.8", 2, 1 / 60) == 0
+
+
+@pytest.mark.parametrize("storage", ["memory", "sqlite"])
+def test_login_is_limited(database, tmp_path, storage):
+    """
+    Test that repeated logins are rejected per username and per address.
+
+    Args:
+        database: Database schema fixture.
+        tmp_path: Temporary directory fixture.
+        storage: Bucket storage under test.
+
+    Asserts:
+        - Whether logins beyond a username's limit get a 429 with Retry-After.
+        - Whether the username is matched ignoring case, and other usernames are
+          only subject to the address limit.
+        - Whether rendering the login form is not limited.
+        - Whether rejections are counted per limit.
+    """
+    app = create_app(
+        "test",
+        {
+            "WTF_CSRF_ENABLED": False,
+            "RATELIMIT_STORAGE": storage,
+            "RATELIMIT_SQLITE_PATH": str(tmp_path / "ratelimit.db"),
+            "RATE_LIMITS": {"login.ip": "4/minute", "login.username": "2/minute"},
+        },
+    )
+    client = app.test_client()
+
+    def login(username):
+        return client.post("/auth/login", data={"username": username, "password": "x"})
+
+    assert [login(name).status_code for name in ("ann", "ANN ")] == [200, 200]
+    response = login("ann")
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 30
+    assert "Too many requests" in response.get_data(as_text=True)
+
+    assert login("bob").status_code == 200
+    assert login("cat").status_code == 429
+    assert client.get("/auth/login").status_code == 200
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'rate_limited_total{limit="login.username"} 1' in metrics
+    assert 'rate_limited_total{limit="login.ip"} 1' in metrics
+
+
+def test_rate_limits_can_be_disabled(database):
+    """
+    Test that disabled or unset limits let every request through.
+
+    Args:
+        database: Database schema fixture.
+
+    Asserts:
+        - Whether searches are not limited when rate limiting is disabled.
+        - Whether a limit set to None is not enforced.
+        - Whether an unknown storage is rejected.
+    """
+    for overrides in (
+        {"RATELIMIT_ENABLED": False, "RATE_LIMITS": {"search.ip": "1/minute"}},
+        {"RATE_LIMITS": {"search.ip": None}},
+    ):
+        app = create_app("test", dict(overrides, WTF_CSRF_ENABLED=False))
+        client = app.test_client()
+        for _ in range(3):
+            assert client.post("/search", data={"searched": "pizza"}).status_code == 200
+
+    with pytest.raises(ValueError):
+        create_app("test", {"RATELIMIT_STORAGE": "redis"})
+
+
+def test_clients_behind_a_proxy_are_limited_separately(database):
+    """
+    Test that clients behind a trusted proxy get buckets of their own.
+
+    Args:
+        database: Database schema fixture.
+
+    Asserts:
+        - Whether a client over its limit is rejected while another client
+          forwarded by the same proxy is not.
+    """
+    app = create_app(
+        "test",
+        {
+            "WTF_CSRF_ENABLED": False,
+            "PROXY_FIX_X_FOR": 1,
+            "RATE_LIMITS": {"search.ip": "1/minute"},
+        },
+    )
+    client = app.test_client()
+
+    def search(address):
+        return client.post(
+            "/search",
+            data={"searched": "pizza"},
+            headers={"X-Forwarded-For": address},
+        ).status_code
+
+    assert [search("1.2.3.4"), search("1.2.3.4")] == [200, 429]
+    assert search("5.6.7.8") == 200
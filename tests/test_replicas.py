@@ -0,0 +1,125 @@
+"""
+Test suite for read replica routing in the Flask application.
+
+This module contains tests running the app against two SQLite files, a primary
+and a replica, checking that read-only views read from the replica while writes
+and the reads following them stay on the primary.
+"""
+
+import pytest
+from sqlalchemy.orm import Session
+from app import create_app
+from app.extensions import db, password_hasher
+from app.models import Users, Posts
+
+
+@pytest.fixture
+def replicated_app(tmp_path):
+    """
+    Fixture creating an app with a primary and a replica database.
+
+    The replica is deliberately not kept in sync, so each test can tell from the
+    data which database a view read.
+    """
+    app = create_app(
+        "test",
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+            "SQLALCHEMY_BINDS": {"replica": f"sqlite:///{tmp_path / 'replica.db'}"},
+            "READ_REPLICAS": ["replica"],
+            "WTF_CSRF_ENABLED": False,
+            "PAGE_CACHE_TYPE": "null",
+        },
+    )
+    with app.app_context():
+        db.create_all()
+        replica = db.engines["replica"]
+        db.metadata.create_all(replica)
+        password_hash = password_hasher.hash("password123")
+        for engine, title in ((db.engine, "Primary post"), (replica, "Replica post")):
+            with Session(engine) as session:
+                user = Users(
+                    username="writer",
+                    name="Writer",
+                    email="writer@example.com",
+                    password_hash=password_hash,
+                )
+                session.add(Posts(title=title, content="<p>x</p>", slug="p", poster=user))
+                session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.metadata.drop_all(db.engines["replica"])
+        for engine in db.engines.values():
+            engine.dispose()
+    # The extension keeps a metadata per bind key across apps; later apps have no
+    # "replica" bind to create it on
+    db.metadatas.pop("replica", None)
+
+
+def test_read_only_views_use_the_replica(replicated_app):
+    """
+    Test that decorated views read from the replica.
+
+    Args:
+        replicated_app: App with a primary and a replica database.
+
+    Asserts:
+        - Whether the feed shows the replica's post.
+        - Whether views without the decorator still read the primary.
+    """
+    client = replicated_app.test_client()
+    feed = client.get("/posts/").get_data(as_text=True)
+    assert "Replica post" in feed
+    assert "Primary post" not in feed
+
+    client.post("/auth/login", data={"username": "writer", "password": "password123"})
+    my_posts = client.get("/posts/myposts").get_data(as_text=True)
+    assert "Primary post" in my_posts
+
+
+def test_reads_after_a_write_use_the_primary(replicated_app):
+    """
+    Test that a client reads its own writes.
+
+    Args:
+        replicated_app: App with a primary and a replica database.
+
+    Asserts:
+        - Whether the post written to the primary is shown right after writing.
+        - Whether other clients keep reading from the replica.
+    """
+    writer = replicated_app.test_client()
+    writer.post("/auth/login", data={"username": "writer", "password": "password123"})
+    response = writer.post(
+        "/posts/add", data={"title": "Fresh post", "content": "<p>y</p>", "slug": "f"}
+    )
+    assert response.status_code == 302
+
+    assert "Fresh post" in writer.get("/posts/").get_data(as_text=True)
+    reader = replicated_app.test_client()
+    assert "Fresh post" not in reader.get("/posts/").get_data(as_text=True)
+
+
+def test_streamed_views_use_the_replica(replicated_app):
+    """
+    Test that a streamed page still reads from the replica.
+
+    Args:
+        replicated_app: App with a primary and a replica database.
+
+    Asserts:
+        - Whether the feed of a logged-in reader, whose posts are queried while
+          the page streams, shows the replica's post.
+    """
+    replicated_app.config["STREAM_TEMPLATES"] = True
+    replicated_app.config["REPLICA_STICKY_SECONDS"] = 0
+    client = replicated_app.test_client()
+    client.post("/auth/login", data={"username": "writer", "password": "password123"})
+
+    response = client.get("/posts/")
+    assert response.is_streamed
+    feed = response.get_data(as_text=True)
+    response.close()
+    assert "Replica post" in feed
+    assert "Primary post" not in feed
@@ -0,0 +1,136 @@
+"""
+Test suite for the full-text search of posts in the Flask application.
+
+This module contains unit tests checking that the search index is kept in sync
+with the posts table on insert, update and delete, and that searches return
+ranked, prefix-matched and highlighted results, and that migrations leave the
+index alone.
+"""
+
+from sqlalchemy import inspect
+from app import create_app
+from app.extensions import db
+from app.models import Users, Posts
+from app.search import search_posts, html_to_text
+
+
+def _add_post(session, title, content):
+    """Create and commit a post with the given title and content."""
+    post = Posts(title=title, content=content, slug=title.lower())
+    session.add(post)
+    session.commit()
+    return post
+
+
+def test_html_to_text():
+    """
+    Test that markup is stripped from CKEditor HTML.
+
+    Asserts:
+        - Whether tags are removed, entities decoded and whitespace collapsed.
+    """
+    assert html_to_text("<p>Pizza &amp; <b>pasta</b></p>\n<p>night</p>") == (
+        "Pizza & pasta night"
+    )
+
+
+def test_search_ranks_and_highlights(app, session):
+    """
+    Test that searches are prefix-matched, ranked and highlighted.
+
+    Args:
+        app: Flask application instance.
+        session: Database session fixture.
+
+    Asserts:
+        - Whether a prefix of a word matches it.
+        - Whether a title match ranks above a body-only match.
+        - Whether matched terms are wrapped in <mark> tags.
+        - Whether markup in the post body is not rendered into the snippet.
+    """
+    with app.app_context():
+        _add_post(session, "Weeknight dinners", "<p>Try a <b>pizza</b> tonight</p>")
+        _add_post(session, "Pizza dough", "<p>Flour, water and yeast.</p>")
+        _add_post(session, "Gardening", "<p>Tomatoes need sun.</p>")
+
+        results = search_posts("piz")
+        assert [r.post.title for r in results] == ["Pizza dough", "Weeknight dinners"]
+        assert "<mark>Pizza</mark>" in results[0].title
+        assert "<mark>pizza</mark>" in results[1].snippet
+        assert "<b>" not in results[1].snippet
+
+
+def test_search_index_follows_writes(app, session):
+    """
+    Test that the search index is updated when posts are edited or deleted.
+
+    Args:
+        app: Flask application instance.
+        session: Database session fixture.
+
+    Asserts:
+        - Whether an edited post is found by its new content only.
+        - Whether a deleted post is no longer found.
+    """
+    with app.app_context():
+        post = _add_post(session, "Draft", "<p>original words</p>")
+        post.content = "<p>rewritten text</p>"
+        session.commit()
+        assert not search_posts("original")
+        assert [r.post.id for r in search_posts("rewritten")] == [post.id]
+
+        session.delete(post)
+        session.commit()
+        assert not search_posts("rewritten")
+
+
+def test_search_route(app, client, session):
+    """
+    Test that the search route renders highlighted results.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session fixture.
+
+    Asserts:
+        - Whether the matching post is rendered with its highlighted title.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        user = Users(username="test_user", name="Test User", email="test@example.com")
+        session.add(user)
+        session.commit()
+        post = _add_post(session, "Pizza dough", "<p>Flour, water and yeast.</p>")
+        post.poster = user
+        session.commit()
+
+        response = client.post("/search", data={"searched": "yeast"})
+        assert response.status_code == 200
+        assert b"Pizza dough" in response.data
+        assert b"<mark>yeast</mark>" in response.data
+
+
+def test_migrations_keep_the_search_index(tmp_path):
+    """
+    Test that autogenerated migrations leave the search index alone.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether the migrations create the FTS5 table.
+        - Whether autogenerate then finds nothing to change, rather than
+          dropping the FTS5 table and its shadow tables.
+    """
+    app = create_app(
+        "test", {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'migrated.db'}"}
+    )
+    runner = app.test_cli_runner()
+    # Alembic prints to the real stdout, so only the outcomes are checked
+    assert runner.invoke(args=["db", "upgrade"]).exit_code == 0
+    with app.app_context():
+        assert "posts_fts" in inspect(db.engine).get_table_names()
+    assert runner.invoke(args=["db", "check"]).exit_code == 0
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,206 @@
+"""
+Test suite for slug based post URLs.
+
+This module contains tests checking that slugs are normalised and made unique,
+that posts are served from their slug, that old slugs and ID URLs redirect
+permanently, and that the slug cache follows edits and deletes.
+"""
+
+from flask_migrate import upgrade
+from sqlalchemy import text
+from app import create_app
+from app.extensions import db
+from app.models import Users, Posts, PostSlugs
+from app.slugs import assign_slugs, slugify
+
+
+def _make_posts(session, *slugs, username="writer"):
+    """Create one post per slug, by the same user."""
+    user = Users.query.filter_by(username=username).first() or Users(
+        username=username, name=username.title(), email=f"{username}@example.com"
+    )
+    posts = [
+        Posts(title=f"Title {i}", content="<p>x</p>", slug=slug, poster=user)
+        for i, slug in enumerate(slugs)
+    ]
+    session.add_all(posts)
+    session.commit()
+    return posts
+
+
+def test_slugify():
+    """
+    Test the normalisation of typed slugs and titles.
+
+    Asserts:
+        - Whether text is reduced to lowercase ASCII words joined by hyphens.
+        - Whether slugs that would be shadowed by other routes are prefixed.
+    """
+    assert slugify("  Crème Brûlée: A Recipe! ") == "creme-brulee-a-recipe"
+    assert slugify("2024") == "post-2024"
+    assert slugify("add") == "post-add"
+    assert slugify("!!!") == "post"
+    assert len(slugify("word " * 100)) <= 200
+
+
+def test_slugs_are_made_unique(session):
+    """
+    Test that colliding slugs get the first free suffix.
+
+    Args:
+        session: Database session.
+
+    Asserts:
+        - Whether duplicates are suffixed in order.
+        - Whether a post without a slug gets one from its title.
+    """
+    posts = _make_posts(session, "Pizza", "pizza", "pizza", None)
+    assert [post.slug for post in posts] == ["pizza", "pizza-2", "pizza-3", "title-3"]
+
+
+def test_assign_slugs_to_bulk_rows(session):
+    """
+    Test the slugs given to rows inserted in bulk, which skip the mapper events.
+
+    Args:
+        session: Database session.
+
+    Asserts:
+        - Whether rows colliding with existing posts or with each other are
+          suffixed, and the others are kept.
+    """
+    _make_posts(session, "news")
+    rows = [{"slug": "news"}, {"slug": "News"}, {"slug": "sports"}, {"title": "Sports"}]
+    assign_slugs(session.connection(), rows)
+    assert [row["slug"] for row in rows] == ["news-2", "news-3", "sports", "sports-2"]
+
+
+def test_post_is_served_from_its_slug(client, session):
+    """
+    Test the slug and ID routes of a post.
+
+    Args:
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether the slug URL renders the post.
+        - Whether the ID URL permanently redirects to the slug URL.
+        - Whether unknown slugs are not found.
+    """
+    (post,) = _make_posts(session, "hello-world")
+
+    assert b"Title 0" in client.get("/posts/hello-world").data
+    response = client.get(f"/posts/{post.id}")
+    assert response.status_code == 301
+    assert response.location.endswith("/posts/hello-world")
+    assert client.get("/posts/nothing-here").status_code == 404
+
+
+def test_old_slugs_redirect(client, session):
+    """
+    Test that renaming a post keeps its old URL working.
+
+    Args:
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether the previous slug redirects permanently to the new one, even
+          after it was resolved from the cache.
+        - Whether the old slug stays reserved for its post.
+        - Whether the post can take back its old slug.
+    """
+    post, _ = _make_posts(session, "first-name", "other")
+    assert client.get("/posts/first-name").status_code == 200
+
+    post.slug = "second-name"
+    session.commit()
+    response = client.get("/posts/first-name")
+    assert response.status_code == 301
+    assert response.location.endswith("/posts/second-name")
+    assert client.get("/posts/second-name").status_code == 200
+
+    (newcomer,) = _make_posts(session, "first-name", username="other")
+    assert newcomer.slug == "first-name-2"
+
+    post.slug = "first-name"
+    session.commit()
+    assert client.get("/posts/first-name").status_code == 200
+    assert client.get("/posts/second-name").status_code == 301
+    assert session.query(PostSlugs).filter_by(slug="first-name").count() == 0
+
+
+def test_deleting_a_post_frees_its_slugs(client, session):
+    """
+    Test that a deleted post's slugs stop resolving and can be reused.
+
+    Args:
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether the cached slug is not found after the delete.
+        - Whether the previous slugs are removed with the post.
+    """
+    (post,) = _make_posts(session, "short-lived")
+    post.slug = "renamed"
+    session.commit()
+    assert client.get("/posts/renamed").status_code == 200
+
+    session.delete(post)
+    session.commit()
+    assert client.get("/posts/renamed").status_code == 404
+    assert client.get("/posts/short-lived").status_code == 404
+    assert session.query(PostSlugs).count() == 0
+    assert _make_posts(session, "short-lived")[0].slug == "short-lived"
+
+
+
+def test_migration_normalizes_existing_slugs(tmp_path):
+    """
+    Test that the unique slug migration runs existing slugs through slugify.
+
+    Args:
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether all-digit, unsafe, duplicate and missing slugs are replaced
+          by unique slugs following the application's rules.
+        - Whether valid slugs are kept by their oldest post.
+        - Whether the replaced slugs are kept as previous slugs, once each.
+    """
+    app = create_app(
+        "test", {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'migrated.db'}"}
+    )
+    with app.app_context():
+        upgrade(revision="e7a3c9d1b4f2")
+        with db.engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO posts (id, title, slug) VALUES (:id, :title, :slug)"),
+                [
+                    {"id": 1, "title": "First", "slug": "123"},
+                    {"id": 2, "title": "Second", "slug": "Hello World!"},
+                    {"id": 3, "title": "Third", "slug": "hello-world"},
+                    {"id": 4, "title": "Fourth", "slug": "hello-world"},
+                    {"id": 5, "title": "Café Crème", "slug": None},
+                    {"id": 6, "title": "Sixth", "slug": "Hello World!"},
+                ],
+            )
+        upgrade()
+        with db.engine.connect() as connection:
+            slugs = dict(connection.execute(text("SELECT id, slug FROM posts")).all())
+            previous = dict(
+                connection.execute(text("SELECT slug, post_id FROM post_slugs")).all()
+            )
+        db.engine.dispose()
+
+    assert slugs == {
+        1: "post-123",
+        2: "hello-world-2",
+        3: "hello-world",
+        4: "hello-world-3",
+        5: "cafe-creme",
+        6: "hello-world-4",
+    }
+    assert previous == {"123": 1, "Hello World!": 2}
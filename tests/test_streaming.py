@@ -0,0 +1,85 @@
+"""
+Test suite for streamed page rendering.
+
+This module contains tests checking that pages rendered with `stream_page` are
+sent in chunks, and that the session state a page sets while rendering (the CSRF
+token and consumed flashed messages) is stored even though the page is rendered
+after the session cookie is sent.
+"""
+
+from app.models import Users, Posts
+from app.streaming import LazyFragment, stream_page
+
+
+def test_stream_page_sends_chunks(app):
+    """
+    Test that a streamed page is rendered lazily in buffered chunks.
+
+    Args:
+        app: Flask application instance.
+
+    Asserts:
+        - Whether the response is streamed.
+        - Whether the fragment is only rendered once the page reaches it.
+        - Whether the page is sent in more than one chunk.
+    """
+    app.config["STREAM_BUFFER_SIZE"] = 256
+    rendered = []
+
+    def render_fragment():
+        rendered.append(True)
+        return "<p>fragment</p>"
+
+    with app.test_request_context():
+        response = stream_page("posts/posts.html", fragment=LazyFragment(render_fragment))
+        assert response.is_streamed
+        chunks = response.iter_encoded()
+        first = next(chunks)
+        assert b"<html" in first.lower() and not rendered
+        body = first + b"".join(chunks)
+    assert rendered and b"<p>fragment</p>" in body
+
+
+def test_streamed_search_keeps_csrf_token(client, session):
+    """
+    Test that the CSRF token of a streamed page is valid on the next request.
+
+    Args:
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether a search submitted with the token from a streamed page is
+          accepted.
+    """
+    page = client.post("/search").get_data(as_text=True)
+    token = page.split('name="csrf_token" type="hidden" value="')[1].split('"')[0]
+    response = client.post("/search", data={"csrf_token": token, "searched": "pizza"})
+    assert "You searched for: <em>pizza</em>" in response.get_data(as_text=True)
+
+
+def test_streamed_page_consumes_flashes(app, client, session):
+    """
+    Test that a flashed message is shown once by a streamed page.
+
+    Args:
+        app: Flask application instance.
+        client: Flask test client.
+        session: Database session.
+
+    Asserts:
+        - Whether the feed after deleting a post shows the message.
+        - Whether the next page no longer shows it.
+    """
+    app.config["WTF_CSRF_ENABLED"] = False
+    user = Users(username="writer", name="Writer", email="writer@example.com")
+    user.password = "password123"
+    post = Posts(title="Doomed", content="<p>x</p>", slug="doomed", poster=user)
+    session.add(post)
+    session.commit()
+    client.post("/auth/login", data={"username": "writer", "password": "password123"})
+    client.get("/posts/myposts")
+
+    client.get(f"/posts/delete/{post.id}")
+    assert "Post deleted!!" in client.get("/posts/myposts").get_data(as_text=True)
+    assert "Post deleted!!" not in client.get("/posts/myposts").get_data(as_text=True)
@@ -0,0 +1,132 @@
+"""
+Test suite for the bulk import and export commands.
+
+This module contains tests running `flask data import` and `flask data export`
+through the CLI runner, checking that imported users can log in, that imported
+posts are searchable and counted, and that exports stream every row back out.
+"""
+
+import csv
+import io
+import json
+from app.models import Users, Posts
+from app.search import search_posts
+
+
+def _import(app, tmp_path, model_name, filename, content):
+    """Write a file and import it with the CLI."""
+    path = tmp_path / filename
+    path.write_text(content, encoding="utf-8")
+    result = app.test_cli_runner().invoke(
+        args=["data", "import", model_name, str(path), "--batch-size", "2"]
+    )
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def test_import_users_and_posts(app, committed_session, tmp_path):
+    """
+    Test importing users from CSV and posts from NDJSON.
+
+    Args:
+        app: Flask application instance.
+        committed_session: Database session committing for real.
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether plain text passwords are hashed on import.
+        - Whether imported posts are indexed for search and counted.
+        - Whether the rate is reported.
+    """
+    users = "username,name,email,password,is_admin\n" + "".join(
+        f"user{i},User {i},user{i}@example.com,secret{i},{i == 0}\n" for i in range(3)
+    )
+    result = _import(app, tmp_path, "users", "users.csv", users)
+    assert "Imported 3 users" in result.output
+    assert "rows/s" in result.output
+
+    user = Users.query.filter_by(username="user1").one()
+    assert user.verify_password("secret1")
+    assert Users.query.filter_by(username="user0").one().is_admin
+
+    posts = "".join(
+        json.dumps(
+            {
+                "title": f"Imported {i}",
+                "content": "<p>calzone recipe</p>",
+                "slug": f"imported-{i}",
+                "poster_id": user.id,
+                "date_posted": f"2024-01-0{i + 1}T12:00:00",
+            }
+        )
+        + "\n"
+        for i in range(5)
+    )
+    _import(app, tmp_path, "posts", "posts.ndjson", posts)
+    committed_session.expire_all()
+
+    assert Posts.query.count() == 5
+    assert len(search_posts("calzone")) == 5
+    assert user.post_count == 5
+    assert user.last_posted_at.isoformat() == "2024-01-05T12:00:00"
+
+
+def test_export_posts(app, committed_session):
+    """
+    Test exporting posts as NDJSON and CSV.
+
+    Args:
+        app: Flask application instance.
+        committed_session: Database session committing for real.
+
+    Asserts:
+        - Whether every post is exported with its columns.
+        - Whether dates are written in ISO format.
+    """
+    user = Users(username="writer", name="Writer", email="writer@example.com")
+    for i in range(3):
+        committed_session.add(Posts(title=f"Post {i}", content="x", slug=f"p{i}", poster=user))
+    committed_session.commit()
+    runner = app.test_cli_runner()
+
+    ndjson = runner.invoke(args=["data", "export", "posts"])
+    rows = [json.loads(line) for line in ndjson.stdout.splitlines()]
+    assert [row["title"] for row in rows] == ["Post 0", "Post 1", "Post 2"]
+    assert rows[0]["poster_id"] == user.id
+    assert "T" in rows[0]["date_posted"]
+
+    exported = runner.invoke(args=["data", "export", "posts", "--format", "csv"])
+    assert len(list(csv.DictReader(io.StringIO(exported.stdout)))) == 3
+
+
+def test_import_indexes_the_rows_it_inserts(app, committed_session, tmp_path):
+    """
+    Test that an import indexes exactly the posts it inserted.
+
+    Args:
+        app: Flask application instance.
+        committed_session: Database session committing for real.
+        tmp_path: Temporary directory fixture.
+
+    Asserts:
+        - Whether imported posts with explicit IDs below the highest existing
+          ID are indexed.
+        - Whether posts indexed outside the import are not indexed twice.
+    """
+    user = Users(username="writer", name="Writer", email="writer@example.com")
+    committed_session.add(
+        Posts(id=100, title="Existing", content="<p>calzone</p>", slug="e", poster=user)
+    )
+    committed_session.commit()
+
+    posts = "".join(
+        json.dumps(
+            {"title": f"Old {i}", "content": "<p>calzone</p>", "poster_id": user.id}
+            | ({"id": i} if i else {})
+        )
+        + "\n"
+        for i in range(3)
+    )
+    _import(app, tmp_path, "posts", "posts.ndjson", posts)
+
+    assert sorted(result.post.id for result in search_posts("calzone")) == [1, 2, 100, 101]
@@ -0,0 +1,16 @@
+"""
+Production WSGI entry point.
+
+Creates the application once at import time, so servers that preload the app
+(gunicorn's `preload_app`) run `create_app` a single time before forking workers.
+The configuration name is read from `FLASK_CONFIG` and defaults to "prod".
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+    waitress-serve --threads=8 wsgi:app
+"""
+
+import os
+from app import create_app
+
+app = create_app(os.environ.get("FLASK_CONFIG", "prod"))